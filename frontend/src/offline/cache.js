@@ -37,6 +37,7 @@ export const memory = {
 	coupons_cache: {},
 	item_groups_cache: [],
 	items_last_sync: null,
+	items_snapshot_version: null,
 	customers_last_sync: null,
 	// Track the current cache schema version
 	cache_version: CACHE_VERSION,
@@ -245,6 +246,16 @@ export function setItemsLastSync(ts) {
 	persist("items_last_sync", memory.items_last_sync);
 }
 
+// Server catalogue snapshot the stored items were loaded from
+export function getItemsSnapshotVersion() {
+	return memory.items_snapshot_version || null;
+}
+
+export function setItemsSnapshotVersion(version) {
+	memory.items_snapshot_version = version || null;
+	persist("items_snapshot_version", memory.items_snapshot_version);
+}
+
 export function getCustomersLastSync() {
 	return memory.customers_last_sync || null;
 }
@@ -499,6 +510,7 @@ export async function clearAllCache() {
 	memory.stock_cache_ready = false;
 	memory.customer_storage = [];
 	memory.items_last_sync = null;
+	memory.items_snapshot_version = null;
 	memory.customers_last_sync = null;
 	memory.pos_opening_storage = null;
 	memory.opening_dialog_storage = null;
@@ -538,6 +550,7 @@ export async function forceClearAllCache() {
 	memory.stock_cache_ready = false;
 	memory.customer_storage = [];
 	memory.items_last_sync = null;
+	memory.items_snapshot_version = null;
 	memory.customers_last_sync = null;
 	memory.pos_opening_storage = null;
 	memory.opening_dialog_storage = null;
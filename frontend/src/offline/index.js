@@ -25,6 +25,8 @@ export {
 	clearCustomerStorage,
 	getItemsLastSync,
 	setItemsLastSync,
+	getItemsSnapshotVersion,
+	setItemsSnapshotVersion,
 	getCustomersLastSync,
 	setCustomersLastSync,
 	getSalesPersonsStorage,
@@ -6,6 +6,30 @@ import { updateLocalStock } from "./stock.js";
 // Flag to avoid concurrent invoice syncs which can cause duplicate submissions
 let invoiceSyncInProgress = false;
 
+// Offline invoices sent per sync_offline_invoices request
+const INVOICE_SYNC_BATCH_SIZE = 25;
+
+function newIdempotencyKey() {
+	if (typeof crypto !== "undefined" && crypto.randomUUID) {
+		return crypto.randomUUID();
+	}
+	return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+// Invoices queued before idempotency keys existed get one before syncing
+function ensureIdempotencyKeys(invoices) {
+	let added = false;
+	invoices.forEach((inv) => {
+		if (!inv.idempotency_key) {
+			inv.idempotency_key = newIdempotencyKey();
+			added = true;
+		}
+	});
+	if (added) {
+		persist("offline_invoices", invoices);
+	}
+}
+
 export function saveOfflineInvoice(entry) {
 	// Validate that invoice has items before saving
 	if (!entry.invoice || !Array.isArray(entry.invoice.items) || !entry.invoice.items.length) {
@@ -26,6 +50,8 @@ export function saveOfflineInvoice(entry) {
 		throw e;
 	}
 
+	cleanEntry.idempotency_key = cleanEntry.idempotency_key || newIdempotencyKey();
+
 	entries.push(cleanEntry);
 	if (entries.length > MAX_QUEUE_ITEMS) {
 		entries.splice(0, entries.length - MAX_QUEUE_ITEMS);
@@ -214,29 +240,44 @@ export async function syncOfflineInvoices() {
 		let synced = 0;
 		let drafted = 0;
 
-		for (const inv of invoices) {
+		ensureIdempotencyKeys(invoices);
+
+		for (let start = 0; start < invoices.length; start += INVOICE_SYNC_BATCH_SIZE) {
+			const batch = invoices.slice(start, start + INVOICE_SYNC_BATCH_SIZE);
+			let results = [];
 			try {
-				await frappe.call({
-					method: "posawesome.posawesome.api.invoices.submit_invoice",
+				const res = await frappe.call({
+					method: "posawesome.posawesome.api.offline_sync.sync_offline_invoices",
 					args: {
-						invoice: inv.invoice,
-						data: inv.data,
+						invoices: batch.map((inv) => ({
+							idempotency_key: inv.idempotency_key,
+							invoice: inv.invoice,
+							data: inv.data,
+						})),
 					},
 				});
-				synced++;
+				results = (res && res.message) || [];
 			} catch (error) {
-				console.error("Failed to submit invoice, saving as draft", error);
-				try {
-					await frappe.call({
-						method: "posawesome.posawesome.api.invoices.update_invoice",
-						args: { data: inv.invoice },
-					});
+				console.error("Failed to sync offline invoices", error);
+			}
+
+			const byKey = {};
+			results.forEach((result) => {
+				byKey[result.idempotency_key] = result;
+			});
+			batch.forEach((inv) => {
+				const result = byKey[inv.idempotency_key];
+				if (result && result.status === "submitted") {
+					synced++;
+				} else if (result && result.status === "draft") {
 					drafted += 1;
-				} catch (draftErr) {
-					console.error("Failed to save invoice as draft", draftErr);
+				} else {
+					if (result && result.error) {
+						console.error("Failed to sync offline invoice", result.error);
+					}
 					failures.push(inv);
 				}
-			}
+			});
 		}
 
 		// Reset saved invoices and totals after successful sync
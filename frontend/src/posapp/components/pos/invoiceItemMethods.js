@@ -666,6 +666,13 @@ export default {
                 doc.ignore_pricing_rule = 1;
                 doc.company = doc.company || this.pos_profile.company;
                 doc.pos_profile = doc.pos_profile || this.pos_profile.name;
+                if (doc.doctype === "Sales Invoice" || doc.doctype === "POS Invoice") {
+                        // Lets the server recognise retried saves and submits of this cart
+                        if (!sourceDoc.posa_idempotency_key && !this.idempotency_key) {
+                                this.idempotency_key = frappe.utils.get_random(20);
+                        }
+                        doc.posa_idempotency_key = sourceDoc.posa_idempotency_key || this.idempotency_key;
+                }
                 doc.posa_show_custom_name_marker_on_print = this.pos_profile.posa_show_custom_name_marker_on_print;
 
                 // Currency related fields
@@ -1171,8 +1178,9 @@ export default {
 		return this.flt(amount * this.exchange_rate, this.currency_precision);
 	},
 
-	// Update invoice in backend
-	async update_invoice(doc) {
+	// Update invoice in backend. With save=false invoices are only priced by the
+	// server and written once at checkout.
+	async update_invoice(doc, { save = true } = {}) {
 		if (isOffline()) {
 			// When offline, simply merge the passed doc with the current invoice_doc
 			// to allow offline invoice creation without server calls
@@ -1185,7 +1193,9 @@ export default {
 				? "posawesome.posawesome.api.sales_orders.update_sales_order"
 				: doc.doctype === "Quotation"
 					? "posawesome.posawesome.api.quotations.update_quotation"
-					: "posawesome.posawesome.api.invoices.update_invoice";
+					: save
+						? "posawesome.posawesome.api.invoices.update_invoice"
+						: "posawesome.posawesome.api.invoices.price_invoice";
 
 		try {
                         const response = await frappe.call({
@@ -1272,10 +1282,10 @@ export default {
 	},
 
 	// Process and save invoice (handles update or create)
-	async process_invoice() {
+	async process_invoice({ save = true } = {}) {
 		const doc = this.get_invoice_doc();
 		try {
-			const updated_doc = await this.update_invoice(doc);
+			const updated_doc = await this.update_invoice(doc, { save });
 			if (updated_doc && updated_doc.posting_date) {
 				this.posting_date = this.formatDateForBackend(updated_doc.posting_date);
 			}
@@ -1793,6 +1803,7 @@ export default {
 			}
 
 			let invoice_doc;
+			let saved = true;
 			if (
 				this.invoiceType === "Order" &&
 				this.pos_profile.posa_create_only_sales_order &&
@@ -1810,7 +1821,9 @@ export default {
 				invoice_doc = await this.process_invoice_from_order();
 			} else {
 				console.log("Processing regular invoice");
-				invoice_doc = await this.process_invoice();
+				// Priced without saving; checkout_invoice writes it on submit
+				saved = false;
+				invoice_doc = await this.process_invoice({ save: false });
 			}
 
 			if (!invoice_doc) {
@@ -1819,7 +1832,7 @@ export default {
 			}
 
 			// Reload current invoice from backend (no selection dialog) to ensure items/totals are up-to-date
-			if (!isOffline() && invoice_doc.name) {
+			if (!isOffline() && saved && invoice_doc.name) {
 				console.log("Reloading current invoice from backend");
 				const refreshed = await this.reload_current_invoice_from_backend();
 				if (refreshed) {
@@ -524,6 +524,7 @@ export function useItemAddition() {
 		context.eventBus.emit("set_pos_coupons", []);
 		context.posa_coupons = [];
 		context.invoice_doc = "";
+		context.idempotency_key = null;
 		context.return_doc = "";
 		context.discount_amount = 0;
 		context.additional_discount = 0;
@@ -8,6 +8,11 @@ import {
 	setTaxTemplate,
 } from "../../offline/index.js";
 
+const SHIFT_SUBMISSION_EVENT = "posa_shift_submission_progress";
+// Give up waiting on the background submission after this long; the server
+// reports runs whose jobs died as complete well before it.
+const SHIFT_SUBMISSION_TIMEOUT = 30 * 60 * 1000;
+
 export function usePosShift(openDialog) {
 	const { proxy } = getCurrentInstance();
 	const eventBus = proxy?.eventBus;
@@ -90,7 +95,88 @@ export function usePosShift(openDialog) {
 			});
 	}
 
-	function get_closing_data() {
+	// Submits the shift's printed drafts on the server worker pool and resolves
+	// once every worker has reported back. Progress arrives over realtime; the
+	// poll covers a missed or dropped socket event.
+	function submit_shift_invoices() {
+		const shift = pos_opening_shift.value?.name;
+		return new Promise((resolve, reject) => {
+			let poll = null;
+			let finished = false;
+			const deadline = Date.now() + SHIFT_SUBMISSION_TIMEOUT;
+			const stop = () => {
+				finished = true;
+				clearInterval(poll);
+				frappe.realtime.off(SHIFT_SUBMISSION_EVENT, onProgress);
+			};
+			const finish = (progress) => {
+				if (finished) {
+					return;
+				}
+				stop();
+				if (progress?.interrupted) {
+					eventBus?.emit("show_message", {
+						title: __("Some printed invoices will be submitted with the closing shift"),
+						color: "warning",
+					});
+				}
+				if (progress?.failed) {
+					eventBus?.emit("show_message", {
+						title: __("{0} printed invoices could not be submitted", [progress.failed]),
+						color: "warning",
+					});
+				}
+				resolve(progress);
+			};
+			const onProgress = (progress) => {
+				if (!progress || progress.pos_opening_shift !== shift) {
+					return;
+				}
+				eventBus?.emit("shift_submission_progress", progress);
+				if (progress.complete) {
+					finish(progress);
+				}
+			};
+			frappe.realtime.on(SHIFT_SUBMISSION_EVENT, onProgress);
+
+			frappe
+				.call("posawesome.posawesome.api.shift_submission.submit_shift_invoices", {
+					pos_opening_shift: shift,
+				})
+				.then((r) => {
+					if (!r.message || r.message.complete) {
+						finish(r.message);
+						return;
+					}
+					onProgress(r.message);
+					poll = setInterval(() => {
+						if (Date.now() > deadline) {
+							stop();
+							eventBus?.emit("show_message", {
+								title: __("Printed invoices are still being submitted. Please try closing the shift again later."),
+								color: "error",
+							});
+							reject(new Error("Shift invoice submission timed out"));
+							return;
+						}
+						frappe
+							.call("posawesome.posawesome.api.shift_submission.get_shift_submission_progress", {
+								pos_opening_shift: shift,
+							})
+							// Pending while another request starts the run; no progress
+							// at all means no run is recorded or starting.
+							.then((res) => (res.message ? onProgress(res.message) : finish(null)));
+					}, 5000);
+				})
+				.catch((error) => {
+					stop();
+					reject(error);
+				});
+		});
+	}
+
+	async function get_closing_data() {
+		await submit_shift_invoices();
 		return frappe
 			.call(
 				"posawesome.posawesome.doctype.pos_closing_shift.pos_closing_shift.make_closing_shift_from_opening",
@@ -0,0 +1,49 @@
+import { ref, onUnmounted } from "vue";
+
+export function useRequestMetrics(pollInterval = 15000, limit = 100) {
+	const metrics = ref(null);
+	const enabled = ref(false);
+	const loading = ref(true);
+	const error = ref(null);
+	let timer = null;
+
+	function stopPolling() {
+		if (timer) clearInterval(timer);
+		timer = null;
+	}
+
+	async function fetchRequestMetrics() {
+		loading.value = true;
+		error.value = null;
+		try {
+			const res = await frappe.call({
+				method: "posawesome.posawesome.api.utilities.get_request_metrics",
+				args: { limit },
+			});
+			if (res && res.message) {
+				metrics.value = res.message;
+				enabled.value = !!res.message.enabled;
+				// Instrumentation is switched on in site config, nothing to poll otherwise.
+				if (!enabled.value) stopPolling();
+			} else {
+				error.value = "No data from server";
+			}
+		} catch (e) {
+			error.value = e.message || e;
+		} finally {
+			loading.value = false;
+		}
+	}
+
+	const canRead = typeof frappe !== "undefined" && frappe.user && frappe.user.has_role("System Manager");
+	if (canRead) {
+		fetchRequestMetrics();
+		timer = window.setInterval(fetchRequestMetrics, pollInterval);
+	} else {
+		loading.value = false;
+	}
+
+	onUnmounted(stopPolling);
+
+	return { metrics, enabled, loading, error, refresh: fetchRequestMetrics };
+}
@@ -17,6 +17,8 @@ import {
 	saveItemsBulk,
 	clearStoredItems,
 	setItemsLastSync,
+	getItemsSnapshotVersion,
+	setItemsSnapshotVersion,
 } from "../../offline/index.js";
 
 const DEFAULT_PAGE_SIZE = 200;
@@ -110,6 +112,10 @@ export const useItemsStore = defineStore("items", () => {
 
 	// Request management
 	const requestToken = ref(0);
+	// Last full catalogue served from the server snapshot, reused on "not modified".
+	// Without items in memory it stands for the stored items, which are only read
+	// back once the server confirms the version.
+	const catalogueSnapshot = ref({ version: "", items: null });
 	const abortControllers = ref(new Map());
 	const backgroundSyncState = ref({
 		running: false,
@@ -180,6 +186,18 @@ export const useItemsStore = defineStore("items", () => {
 		return Boolean(posProfile.value?.posa_local_storage);
 	};
 
+	// After a reload the snapshot version persisted with the offline caches is
+	// offered, as long as the stored items can stand in for it
+	const resolveSnapshotVersion = async () => {
+		if (catalogueSnapshot.value.items) {
+			return catalogueSnapshot.value.version;
+		}
+		const version = shouldPersistItems() ? getItemsSnapshotVersion() : null;
+		const storedCount = version ? await getStoredItemsCount().catch(() => 0) : 0;
+		catalogueSnapshot.value = { version: storedCount > 0 ? version : "", items: null };
+		return catalogueSnapshot.value.version;
+	};
+
 	const resetCachedPagination = (options = {}) => {
 		const { enabled = false, total = 0, pageSize = DEFAULT_PAGE_SIZE } = options;
 
@@ -322,6 +340,8 @@ export const useItemsStore = defineStore("items", () => {
 
 			if (Number.isFinite(resolvedLimit) && resolvedLimit > 0) {
 				args.limit = resolvedLimit;
+			} else if (!searchValue && normalizedGroup === "ALL") {
+				args.snapshot_version = await resolveSnapshotVersion();
 			}
 
 			const response = await frappe.call({
@@ -335,7 +355,13 @@ export const useItemsStore = defineStore("items", () => {
 				return;
 			}
 
-			const fetchedItems = response.message || [];
+			let fetchedItems = response.message || [];
+			if (response.not_modified) {
+				fetchedItems = catalogueSnapshot.value.items || (await getAllStoredItems());
+				catalogueSnapshot.value = { ...catalogueSnapshot.value, items: fetchedItems };
+			} else if (response.snapshot_version) {
+				catalogueSnapshot.value = { version: response.snapshot_version, items: fetchedItems };
+			}
 
 			// Update state
 			cachedPagination.value.enabled = false;
@@ -353,6 +379,7 @@ export const useItemsStore = defineStore("items", () => {
 			// Persist to IndexedDB and kick off background sync when appropriate
 			if (!searchValue && shouldPersistItems()) {
 				await persistItemsToStorage(fetchedItems, { replaceExisting: forceServer });
+				setItemsSnapshotVersion(response.snapshot_version);
 				triggerBackgroundSync({
 					groupFilter: normalizedGroup,
 					initialBatch: fetchedItems,
@@ -360,7 +387,8 @@ export const useItemsStore = defineStore("items", () => {
 				});
 			}
 
-			// Background load additional data
+			// Background load additional data. Snapshot rows carry no stock, so
+			// this is also what fills in quantities, batches and serials for them.
 			if (fetchedItems.length > 0) {
 				backgroundLoadItemDetails(fetchedItems);
 			}
@@ -567,6 +595,7 @@ export const useItemsStore = defineStore("items", () => {
 					selling_price_list: activePriceList.value,
 					currency: posProfile.value.currency,
 					barcode: barcode,
+					customer: customer.value,
 				},
 			});
 
@@ -831,6 +860,7 @@ export const useItemsStore = defineStore("items", () => {
 		try {
 			if (replaceExisting) {
 				await clearStoredItems();
+				setItemsSnapshotVersion(null);
 			}
 
 			await saveItemsBulk(itemsBatch);
@@ -897,6 +927,7 @@ export const useItemsStore = defineStore("items", () => {
 		try {
 			if (reset) {
 				await clearStoredItems();
+				setItemsSnapshotVersion(null);
 				if (Array.isArray(initialBatch) && initialBatch.length) {
 					await saveItemsBulk(initialBatch);
 					await updateCachedPaginationFromStorage();
@@ -904,8 +935,9 @@ export const useItemsStore = defineStore("items", () => {
 			}
 
 			let loaded = items.value.length;
-			let lastItemName = items.value.length
-				? items.value[items.value.length - 1]?.item_name || null
+			const lastLoaded = items.value.length ? items.value[items.value.length - 1] : null;
+			let cursor = lastLoaded?.item_name
+				? JSON.stringify([lastLoaded.item_name, lastLoaded.name])
 				: null;
 
 			const limit = resolvePageSize(DEFAULT_PAGE_SIZE);
@@ -922,7 +954,7 @@ export const useItemsStore = defineStore("items", () => {
 						customer: customer.value,
 						include_image: 1,
 						item_groups: profileGroups,
-						start_after: lastItemName,
+						cursor,
 						limit,
 					},
 				});
@@ -940,7 +972,8 @@ export const useItemsStore = defineStore("items", () => {
 				setItems(batch, { append: true });
 				appended.push(...batch);
 				loaded += batch.length;
-				lastItemName = batch[batch.length - 1]?.item_name || lastItemName;
+				const lastRow = batch[batch.length - 1];
+				cursor = response.next_cursor || JSON.stringify([lastRow?.item_name, lastRow?.name]);
 
 				await updateCachedPaginationFromStorage();
 
@@ -107,15 +107,118 @@ doc_events = {
         "before_submit": "posawesome.posawesome.api.invoice.before_submit",
         "before_cancel": "posawesome.posawesome.api.invoice.before_cancel",
     },
+    "Payment Entry": {
+        "on_submit": "posawesome.posawesome.api.shift_totals.update_payment_entry_totals",
+        "on_cancel": "posawesome.posawesome.api.shift_totals.update_payment_entry_totals",
+    },
     "Customer": {
         "validate": "posawesome.posawesome.api.customer.validate",
         "after_insert": "posawesome.posawesome.api.customer.after_insert",
     },
+    "Item": {
+        "on_update": [
+            "posawesome.posawesome.api.item_search_index.update_item_search_index",
+            "posawesome.posawesome.api.item_changes.log_item_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_item_scan_codes",
+        ],
+        "after_rename": [
+            "posawesome.posawesome.api.item_search_index.update_item_search_index",
+            "posawesome.posawesome.api.item_changes.log_item_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_item_scan_codes",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.item_search_index.update_item_search_index",
+            "posawesome.posawesome.api.item_changes.log_item_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_item_scan_codes",
+        ],
+    },
+    "Item Group": {
+        "on_update": [
+            "posawesome.posawesome.api.item_search_index.invalidate_item_search_index",
+            "posawesome.posawesome.api.utils.invalidate_item_group_cache",
+        ],
+        "after_rename": "posawesome.posawesome.api.utils.invalidate_item_group_cache",
+        "on_trash": "posawesome.posawesome.api.utils.invalidate_item_group_cache",
+    },
+    "POS Profile": {
+        "on_update": [
+            "posawesome.posawesome.api.item_search_index.invalidate_item_search_index",
+            "posawesome.posawesome.api.utils.invalidate_item_group_cache",
+        ],
+        "on_trash": "posawesome.posawesome.api.utils.invalidate_item_group_cache",
+    },
+    "Item Price": {
+        "on_update": [
+            "posawesome.posawesome.api.item_changes.log_item_price_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.item_changes.log_item_price_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+        ],
+    },
+    "Batch": {
+        "on_update": [
+            "posawesome.posawesome.api.item_changes.log_batch_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_batch_scan_code",
+        ],
+        "after_rename": "posawesome.posawesome.api.scan_codes.update_batch_scan_code",
+        "on_trash": [
+            "posawesome.posawesome.api.item_changes.log_batch_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_batch_scan_code",
+        ],
+    },
+    "Bin": {
+        "on_update": [
+            "posawesome.posawesome.api.item_changes.log_stock_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+        ],
+    },
+    "Stock Ledger Entry": {
+        "on_submit": [
+            "posawesome.posawesome.api.item_changes.log_stock_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+        ],
+        "on_cancel": [
+            "posawesome.posawesome.api.item_changes.log_stock_change",
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+        ],
+    },
+    "Warehouse": {
+        "on_update": "posawesome.posawesome.api.utils.invalidate_warehouse_tree",
+        "after_rename": "posawesome.posawesome.api.utils.invalidate_warehouse_tree",
+        "on_trash": "posawesome.posawesome.api.utils.invalidate_warehouse_tree",
+    },
+    "Serial No": {
+        "on_update": [
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_serial_scan_code",
+        ],
+        "after_rename": "posawesome.posawesome.api.scan_codes.update_serial_scan_code",
+        "on_trash": [
+            "posawesome.posawesome.api.item_fetchers.invalidate_item_caches",
+            "posawesome.posawesome.api.scan_codes.update_serial_scan_code",
+        ],
+    },
 }
 
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+    "all": [
+        "posawesome.posawesome.api.submission_queue.ensure_queue_draining",
+    ],
+    "daily": [
+        "posawesome.posawesome.api.item_changes.prune_item_change_log",
+    ],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"posawesome.tasks.all"
@@ -134,6 +237,20 @@ doc_events = {
 # 	]
 # }
 
+# Request Events
+# ----------------
+# Opt-in POS API metrics and profiling, enabled with "posa_instrumentation"
+# and "posa_profiler" in site config.
+
+before_request = [
+    "posawesome.posawesome.api.instrumentation.start_request_metrics",
+    "posawesome.posawesome.api.profiler.start_profiling",
+]
+after_request = [
+    "posawesome.posawesome.api.instrumentation.finish_request_metrics",
+    "posawesome.posawesome.api.profiler.finish_profiling",
+]
+
 # Testing
 # -------
 
@@ -194,6 +311,8 @@ fixtures = [
                     "POS Profile-create_pos_invoice_instead_of_sales_invoice",
                     "POS Invoice-posa_is_printed",
                     "Sales Invoice-posa_is_printed",
+                    "POS Invoice-posa_idempotency_key",
+                    "Sales Invoice-posa_idempotency_key",
                     "Sales Invoice Reference-pos_invoice",
                     "POS Profile-posa_local_storage",
                     "POS Profile-posa_force_server_items",
@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    try:
+        frappe.db.add_index("Item", ["item_name", "name"], index_name="item_name_name")
+    except Exception as e:
+        frappe.log_error(str(e), "Add Item keyset index")
@@ -52,6 +52,7 @@ from .shifts import (
     check_opening_shift,
     create_opening_voucher,
     get_opening_dialog_data,
+    get_x_report,
 )
 from .utilities import (
     get_app_branch,
@@ -0,0 +1,191 @@
+"""Opt-in per-request metrics for the POS API endpoints.
+
+With ``"posa_instrumentation": 1`` in the site config every call to a
+whitelisted ``posawesome.posawesome.api`` method records its wall time, the
+number of SQL statements and time spent in the database, and the hits and
+misses of the per-item ``item_fetchers`` caches. Entries are pushed to a
+capped redis list (a ring buffer of the latest :data:`RING_BUFFER_SIZE`
+requests) and read back by ``utilities.get_request_metrics``.
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+METRICS_KEY = "posa_request_metrics"
+RING_BUFFER_SIZE = 500
+
+API_PREFIX = "posawesome.posawesome.api."
+
+# Polling the metrics must not flood the buffer it reads.
+EXCLUDED_METHODS = frozenset({"posawesome.posawesome.api.utilities.get_request_metrics"})
+
+
+class QueryCounter:
+    """Count statements and database time issued through ``frappe.db.sql``.
+
+    Cache lookups reported with :func:`record_cache_lookup` while the counter
+    is active are added to ``cache_hits`` / ``cache_misses``.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def _start_counting(counter: QueryCounter) -> Callable[[], None]:
+    """Wrap ``frappe.db.sql`` for ``counter`` and return the undo callable."""
+
+    db = frappe.db
+    original = db.sql
+    previous = getattr(frappe.local, "posa_query_counter", None)
+
+    def counting_sql(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            counter.queries += 1
+            counter.db_seconds += time.perf_counter() - started
+
+    db.sql = counting_sql
+    frappe.local.posa_query_counter = counter
+
+    def stop():
+        db.sql = original
+        frappe.local.posa_query_counter = previous
+
+    return stop
+
+
+@contextmanager
+def count_queries():
+    """Temporarily wrap ``frappe.db.sql`` and yield a :class:`QueryCounter`."""
+
+    counter = QueryCounter()
+    stop = _start_counting(counter)
+    try:
+        yield counter
+    finally:
+        stop()
+
+
+def record_cache_lookup(hits: int, misses: int):
+    """Add cache hits and misses to the active counter, if any."""
+
+    counter = getattr(frappe.local, "posa_query_counter", None)
+    if counter is not None:
+        counter.cache_hits += hits
+        counter.cache_misses += misses
+
+
+def is_enabled() -> bool:
+    return bool(cint(frappe.conf.get("posa_instrumentation")))
+
+
+def _request_method() -> Optional[str]:
+    request = getattr(frappe.local, "request", None)
+    path = getattr(request, "path", "") or ""
+    _, marker, method = path.partition("/method/")
+    if not marker or not method.startswith(API_PREFIX) or method in EXCLUDED_METHODS:
+        return None
+    return method
+
+
+def start_request_metrics():
+    """``before_request`` hook starting the measurement of a POS API call."""
+
+    if not is_enabled():
+        return
+    method = _request_method()
+    if not method:
+        return
+
+    counter = QueryCounter()
+    frappe.local.posa_request_metrics = {
+        "method": method,
+        "counter": counter,
+        "started": time.perf_counter(),
+        "stop": _start_counting(counter),
+    }
+
+
+def finish_request_metrics(response=None, request=None):
+    """``after_request`` hook pushing the measured call to the ring buffer."""
+
+    state = getattr(frappe.local, "posa_request_metrics", None)
+    if not state:
+        return
+    frappe.local.posa_request_metrics = None
+    state["stop"]()
+
+    counter: QueryCounter = state["counter"]
+    entry = {
+        "method": state["method"],
+        "user": frappe.session.user if getattr(frappe.local, "session", None) else None,
+        "status": getattr(response, "status_code", None),
+        "wall_ms": round((time.perf_counter() - state["started"]) * 1000, 3),
+        "queries": counter.queries,
+        "db_ms": round(counter.db_seconds * 1000, 3),
+        "cache_hits": counter.cache_hits,
+        "cache_misses": counter.cache_misses,
+        "at": str(now_datetime()),
+    }
+    try:
+        cache = frappe.cache()
+        key = cache.make_key(METRICS_KEY)
+        pipe = cache.pipeline()
+        pipe.lpush(key, json.dumps(entry))
+        pipe.ltrim(key, 0, RING_BUFFER_SIZE - 1)
+        pipe.execute()
+    except Exception:
+        # Metrics are best effort and must never fail the request.
+        pass
+
+
+def _summarise(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        grouped.setdefault(entry["method"], []).append(entry)
+
+    summary = []
+    for method, calls in grouped.items():
+        wall = [call["wall_ms"] for call in calls]
+        hits = sum(call["cache_hits"] for call in calls)
+        lookups = hits + sum(call["cache_misses"] for call in calls)
+        summary.append(
+            {
+                "method": method,
+                "calls": len(calls),
+                "median_ms": round(statistics.median(wall), 3),
+                "max_ms": max(wall),
+                "avg_queries": round(sum(call["queries"] for call in calls) / len(calls), 1),
+                "max_queries": max(call["queries"] for call in calls),
+                "avg_db_ms": round(sum(call["db_ms"] for call in calls) / len(calls), 3),
+                "cache_hit_ratio": round(hits / lookups, 3) if lookups else None,
+            }
+        )
+    summary.sort(key=lambda row: row["median_ms"], reverse=True)
+    return summary
+
+
+def read_request_metrics(limit: int = 100) -> Dict[str, Any]:
+    """Return the latest ``limit`` entries (newest first) and per-method aggregates."""
+
+    limit = max(1, min(cint(limit) or 100, RING_BUFFER_SIZE))
+    raw = frappe.cache().lrange(METRICS_KEY, 0, limit - 1) or []
+    entries = [json.loads(value) for value in raw]
+    return {
+        "enabled": is_enabled(),
+        "entries": entries,
+        "summary": _summarise(entries),
+    }
@@ -9,6 +9,7 @@ from frappe.utils import add_days, flt
 
 from posawesome.posawesome.api.utilities import get_company_domain  # Updated import
 from posawesome.posawesome.api.payments import get_posawesome_credit_redeem_remark
+from posawesome.posawesome.api.shift_totals import update_invoice_totals
 from posawesome.posawesome.doctype.delivery_charges.delivery_charges import (
     get_applicable_delivery_charges,
 )
@@ -27,10 +28,12 @@ def before_submit(doc, method):
     add_loyalty_point(doc)
     create_sales_order(doc)
     update_coupon(doc, "used")
+    update_invoice_totals(doc, 1)
 
 
 def before_cancel(doc, method):
     update_coupon(doc, "cancelled")
+    update_invoice_totals(doc, -1)
 
 
 def on_cancel(doc, method):
@@ -12,6 +12,7 @@ from erpnext.stock.doctype.batch.batch import (
     get_batch_no,
     get_batch_qty,
 )  # This should be from erpnext directly
+from erpnext.stock.doctype.packed_item.packed_item import make_packing_list
 from frappe import _
 from frappe.utils import (
     cint,
@@ -22,7 +23,6 @@ from frappe.utils import (
     nowdate,
     strip_html_tags,
 )
-from frappe.utils.background_jobs import enqueue
 
 from posawesome.posawesome.api.payments import (
     redeeming_customer_credit,
@@ -32,7 +32,36 @@ from posawesome.posawesome.api.utilities import (
     set_batch_nos_for_bundels,
 )  # Updated imports
 
-from .items import get_stock_availability
+from .items import get_stock_availability_bulk
+from .submission_queue import queue_invoice_submission
+
+# Client generated key stored on POS invoices with a unique index so retried
+# requests find the invoice they created before instead of creating another.
+IDEMPOTENCY_FIELD = "posa_idempotency_key"
+
+
+def _find_by_idempotency_key(doctype, key, for_update=False):
+    if not key:
+        return None
+    return frappe.db.get_value(
+        doctype, {IDEMPOTENCY_FIELD: key}, ["name", "docstatus"], as_dict=True, for_update=for_update
+    )
+
+
+def _save_new_invoice(invoice_doc):
+    """Insert a new invoice; a concurrent request with the same key wins."""
+
+    key = invoice_doc.get(IDEMPOTENCY_FIELD)
+    try:
+        invoice_doc.save()
+        return invoice_doc
+    except frappe.UniqueValidationError:
+        # Locking read so the row committed by the other request is visible.
+        existing = _find_by_idempotency_key(invoice_doc.doctype, key, for_update=True)
+        if not existing:
+            raise
+        frappe.clear_messages()
+        return frappe.get_doc(invoice_doc.doctype, existing.name)
 
 
 def _sanitize_item_name(name: str) -> str:
@@ -61,14 +90,7 @@ def _apply_item_name_overrides(invoice_doc, overrides=None):
 
 def _get_available_stock(item):
     """Return available stock qty for an item row."""
-    warehouse = item.get("warehouse")
-    batch_no = item.get("batch_no")
-    item_code = item.get("item_code")
-    if not item_code or not warehouse:
-        return 0
-    if batch_no:
-        return get_batch_qty(batch_no, warehouse) or 0
-    return get_stock_availability(item_code, warehouse)
+    return get_stock_availability_bulk([item])[0]
 
 
 def _is_stock_item(item):
@@ -91,12 +113,9 @@ def _is_stock_item(item):
 def _collect_stock_errors(items):
     """Return list of items exceeding available stock."""
     errors = []
-    for d in items:
-        if flt(d.get("qty")) < 0:
-            continue
-        if not _is_stock_item(d):
-            continue
-        available = _get_available_stock(d)
+    items = [d for d in items if flt(d.get("qty")) >= 0 and _is_stock_item(d)]
+    available_qty = get_stock_availability_bulk(items)
+    for d, available in zip(items, available_qty, strict=True):
         requested = flt(d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1)))
         if requested > available:
             errors.append(
@@ -271,20 +290,21 @@ def validate_return_items(original_invoice_name, return_items, doctype="Sales In
     return {"valid": True}
 
 
-@frappe.whitelist()
-def update_invoice(data):
-    data = json.loads(data)
-    # Determine doctype based on POS Profile setting
-    pos_profile = data.get("pos_profile")
-    doctype = "Sales Invoice"
+def _invoice_doctype(pos_profile):
+    """Return the invoice doctype a POS Profile creates."""
     if pos_profile and frappe.db.get_value(
         "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
     ):
-        doctype = "POS Invoice"
+        return "POS Invoice"
+    return "Sales Invoice"
 
-    # Ensure the document type is set for new invoices to prevent validation errors
-    data.setdefault("doctype", doctype)
 
+def _build_invoice_doc(doctype, data):
+    """Load or create the invoice from ``data`` and apply currency, pricing and taxes.
+
+    Nothing is written to the database. Returns the document and the date of
+    the exchange rate used.
+    """
     if data.get("name"):
         invoice_doc = frappe.get_doc(doctype, data.get("name"))
         invoice_doc.update(data)
@@ -450,11 +470,39 @@ def update_invoice(data):
         invoice_doc.paid_amount = flt(sum(p.amount for p in invoice_doc.payments))
         invoice_doc.base_paid_amount = flt(sum(p.base_amount for p in invoice_doc.payments))
 
+    return invoice_doc, exchange_rate_date
+
+
+@frappe.whitelist()
+def update_invoice(data):
+    data = json.loads(data)
+    doctype = _invoice_doctype(data.get("pos_profile"))
+
+    # Ensure the document type is set for new invoices to prevent validation errors
+    data.setdefault("doctype", doctype)
+
+    if not data.get("name"):
+        existing = _find_by_idempotency_key(doctype, data.get(IDEMPOTENCY_FIELD))
+        if existing and existing.docstatus != 0:
+            # Retry of a save whose invoice has been submitted since.
+            return frappe.get_doc(doctype, existing.name).as_dict()
+        if existing:
+            data["name"] = existing.name
+
+    invoice_doc, exchange_rate_date = _build_invoice_doc(doctype, data)
+
     invoice_doc.flags.ignore_permissions = True
     frappe.flags.ignore_account_permission = True
     invoice_doc.docstatus = 0
-    invoice_doc.save()
+    if invoice_doc.is_new() and invoice_doc.get(IDEMPOTENCY_FIELD):
+        invoice_doc = _save_new_invoice(invoice_doc)
+    else:
+        invoice_doc.save()
+
+    return _invoice_response(invoice_doc, exchange_rate_date)
 
+
+def _invoice_response(invoice_doc, exchange_rate_date):
     # Return both the invoice doc and the updated data
     response = invoice_doc.as_dict()
     response["conversion_rate"] = invoice_doc.conversion_rate
@@ -464,27 +512,33 @@ def update_invoice(data):
 
 
 @frappe.whitelist()
-def submit_invoice(invoice, data):
+def price_invoice(data):
+    """Return the invoice with server side prices, taxes and totals without saving it.
+
+    Used by the payment screen so that the invoice is written only once, by
+    ``checkout_invoice``.
+    """
     data = json.loads(data)
-    invoice = json.loads(invoice)
-    pos_profile = invoice.get("pos_profile")
-    doctype = "Sales Invoice"
-    if pos_profile and frappe.db.get_value(
-        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
-    ):
-        doctype = "POS Invoice"
+    doctype = _invoice_doctype(data.get("pos_profile"))
+    data.setdefault("doctype", doctype)
 
-    invoice_name = invoice.get("name")
-    if not invoice_name or not frappe.db.exists(doctype, invoice_name):
-        created = update_invoice(json.dumps(invoice))
-        invoice_name = created.get("name")
-        invoice_doc = frappe.get_doc(doctype, invoice_name)
-    else:
-        invoice_doc = frappe.get_doc(doctype, invoice_name)
-        invoice_doc.update(invoice)
+    if not data.get("name"):
+        existing = _find_by_idempotency_key(doctype, data.get(IDEMPOTENCY_FIELD))
+        if existing and existing.docstatus == 0:
+            data["name"] = existing.name
 
-    # Ensure item name overrides are respected on submit
-    _apply_item_name_overrides(invoice_doc)
+    invoice_doc, exchange_rate_date = _build_invoice_doc(doctype, data)
+    invoice_doc.calculate_taxes_and_totals()
+    return _invoice_response(invoice_doc, exchange_rate_date)
+
+
+def _prepare_submission(invoice_doc, invoice, data, pos_profile):
+    """Apply the checkout side of an invoice before it is saved for submission.
+
+    Sets remarks, books the change payment entry and customer advances,
+    assigns batches and validates stock. Returns the arguments needed by
+    ``redeeming_customer_credit`` once the invoice is submitted.
+    """
     if invoice.get("posa_delivery_date"):
         invoice_doc.update_stock = 0
     mop_cash_list = [
@@ -608,6 +662,60 @@ def submit_invoice(invoice, data):
 
     _validate_stock_on_invoice(invoice_doc)
 
+    return {
+        "is_payment_entry": is_payment_entry,
+        "total_cash": total_cash,
+        "cash_account": cash_account,
+        "payments": payments,
+    }
+
+
+def _submits_in_background(invoice_doc):
+    return frappe.get_value(
+        "POS Profile",
+        invoice_doc.pos_profile,
+        "posa_allow_submissions_in_background_job",
+    )
+
+
+def _complete_submission(invoice_doc, data, settlement):
+    """Submit a saved invoice, or queue it when the profile submits in the background."""
+    if _submits_in_background(invoice_doc):
+        queue_invoice_submission(invoice_doc, data, settlement)
+    else:
+        invoice_doc.submit()
+        redeeming_customer_credit(invoice_doc, data, **settlement)
+
+
+@frappe.whitelist()
+def submit_invoice(invoice, data):
+    data = json.loads(data)
+    invoice = json.loads(invoice)
+    pos_profile = invoice.get("pos_profile")
+    doctype = _invoice_doctype(pos_profile)
+
+    existing = _find_by_idempotency_key(doctype, invoice.get(IDEMPOTENCY_FIELD))
+    if existing:
+        # Lock the invoice so parallel retries wait for the first submission.
+        docstatus = frappe.db.get_value(doctype, existing.name, "docstatus", for_update=True)
+        if docstatus in (1, 2):
+            # Submitted, or cancelled since; a replay must not create it again.
+            return {"name": existing.name, "status": docstatus}
+        invoice["name"] = existing.name
+
+    invoice_name = invoice.get("name")
+    if not invoice_name or not frappe.db.exists(doctype, invoice_name):
+        created = update_invoice(json.dumps(invoice))
+        invoice_name = created.get("name")
+        invoice_doc = frappe.get_doc(doctype, invoice_name)
+    else:
+        invoice_doc = frappe.get_doc(doctype, invoice_name)
+        invoice_doc.update(invoice)
+
+    # Ensure item name overrides are respected on submit
+    _apply_item_name_overrides(invoice_doc)
+    settlement = _prepare_submission(invoice_doc, invoice, data, pos_profile)
+
     invoice_doc.flags.ignore_permissions = True
     frappe.flags.ignore_account_permission = True
     invoice_doc.posa_is_printed = 1
@@ -622,44 +730,78 @@ def submit_invoice(invoice, data):
             update_modified=False,
         )
 
-    if frappe.get_value(
-        "POS Profile",
-        invoice_doc.pos_profile,
-        "posa_allow_submissions_in_background_job",
-    ):
-        invoices_list = frappe.get_all(
-            invoice_doc.doctype,
-            filters={
-                "posa_pos_opening_shift": invoice_doc.posa_pos_opening_shift,
-                "docstatus": 0,
-                "posa_is_printed": 1,
-            },
-        )
-        for invoice in invoices_list:
-            enqueue(
-                method=submit_in_background_job,
-                queue="short",
-                timeout=1000,
-                is_async=True,
-                kwargs={
-                    "invoice": invoice.name,
-                    "doctype": invoice_doc.doctype,
-                    "invoice_doc": invoice_doc,
-                    "data": data,
-                    "is_payment_entry": is_payment_entry,
-                    "total_cash": total_cash,
-                    "cash_account": cash_account,
-                    "payments": payments,
-                },
-            )
+    _complete_submission(invoice_doc, data, settlement)
+
+    return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
+
+
+@frappe.whitelist()
+def checkout_invoice(invoice, data):
+    """Build, price, validate and submit a POS invoice in a single call.
+
+    Replaces ``update_invoice`` followed by ``submit_invoice`` at checkout:
+    the invoice is assembled in memory and written once, when it is
+    submitted (or saved once when the profile submits in the background).
+    """
+    data = json.loads(data)
+    invoice = json.loads(invoice)
+    pos_profile = invoice.get("pos_profile")
+    doctype = _invoice_doctype(pos_profile)
+    invoice.setdefault("doctype", doctype)
+    key = invoice.get(IDEMPOTENCY_FIELD)
+
+    existing = _find_by_idempotency_key(doctype, key)
+    if existing:
+        # Lock the invoice so parallel retries wait for the first submission.
+        docstatus = frappe.db.get_value(doctype, existing.name, "docstatus", for_update=True)
+        if docstatus in (1, 2):
+            # Submitted, or cancelled since; a replay must not create it again.
+            return {"name": existing.name, "status": docstatus}
+        invoice["name"] = existing.name
+    if invoice.get("name") and not frappe.db.exists(doctype, invoice.get("name")):
+        invoice.pop("name")
+
+    invoice_doc, _exchange_rate_date = _build_invoice_doc(doctype, invoice)
+    if invoice_doc.is_new():
+        # Packed items and totals are normally filled in by the draft save.
+        make_packing_list(invoice_doc)
+    invoice_doc.calculate_taxes_and_totals()
+
+    settlement = _prepare_submission(invoice_doc, invoice, data, pos_profile)
+
+    invoice_doc.flags.ignore_permissions = True
+    frappe.flags.ignore_account_permission = True
+    invoice_doc.posa_is_printed = 1
+    if data.get("due_date"):
+        invoice_doc.due_date = data.get("due_date")
+
+    try:
+        if _submits_in_background(invoice_doc):
+            invoice_doc.docstatus = 0
+            invoice_doc.save()
+        else:
+            invoice_doc.submit()
+    except frappe.UniqueValidationError:
+        # A parallel retry created the invoice first; drop this attempt.
+        if not key:
+            raise
+        frappe.db.rollback()
+        existing = _find_by_idempotency_key(doctype, key)
+        if not existing:
+            raise
+        frappe.clear_messages()
+        return {"name": existing.name, "status": existing.docstatus}
+
+    if invoice_doc.docstatus == 1:
+        redeeming_customer_credit(invoice_doc, data, **settlement)
     else:
-        invoice_doc.submit()
-        redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, cash_account, payments)
+        _complete_submission(invoice_doc, data, settlement)
 
     return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
 
 
 def submit_in_background_job(kwargs):
+    # Superseded by submission_queue; kept for jobs queued before the upgrade.
     invoice = kwargs.get("invoice")
     doctype = kwargs.get("doctype") or "Sales Invoice"
     data = kwargs.get("data")
@@ -0,0 +1,253 @@
+"""Change journal backing the incremental POS item sync.
+
+Document hooks append one ``POS Item Change Log`` row for every write that
+affects what a terminal shows for an item: the Item itself (including its
+barcode and UOM child tables), Item Price, Batch and movements of the actual
+stock quantity. The auto-increment row name doubles as the client cursor for
+:func:`get_item_changes`.
+
+Ids are handed out on insert but only become visible on commit, so a slow
+transaction can commit an id below one a client has already passed. The
+cursor therefore never moves past entries younger than
+:data:`CURSOR_SAFETY_LAG`.
+
+Changes to the catalogue itself, i.e. anything but stock, also move the
+catalogue version token in redis once they commit; see
+:func:`get_catalogue_version`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, Dict, List
+
+import frappe
+from frappe.utils import add_days, add_to_date, cint, cstr, flt, now_datetime
+
+from .items import (
+    _append_shaped_rows,
+    _build_search_plan,
+    _ensure_pos_profile,
+    _prepare_item_groups,
+)
+from .utils import get_warehouse_scope
+
+CHANGE_LOG_DOCTYPE = "POS Item Change Log"
+CATALOGUE_VERSION_KEY = "posa_item_catalogue_version"
+
+# Change log rows older than this are pruned; clients with older cursors reload.
+CHANGE_LOG_RETENTION_DAYS = 7
+
+# Seconds a journal entry is held back from clients; longer than any
+# transaction writing one is expected to stay open.
+CURSOR_SAFETY_LAG = 60
+
+DEFAULT_CHANGE_LIMIT = 500
+MAX_CHANGE_LIMIT = 5000
+
+
+def get_catalogue_version() -> str:
+    """Return the token moved by every committed item, price or batch change."""
+
+    version = frappe.cache().get_value(CATALOGUE_VERSION_KEY)
+    if not version:
+        version = bump_catalogue_version()
+    return cstr(version)
+
+
+def bump_catalogue_version() -> str:
+    version = frappe.generate_hash(length=12)
+    frappe.cache().set_value(CATALOGUE_VERSION_KEY, version)
+    return version
+
+
+def _log_change(item_code, source_doctype, price_list=None, warehouse=None):
+    if not item_code:
+        return
+
+    if not warehouse:
+        # After commit, so nothing rebuilt for the new token reads old rows.
+        frappe.db.after_commit.add(bump_catalogue_version)
+
+    frappe.get_doc(
+        {
+            "doctype": CHANGE_LOG_DOCTYPE,
+            "item_code": item_code,
+            "source_doctype": source_doctype,
+            "price_list": price_list,
+            "warehouse": warehouse,
+        }
+    ).insert(ignore_permissions=True)
+
+
+def log_item_change(doc, method=None, *args):
+    """Item hook; also covers Item Barcode and UOM Conversion Detail rows."""
+
+    _log_change(doc.name, doc.doctype)
+    if method == "after_rename" and args:
+        _log_change(args[0], doc.doctype)
+
+
+def log_item_price_change(doc, method=None):
+    _log_change(doc.item_code, doc.doctype, price_list=doc.price_list)
+
+
+def log_batch_change(doc, method=None):
+    _log_change(doc.item, doc.doctype)
+
+
+def log_stock_change(doc, method=None):
+    """Bin / Stock Ledger Entry hook recording quantity changes per warehouse.
+
+    Terminals only show the actual quantity, so Bin writes that leave it
+    untouched (reserved, ordered or projected quantities) and ledger entries
+    that move no quantity are not journalled. A stock transaction writes
+    both for every line; the journal gets one row per item and warehouse
+    when it commits.
+    """
+
+    if doc.doctype == "Bin":
+        if not doc.has_value_changed("actual_qty"):
+            return
+    elif not flt(doc.actual_qty):
+        return
+
+    pending = getattr(frappe.local, "posa_pending_stock_changes", None)
+    if pending is None:
+        pending = frappe.local.posa_pending_stock_changes = {}
+        frappe.db.before_commit.add(_flush_stock_changes)
+        frappe.db.after_rollback.add(_drop_stock_changes)
+    pending.setdefault((doc.item_code, doc.warehouse), doc.doctype)
+
+
+def _drop_stock_changes():
+    pending = getattr(frappe.local, "posa_pending_stock_changes", None) or {}
+    frappe.local.posa_pending_stock_changes = None
+    return pending
+
+
+def _flush_stock_changes():
+    for (item_code, warehouse), source_doctype in sorted(_drop_stock_changes().items()):
+        _log_change(item_code, source_doctype, warehouse=warehouse)
+
+
+def prune_item_change_log():
+    """Scheduled job removing journal rows past the retention window."""
+
+    cutoff = add_days(now_datetime(), -CHANGE_LOG_RETENTION_DAYS)
+    frappe.db.delete(CHANGE_LOG_DOCTYPE, {"creation": ["<", cutoff]})
+
+
+def _journal_bounds() -> tuple:
+    """Return the oldest retained entry and the newest one a cursor may pass."""
+
+    oldest = frappe.db.sql(f"select min(name) from `tab{CHANGE_LOG_DOCTYPE}`")
+    # Walks the primary key down from the top, so only the held back entries are read.
+    latest = frappe.db.sql(
+        f"""
+        select name from `tab{CHANGE_LOG_DOCTYPE}`
+        where creation <= %s
+        order by name desc
+        limit 1
+        """,
+        add_to_date(now_datetime(), seconds=-CURSOR_SAFETY_LAG),
+    )
+    return cint(oldest[0][0] if oldest else 0), cint(latest[0][0] if latest else 0)
+
+
+@frappe.whitelist()
+def get_item_changes(
+    pos_profile,
+    cursor=None,
+    price_list=None,
+    customer=None,
+    limit=None,
+    include_description=False,
+    include_image=False,
+    item_groups=None,
+):
+    """Return merged item rows changed since ``cursor``.
+
+    The response contains the next ``cursor``, the changed ``items`` shaped
+    exactly like :func:`get_items` rows, the ``removed`` item codes that are
+    no longer sellable for the profile and ``has_more`` when the page limit
+    was hit. ``reset`` is set when the cursor is missing or older than the
+    retained journal, in which case the client has to reload the catalogue.
+    Changes reach clients :data:`CURSOR_SAFETY_LAG` seconds after they are made.
+    """
+
+    profile, _ = _ensure_pos_profile(pos_profile)
+    price_list = price_list or profile.get("selling_price_list")
+    limit = min(cint(limit) or DEFAULT_CHANGE_LIMIT, MAX_CHANGE_LIMIT)
+    oldest, latest = _journal_bounds()
+
+    response: Dict[str, Any] = {
+        "cursor": latest,
+        "items": [],
+        "removed": [],
+        "has_more": False,
+        "reset": False,
+    }
+
+    cursor = cint(cursor) if cursor not in (None, "") else None
+    if cursor is None or (oldest and cursor < oldest - 1):
+        response["reset"] = True
+        return response
+
+    if cursor >= latest:
+        response["cursor"] = cursor
+        return response
+
+    params = {
+        "cursor": cursor,
+        "latest": latest,
+        "price_list": price_list or "",
+        "warehouses": tuple(get_warehouse_scope(profile.get("warehouse"))) or ("",),
+        "limit": limit,
+    }
+    rows = frappe.db.sql(
+        f"""
+        select name, item_code
+        from `tab{CHANGE_LOG_DOCTYPE}`
+        where name > %(cursor)s and name <= %(latest)s
+            and (ifnull(price_list, '') = '' or price_list = %(price_list)s)
+            and (ifnull(warehouse, '') = '' or warehouse in %(warehouses)s)
+        order by name
+        limit %(limit)s
+        """,
+        params,
+        as_dict=True,
+    )
+
+    if len(rows) >= limit:
+        response["has_more"] = True
+        response["cursor"] = rows[-1].name
+
+    item_codes = list(dict.fromkeys(row.item_code for row in rows))
+    if not item_codes:
+        return response
+
+    groups_ctx = _prepare_item_groups(profile.get("name"), item_groups)
+    plan = _build_search_plan(
+        profile,
+        "",
+        "",
+        len(item_codes),
+        None,
+        None,
+        None,
+        include_description,
+        include_image,
+        groups_ctx.groups,
+    )
+    plan = dataclasses.replace(plan, filters={**plan.filters, "name": ["in", item_codes]})
+
+    items_data = frappe.get_all("Item", filters=plan.filters, fields=plan.fields, order_by=plan.order_by)
+    changed: List[Dict[str, Any]] = []
+    if items_data:
+        _append_shaped_rows(changed, items_data, profile, price_list, customer, plan, apply_word_filter=False)
+
+    returned = {row.get("item_code") for row in changed}
+    response["items"] = changed
+    response["removed"] = [code for code in item_codes if code not in returned]
+    return response
@@ -2,31 +2,31 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import pickle
+from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import frappe
 from erpnext.setup.utils import get_exchange_rate
 from erpnext.stock.doctype.batch.batch import get_batch_qty
 from frappe.utils import flt, nowdate
-from frappe.utils.caching import redis_cache
 
+from .instrumentation import record_cache_lookup
+from .utils import get_warehouse_scope
 
-def _resolve_cache_ttl(ttl: Optional[int]) -> int:
-    """Return a numeric TTL value while falling back to the default window."""
 
-    return int(ttl) if ttl else 300
+# Item caches are evicted by document hooks, so entries can live much longer
+# than a plain TTL cache would allow.
+DEFAULT_ITEM_CACHE_TTL = 6 * 60 * 60
+
+ITEM_CACHE_KINDS = ("price", "bin", "meta", "barcode", "uom", "batch", "serial", "attr")
 
 
-def _cache_wrapper(store: Dict[int, Callable[..., Any]], ttl: Optional[int], fn: Callable[..., Any]):
-    """Memoize the redis cache decorator for a given TTL to avoid re-wrapping."""
+def _resolve_cache_ttl(ttl: Optional[int]) -> int:
+    """Return a numeric TTL value while falling back to the default window."""
 
-    resolved_ttl = _resolve_cache_ttl(ttl)
-    cached = store.get(resolved_ttl)
-    if cached is None:
-        cached = redis_cache(ttl=resolved_ttl)(fn)
-        store[resolved_ttl] = cached
-    return cached
+    return int(ttl) if ttl else DEFAULT_ITEM_CACHE_TTL
 
 
 def _normalize_codes(codes: Iterable[str]) -> Tuple[str, ...]:
@@ -35,13 +35,182 @@ def _normalize_codes(codes: Iterable[str]) -> Tuple[str, ...]:
     return tuple(sorted({code for code in codes if code}))
 
 
-_price_cache: Dict[int, Callable[..., Any]] = {}
-_bin_cache: Dict[int, Callable[..., Any]] = {}
-_meta_cache: Dict[int, Callable[..., Any]] = {}
-_barcode_cache: Dict[int, Callable[..., Any]] = {}
-_uom_cache: Dict[int, Callable[..., Any]] = {}
-_batch_cache: Dict[int, Callable[..., Any]] = {}
-_serial_cache: Dict[int, Callable[..., Any]] = {}
+def _item_cache_key(kind: str, item_code: str) -> str:
+    """Return the redis hash holding all cached ``kind`` rows of one item.
+
+    Hash fields carry the remaining lookup scope (price list, warehouse...),
+    so evicting an item drops every scope with a single delete.
+    """
+
+    return f"posa_item_cache:{kind}:{item_code}"
+
+
+def _item_generation_key(kind: str, item_code: str) -> str:
+    """Return the counter bumped on every eviction of one item's ``kind`` cache."""
+
+    return f"posa_item_cache_gen:{kind}:{item_code}"
+
+
+# Write a loaded entry back only if the item was not evicted since the miss
+# was read: the rows may have been loaded before the evicting commit.
+_WRITE_IF_CURRENT = """
+if (redis.call("get", KEYS[2]) or "") == ARGV[1] then
+    redis.call("hset", KEYS[1], ARGV[2], ARGV[3])
+    redis.call("expire", KEYS[1], ARGV[4])
+end
+"""
+
+
+@dataclass(frozen=True)
+class CacheSpec:
+    """Describe one per-item cache: its kind, scope and how to load misses."""
+
+    kind: str
+    scope: str
+    fetch: Callable[[Tuple[str, ...]], List[Any]]
+    item_field: str
+
+
+def read_item_caches(
+    requests: Sequence[Tuple[Optional[CacheSpec], Iterable[str]]],
+    ttl: Optional[int],
+) -> List[List[Any]]:
+    """Resolve several per-item cache lookups with one redis round trip.
+
+    Every ``(spec, item_codes)`` request is answered with the rows of all its
+    items. Cached items of all requests are read in a single pipeline,
+    together with each item's eviction generation; the misses of each
+    request are loaded with one bulk ``fetch`` call and written back per
+    item, including empty results so items without rows are not queried
+    again. A write back is skipped when the item was evicted in between.
+    A ``None`` spec yields an empty result.
+    """
+
+    cache = frappe.cache()
+    normalized = [
+        (spec, _normalize_codes(codes) if spec else tuple()) for spec, codes in requests
+    ]
+
+    lookups = [(spec, code) for spec, codes in normalized for code in codes]
+    try:
+        pipe = cache.pipeline()
+        for spec, code in lookups:
+            pipe.hget(cache.make_key(_item_cache_key(spec.kind, code)), spec.scope)
+            pipe.get(cache.make_key(_item_generation_key(spec.kind, code)))
+        replies = pipe.execute() if lookups else []
+        cached = iter(zip(replies[::2], replies[1::2], strict=True))
+    except Exception:
+        cached = iter([(None, None)] * len(lookups))
+
+    results: List[List[Any]] = []
+    writes: List[Tuple[str, str, str, Any, List[Any]]] = []
+    for spec, codes in normalized:
+        rows: List[Any] = []
+        misses: List[str] = []
+        generations: Dict[str, Any] = {}
+        for code in codes:
+            raw, generations[code] = next(cached)
+            if raw is None:
+                misses.append(code)
+            else:
+                rows.extend(pickle.loads(raw))
+
+        if misses:
+            fetched = spec.fetch(tuple(misses)) or []
+            grouped: Dict[str, List[Any]] = {code: [] for code in misses}
+            for row in fetched:
+                grouped.setdefault(row.get(spec.item_field), []).append(row)
+            writes.extend(
+                (
+                    _item_cache_key(spec.kind, code),
+                    _item_generation_key(spec.kind, code),
+                    spec.scope,
+                    generations.get(code),
+                    item_rows,
+                )
+                for code, item_rows in grouped.items()
+            )
+            rows.extend(fetched)
+
+        results.append(rows)
+        record_cache_lookup(len(codes) - len(misses), len(misses))
+
+    if writes:
+        try:
+            pipe = cache.pipeline()
+            for key, generation_key, scope, generation, item_rows in writes:
+                pipe.eval(
+                    _WRITE_IF_CURRENT,
+                    2,
+                    cache.make_key(key),
+                    cache.make_key(generation_key),
+                    generation or "",
+                    scope,
+                    pickle.dumps(item_rows),
+                    _resolve_cache_ttl(ttl),
+                )
+            pipe.execute()
+        except Exception:
+            pass
+
+    return results
+
+
+def _cached_per_item(spec: Optional[CacheSpec], item_codes: Iterable[str], ttl: Optional[int]) -> List[Any]:
+    """Return rows for ``item_codes`` from the per-item cache described by ``spec``."""
+
+    return read_item_caches([(spec, item_codes)], ttl)[0]
+
+
+def evict_item_caches(item_codes: Iterable[str], kinds: Sequence[str] = ITEM_CACHE_KINDS) -> None:
+    """Drop the cached ``kinds`` entries of the given items.
+
+    Each eviction also bumps the entry's generation, so a request that read
+    the item before the eviction does not write its rows back afterwards.
+    """
+
+    pairs = [(kind, code) for code in _normalize_codes(item_codes) for kind in kinds]
+    if not pairs:
+        return
+
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.delete(*(cache.make_key(_item_cache_key(kind, code)) for kind, code in pairs))
+    for kind, code in pairs:
+        generation_key = cache.make_key(_item_generation_key(kind, code))
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, DEFAULT_ITEM_CACHE_TTL)
+    pipe.execute()
+
+
+# Document fields pointing at the affected item and the caches a write touches.
+_EVICTION_RULES = {
+    "Item": ("name", ("meta", "barcode", "uom", "attr")),
+    "Item Price": ("item_code", ("price",)),
+    "Bin": ("item_code", ("bin", "batch")),
+    "Stock Ledger Entry": ("item_code", ("bin", "batch", "serial")),
+    "Batch": ("item", ("batch",)),
+    "Serial No": ("item_code", ("serial",)),
+}
+
+
+def invalidate_item_caches(doc, method=None, *args):
+    """Document hook evicting exactly the cache entries affected by ``doc``.
+
+    Eviction runs after the transaction commits, otherwise a concurrent
+    request could re-populate the entry from the old committed state.
+    """
+
+    rule = _EVICTION_RULES.get(doc.doctype)
+    if not rule:
+        return
+
+    item_field, kinds = rule
+    item_codes = [doc.get(item_field)]
+    if method == "after_rename" and args:
+        item_codes.append(args[0])
+
+    frappe.db.after_commit.add(partial(evict_item_caches, item_codes, kinds))
 
 
 def _fetch_item_prices(
@@ -51,7 +220,11 @@ def _fetch_item_prices(
     customer: str,
     today: str,
 ):
-    """Return raw Item Price rows honoring date, currency and customer filters."""
+    """Return raw Item Price rows honoring date, currency and customer filters.
+
+    Batch specific rows are included with their ``batch_no``; see
+    :func:`price_rows_by_uom`.
+    """
 
     if not item_codes:
         return []
@@ -63,13 +236,15 @@ def _fetch_item_prices(
         "today": today,
         "customer": customer or "",
     }
-    query = """
+    batch_column = "batch_no" if frappe.db.has_column("Item Price", "batch_no") else "NULL AS batch_no"
+    query = f"""
                     SELECT
                             item_code,
                             price_list_rate,
                             currency,
                             uom,
-                            customer
+                            customer,
+                            batch_no
                     FROM (
                             SELECT
                                     item_code,
@@ -77,6 +252,7 @@ def _fetch_item_prices(
                                     currency,
                                     uom,
                                     customer,
+                                    {batch_column},
                                     valid_from,
                                     valid_upto
                             FROM `tabItem Price`
@@ -95,6 +271,7 @@ def _fetch_item_prices(
                                     currency,
                                     uom,
                                     customer,
+                                    {batch_column},
                                     valid_from,
                                     valid_upto
                             FROM `tabItem Price`
@@ -122,8 +299,25 @@ def get_item_prices(
 ):
     """Fetch Item Price data with optional redis caching based on TTL."""
 
-    cached = _cache_wrapper(_price_cache, ttl, _fetch_item_prices)
-    return cached(price_list, currency, tuple(item_codes), customer or "", today or nowdate())
+    return _cached_per_item(price_cache_spec(price_list, currency, customer, today), item_codes, ttl)
+
+
+def price_cache_spec(
+    price_list: str,
+    currency: str,
+    customer: Optional[str],
+    today: Optional[str] = None,
+) -> CacheSpec:
+    """Return the cache spec for selling prices of one price list and customer."""
+
+    customer = customer or ""
+    today = today or nowdate()
+    return CacheSpec(
+        "price",
+        f"{price_list}|{currency}|{customer}|{today}",
+        lambda codes: _fetch_item_prices(price_list, currency, codes, customer, today),
+        "item_code",
+    )
 
 
 def _fetch_bin_qty(warehouse: str, item_codes: Tuple[str, ...]):
@@ -132,32 +326,32 @@ def _fetch_bin_qty(warehouse: str, item_codes: Tuple[str, ...]):
     if not item_codes or not warehouse:
         return []
 
-    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-        warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-        if not warehouses:
-            return []
-        return frappe.get_all(
-            "Bin",
-            fields=["item_code", "sum(actual_qty) as actual_qty"],
-            filters={
-                "warehouse": ["in", warehouses],
-                "item_code": ["in", item_codes],
-            },
-            group_by="item_code",
-        )
-
+    warehouses = get_warehouse_scope(warehouse)
+    if not warehouses:
+        return []
     return frappe.get_all(
         "Bin",
-        fields=["item_code", "actual_qty"],
-        filters={"warehouse": warehouse, "item_code": ["in", item_codes]},
+        fields=["item_code", "sum(actual_qty) as actual_qty"],
+        filters={
+            "warehouse": ["in", warehouses],
+            "item_code": ["in", item_codes],
+        },
+        group_by="item_code",
     )
 
 
 def get_bin_qty(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Return cached Bin quantities when a warehouse and codes are provided."""
 
-    cached = _cache_wrapper(_bin_cache, ttl, _fetch_bin_qty)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_per_item(bin_cache_spec(warehouse), item_codes, ttl)
+
+
+def bin_cache_spec(warehouse: Optional[str]) -> Optional[CacheSpec]:
+    """Return the cache spec for Bin quantities, or ``None`` without a warehouse."""
+
+    if not warehouse:
+        return None
+    return CacheSpec("bin", warehouse, lambda codes: _fetch_bin_qty(warehouse, codes), "item_code")
 
 
 def _fetch_item_meta(item_codes: Tuple[str, ...]):
@@ -175,8 +369,7 @@ def _fetch_item_meta(item_codes: Tuple[str, ...]):
 def get_item_meta(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch Item metadata with caching support."""
 
-    cached = _cache_wrapper(_meta_cache, ttl, _fetch_item_meta)
-    return cached(tuple(item_codes))
+    return _cached_per_item(META_CACHE, item_codes, ttl)
 
 
 def _fetch_barcodes(item_codes: Tuple[str, ...]):
@@ -194,8 +387,7 @@ def _fetch_barcodes(item_codes: Tuple[str, ...]):
 def get_barcodes(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch Item Barcode entries while respecting the configured TTL."""
 
-    cached = _cache_wrapper(_barcode_cache, ttl, _fetch_barcodes)
-    return cached(tuple(item_codes))
+    return _cached_per_item(BARCODE_CACHE, item_codes, ttl)
 
 
 def _fetch_uoms(item_codes: Tuple[str, ...]):
@@ -213,8 +405,7 @@ def _fetch_uoms(item_codes: Tuple[str, ...]):
 def get_uoms(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch UOM Conversion Detail rows with redis caching support."""
 
-    cached = _cache_wrapper(_uom_cache, ttl, _fetch_uoms)
-    return cached(tuple(item_codes))
+    return _cached_per_item(UOM_CACHE, item_codes, ttl)
 
 
 def _fetch_batches(warehouse: str, item_codes: Tuple[str, ...]):
@@ -246,8 +437,15 @@ def _fetch_batches(warehouse: str, item_codes: Tuple[str, ...]):
 def get_batches(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch batch availability constrained to the provided warehouse."""
 
-    cached = _cache_wrapper(_batch_cache, ttl, _fetch_batches)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_per_item(batch_cache_spec(warehouse), item_codes, ttl)
+
+
+def batch_cache_spec(warehouse: Optional[str]) -> Optional[CacheSpec]:
+    """Return the cache spec for batch availability in ``warehouse``."""
+
+    if not warehouse:
+        return None
+    return CacheSpec("batch", warehouse, lambda codes: _fetch_batches(warehouse, codes), "item_code")
 
 
 def _fetch_serials(warehouse: str, item_codes: Tuple[str, ...]):
@@ -269,8 +467,33 @@ def _fetch_serials(warehouse: str, item_codes: Tuple[str, ...]):
 def get_serials(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch serial number data while honouring the redis cache TTL."""
 
-    cached = _cache_wrapper(_serial_cache, ttl, _fetch_serials)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_per_item(serial_cache_spec(warehouse), item_codes, ttl)
+
+
+def serial_cache_spec(warehouse: Optional[str]) -> Optional[CacheSpec]:
+    """Return the cache spec for active serial numbers in ``warehouse``."""
+
+    if not warehouse:
+        return None
+    return CacheSpec("serial", warehouse, lambda codes: _fetch_serials(warehouse, codes), "item_code")
+
+
+def _fetch_color_size(item_codes: Tuple[str, ...]):
+    """Return the Color/Size variant attributes shown on POS item cards."""
+
+    if not item_codes:
+        return []
+    return frappe.get_all(
+        "Item Variant Attribute",
+        filters={"parent": ["in", item_codes], "attribute": ["in", ["Color", "Size"]]},
+        fields=["parent", "attribute", "attribute_value"],
+    )
+
+
+META_CACHE = CacheSpec("meta", "-", _fetch_item_meta, "name")
+BARCODE_CACHE = CacheSpec("barcode", "-", _fetch_barcodes, "parent")
+UOM_CACHE = CacheSpec("uom", "-", _fetch_uoms, "parent")
+COLOR_SIZE_CACHE = CacheSpec("attr", "color_size", _fetch_color_size, "parent")
 
 
 @dataclass(frozen=True)
@@ -282,6 +505,27 @@ class ItemLookupData:
     barcode_map: Dict[str, List[Dict[str, Any]]]
     batch_map: Dict[str, List[Dict[str, Any]]]
     serial_map: Dict[str, List[Dict[str, Any]]]
+    color_size_map: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+def price_rows_by_uom(rows: Iterable[Any], batch_no: Optional[str] = None) -> Dict[str, frappe._dict]:
+    """Map each UOM to the Item Price row that applies to it.
+
+    Rows come ordered by customer and validity, so later rows win. Batch
+    specific rows only apply to a line of that batch, where they override
+    the item's general rows.
+    """
+
+    by_uom: Dict[str, frappe._dict] = {}
+    batch_rows: Dict[str, frappe._dict] = {}
+    for row in rows:
+        row_batch = row.get("batch_no")
+        if not row_batch:
+            by_uom[row.get("uom") or "None"] = row
+        elif row_batch == batch_no:
+            batch_rows[row.get("uom") or "None"] = row
+    by_uom.update(batch_rows)
+    return by_uom
 
 
 def _select_price(
@@ -316,6 +560,73 @@ def _ensure_stock_uom(uoms: List[Dict[str, Any]], stock_uom: Optional[str]) -> L
     return uoms
 
 
+def merge_item_rows(
+    items: Iterable[Dict[str, Any]],
+    lookup_data: ItemLookupData,
+    price_list_currency: Optional[str],
+    exchange_rate: float,
+) -> List[Dict[str, Any]]:
+    """Merge lookup data into a page of POS item rows in a single pass.
+
+    The per-item columns (UOMs, barcodes, stock, batches, serials, default
+    price and Color/Size) are resolved once per item code; every output row
+    is then one dict built from the item and those columns. A price is only
+    selected again for rows asking for a specific ``uom``.
+    """
+
+    meta_map = lookup_data.meta_map
+    price_map = lookup_data.price_map
+    shared = {
+        "price_list_currency": price_list_currency,
+        "plc_conversion_rate": exchange_rate,
+        "conversion_rate": exchange_rate,
+    }
+    columns: Dict[str, Tuple[Dict[str, Any], Dict[str, frappe._dict], Optional[str], Optional[str]]] = {}
+
+    result: List[Dict[str, Any]] = []
+    append = result.append
+    for item in items:
+        item_code = item.get("item_code")
+        if not item_code:
+            append(dict(item))
+            continue
+
+        column = columns.get(item_code)
+        if column is None:
+            meta = meta_map.get(item_code) or {}
+            stock_uom = meta.get("stock_uom")
+            price_rows = price_map.get(item_code) or {}
+            price_row = _select_price(price_rows, None, stock_uom) if price_rows else None
+            rate = price_row.get("price_list_rate") if price_row else 0
+            fields = {
+                "item_uoms": _ensure_stock_uom(lookup_data.uom_map.get(item_code), stock_uom),
+                "item_barcode": lookup_data.barcode_map.get(item_code, []),
+                "actual_qty": lookup_data.stock_map.get(item_code, 0) or 0,
+                "has_batch_no": meta.get("has_batch_no"),
+                "has_serial_no": meta.get("has_serial_no"),
+                "batch_no_data": lookup_data.batch_map.get(item_code, []),
+                "serial_no_data": lookup_data.serial_map.get(item_code, []),
+                "rate": rate,
+                "price_list_rate": rate,
+                "currency": (price_row.get("currency") if price_row else None) or price_list_currency,
+                **shared,
+                **lookup_data.color_size_map.get(item_code, {}),
+            }
+            column = columns[item_code] = (fields, price_rows, stock_uom, meta.get("item_name"))
+
+        fields, price_rows, stock_uom, meta_item_name = column
+        row = {**item, **fields}
+        if item.get("uom") and price_rows:
+            price_row = _select_price(price_rows, item.get("uom"), stock_uom)
+            row["rate"] = row["price_list_rate"] = price_row.get("price_list_rate")
+            row["currency"] = price_row.get("currency") or price_list_currency
+        if not row.get("item_name") and meta_item_name:
+            row["item_name"] = meta_item_name
+        append(row)
+
+    return result
+
+
 def merge_item_row(
     item: Dict[str, Any],
     lookup_data: ItemLookupData,
@@ -324,36 +635,7 @@ def merge_item_row(
 ) -> Dict[str, Any]:
     """Merge lookup data into a POS item row for downstream consumption."""
 
-    item_code = item.get("item_code")
-    if not item_code:
-        return dict(item)
-
-    meta = lookup_data.meta_map.get(item_code, frappe._dict())
-    uoms = _ensure_stock_uom(lookup_data.uom_map.get(item_code, []), meta.get("stock_uom"))
-    price_row = _select_price(lookup_data.price_map.get(item_code, {}), item.get("uom"), meta.get("stock_uom"))
-    price_currency = price_row.get("currency") if price_row else None
-
-    row = dict(item)
-    row.update(
-        {
-            "item_uoms": uoms,
-            "item_barcode": lookup_data.barcode_map.get(item_code, []),
-            "actual_qty": lookup_data.stock_map.get(item_code, 0) or 0,
-            "has_batch_no": meta.get("has_batch_no"),
-            "has_serial_no": meta.get("has_serial_no"),
-            "batch_no_data": lookup_data.batch_map.get(item_code, []),
-            "serial_no_data": lookup_data.serial_map.get(item_code, []),
-            "rate": price_row.get("price_list_rate") if price_row else 0,
-            "price_list_rate": price_row.get("price_list_rate") if price_row else 0,
-            "currency": price_currency or price_list_currency,
-            "price_list_currency": price_list_currency,
-            "plc_conversion_rate": exchange_rate,
-            "conversion_rate": exchange_rate,
-        }
-    )
-    if not row.get("item_name") and meta.get("item_name"):
-        row["item_name"] = meta.get("item_name")
-    return row
+    return merge_item_rows([item], lookup_data, price_list_currency, exchange_rate)[0]
 
 
 class ItemDetailAggregator:
@@ -422,31 +704,43 @@ class ItemDetailAggregator:
         if not item_codes_tuple:
             return ItemLookupData({}, {}, {}, {}, {}, {}, {})
 
-        price_rows = []
+        price_spec = None
         if self.price_list:
-            price_rows = get_item_prices(
+            price_spec = price_cache_spec(
                 self.price_list,
                 self.price_list_currency or self.pos_profile.get("currency"),
-                item_codes_tuple,
                 self.customer,
                 today=self.today,
-                ttl=self.cache_ttl,
             )
-        # Stock, metadata, UOM and barcode data are reused both for batches and the
-        # final merged item rows, so collect them up front.
-        stock_rows = get_bin_qty(self.warehouse, item_codes_tuple, ttl=self.cache_ttl)
-        meta_rows = get_item_meta(item_codes_tuple, ttl=self.cache_ttl)
-        uom_rows = get_uoms(item_codes_tuple, ttl=self.cache_ttl)
-        barcode_rows = get_barcodes(item_codes_tuple, ttl=self.cache_ttl)
+        # Every item is cached on its own, so overlapping pages and searches share
+        # entries. Item level data is resolved in one round trip; batch and serial
+        # lookups depend on the item metadata and follow in a second one.
+        price_rows, stock_rows, meta_rows, uom_rows, barcode_rows, attr_rows = read_item_caches(
+            [
+                (price_spec, item_codes_tuple),
+                (bin_cache_spec(self.warehouse), item_codes_tuple),
+                (META_CACHE, item_codes_tuple),
+                (UOM_CACHE, item_codes_tuple),
+                (BARCODE_CACHE, item_codes_tuple),
+                (COLOR_SIZE_CACHE, item_codes_tuple),
+            ],
+            self.cache_ttl,
+        )
 
         batch_items = [row.name for row in meta_rows if row.get("has_batch_no")]
         serial_items = [row.name for row in meta_rows if row.get("has_serial_no")]
-        batch_rows = get_batches(self.warehouse, _normalize_codes(batch_items), ttl=self.cache_ttl)
-        serial_rows = get_serials(self.warehouse, _normalize_codes(serial_items), ttl=self.cache_ttl)
+        batch_rows, serial_rows = read_item_caches(
+            [
+                (batch_cache_spec(self.warehouse), batch_items),
+                (serial_cache_spec(self.warehouse), serial_items),
+            ],
+            self.cache_ttl,
+        )
 
-        price_map: Dict[str, Dict[str, frappe._dict]] = {}
+        rows_by_item: Dict[str, List[frappe._dict]] = {}
         for row in price_rows:
-            price_map.setdefault(row.item_code, {})[row.get("uom") or "None"] = row
+            rows_by_item.setdefault(row.item_code, []).append(row)
+        price_map = {code: price_rows_by_uom(rows) for code, rows in rows_by_item.items()}
 
         stock_map = {row.item_code: row.actual_qty for row in stock_rows}
         meta_map = {row.name: row for row in meta_rows}
@@ -477,6 +771,14 @@ class ItemDetailAggregator:
         for row in serial_rows:
             serial_map.setdefault(row.item_code, []).append({"serial_no": row.serial_no})
 
+        color_size_map: Dict[str, Dict[str, Any]] = {}
+        for row in attr_rows:
+            entry = color_size_map.setdefault(row.parent, {})
+            if row.attribute == "Color":
+                entry["color"] = row.attribute_value
+            elif row.attribute == "Size":
+                entry["size"] = row.attribute_value
+
         return ItemLookupData(
             price_map=price_map,
             stock_map=stock_map,
@@ -485,57 +787,29 @@ class ItemDetailAggregator:
             barcode_map=barcode_map,
             batch_map=batch_map,
             serial_map=serial_map,
+            color_size_map=color_size_map,
         )
 
     def build_details(self, items_data: Sequence[Dict[str, object]]) -> List[Dict[str, object]]:
         """Produce enriched item detail rows for all non-template items."""
 
-        item_codes = [
-            item.get("item_code")
-            for item in items_data
-            if item.get("item_code") and not item.get("has_variants")
-        ]
-        lookup_data = self._prepare_lookup(item_codes)
-
-        color_size_map = {}
-        if item_codes:
-            attr_rows = frappe.db.get_all(
-                "Item Variant Attribute",
-                filters={"parent": ["in", item_codes], "attribute": ["in", ["Color", "Size"]]},
-                fields=["parent", "attribute", "attribute_value"],
-            )
-            for row in attr_rows:
-                entry = color_size_map.setdefault(row.parent, {})
-                if row.attribute == "Color":
-                    entry["color"] = row.attribute_value
-                elif row.attribute == "Size":
-                    entry["size"] = row.attribute_value
-
-        result = []
-        for item in items_data:
-            if not item.get("item_code") or item.get("has_variants"):
-                continue
-
-            merged = merge_item_row(
-                item,
-                lookup_data,
-                self.price_list_currency or self.pos_profile.get("currency"),
-                self.exchange_rate,
-            )
-
-            attrs = color_size_map.get(item["item_code"])
-            if attrs:
-                merged.update(attrs)
-
-            result.append(merged)
-
-        return result
+        items = [item for item in items_data if item.get("item_code") and not item.get("has_variants")]
+        lookup_data = self._prepare_lookup(item["item_code"] for item in items)
+        return merge_item_rows(
+            items,
+            lookup_data,
+            self.price_list_currency or self.pos_profile.get("currency"),
+            self.exchange_rate,
+        )
 
 
 __all__ = [
     "ItemDetailAggregator",
     "ItemLookupData",
+    "CacheSpec",
+    "read_item_caches",
     "get_item_prices",
+    "price_rows_by_uom",
     "get_bin_qty",
     "get_item_meta",
     "get_barcodes",
@@ -543,4 +817,7 @@ __all__ = [
     "get_batches",
     "get_serials",
     "merge_item_row",
+    "merge_item_rows",
+    "evict_item_caches",
+    "invalidate_item_caches",
 ]
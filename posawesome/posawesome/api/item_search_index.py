@@ -0,0 +1,414 @@
+"""In-memory item search index used by the POS item search.
+
+Each worker process keeps one index per POS Profile. The index holds the
+sellable Item rows of the profile in an inverted index: every token of their
+codes, names, brand, description, item group, barcodes and variant
+attributes maps to the sorted list of rows containing it. Search words are
+looked up as token prefixes over the sorted token list, and the rows of all
+words intersected; ``get_items(search_value=...)`` then applies its usual
+word filter to the shaped candidates.
+
+Item hooks publish the changed item codes after commit to a change feed in
+redis, and every worker re-indexes just those items on its next search.
+Changes that can move items in or out of a profile (item groups, POS
+Profiles) bump a shared version token instead, which rebuilds the indexes.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import frappe
+from frappe.utils import cint, cstr
+
+from .utils import get_item_groups
+
+INDEX_VERSION_KEY = "posa_item_search_index_version"
+INDEX_CHANGE_SEQ_KEY = "posa_item_search_index_seq"
+INDEX_CHANGES_KEY = "posa_item_search_index_changes"
+
+# How long a worker trusts its cached version token before asking redis again.
+VERSION_CHECK_INTERVAL = 2.0
+
+# Changes kept in the feed; a worker further behind rebuilds its indexes.
+MAX_INDEX_CHANGES = 1000
+
+INDEX_FIELDS = [
+    "name",
+    "item_code",
+    "item_name",
+    "stock_uom",
+    "is_stock_item",
+    "has_variants",
+    "variant_of",
+    "item_group",
+    "idx",
+    "has_batch_no",
+    "has_serial_no",
+    "max_discount",
+    "brand",
+    "description",
+    "image",
+    "modified",
+]
+
+# Filters applied while building the index; searches never need to re-check them.
+BASE_FILTERS = {"disabled": 0, "is_sales_item": 1, "is_fixed_asset": 0}
+
+# Takes the next sequence number and files the item codes under it in one
+# step, so a reader never sees a sequence whose codes are still missing.
+_PUBLISH_CHANGES = """
+local seq = redis.call("incr", KEYS[1])
+for i = 2, #ARGV do
+    redis.call("zadd", KEYS[2], seq, ARGV[i])
+end
+redis.call("zremrangebyscore", KEYS[2], "-inf", seq - tonumber(ARGV[1]))
+return seq
+"""
+
+
+def tokenize(values: Iterable[Any]) -> Set[str]:
+    """Return the lower-cased tokens a row with ``values`` can be found by.
+
+    Every whitespace separated chunk is a token, and so is each of its
+    tails after a punctuation character: ``CC-330`` is found by ``cc-3``
+    and by ``330``.
+    """
+
+    tokens: Set[str] = set()
+    for value in values:
+        for chunk in cstr(value).lower().split():
+            tokens.add(chunk)
+            for position, char in enumerate(chunk[:-1]):
+                if not char.isalnum():
+                    tokens.add(chunk[position + 1 :])
+    return tokens
+
+
+@dataclass
+class ItemSearchIndex:
+    """Item rows of a profile plus the token posting lists pointing at them.
+
+    Rows keep their slot for as long as they are indexed; a re-indexed item
+    gets a new slot at the end, so posting lists stay sorted by appending.
+    """
+
+    version: str
+    seq: int = 0
+    rows: List[Optional[Dict[str, Any]]] = field(default_factory=list)
+    code_map: Dict[str, int] = field(default_factory=dict)
+    tokens: List[str] = field(default_factory=list)
+    postings: Dict[str, List[int]] = field(default_factory=dict)
+    row_tokens: Dict[int, Set[str]] = field(default_factory=dict)
+    checked_at: float = field(default=0.0)
+
+    def add(self, row: Dict[str, Any], values: Iterable[Any]):
+        """Index ``row`` under the tokens of ``values``, replacing its old entry."""
+
+        self.remove(row["item_code"])
+        slot = len(self.rows)
+        self.rows.append(row)
+        self.code_map[row["item_code"]] = slot
+        self.row_tokens[slot] = tokenize(values)
+        for token in self.row_tokens[slot]:
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = [slot]
+                insort(self.tokens, token)
+            else:
+                posting.append(slot)
+
+    def remove(self, item_code: str):
+        slot = self.code_map.pop(item_code, None)
+        if slot is None:
+            return
+        self.rows[slot] = None
+        for token in self.row_tokens.pop(slot):
+            posting = self.postings[token]
+            del posting[bisect_left(posting, slot)]
+            if not posting:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+
+    def _prefix_slots(self, word: str) -> Set[int]:
+        slots: Set[int] = set()
+        position = bisect_left(self.tokens, word)
+        while position < len(self.tokens) and self.tokens[position].startswith(word):
+            slots.update(self.postings[self.tokens[position]])
+            position += 1
+        return slots
+
+    def _sort_key(self, slot: int) -> Tuple[str, str]:
+        row = self.rows[slot]
+        return cstr(row.get("item_name")).casefold(), cstr(row.get("name")).casefold()
+
+    def match(self, words: Sequence[str]) -> List[int]:
+        """Return slots of rows having a token starting with every word.
+
+        The result follows the ``item_name, name`` order of the item query.
+        """
+
+        words = sorted({cstr(word).lower() for word in words if word}, key=len, reverse=True)
+        if not words:
+            return sorted(self.code_map.values(), key=self._sort_key)
+
+        candidates: Optional[Set[int]] = None
+        for word in words:
+            slots = self._prefix_slots(word)
+            candidates = slots if candidates is None else candidates & slots
+            if not candidates:
+                return []
+        return sorted(candidates, key=self._sort_key)
+
+
+_indexes: Dict[str, ItemSearchIndex] = {}
+_indexes_lock = threading.RLock()
+
+
+def get_index_version() -> str:
+    """Return the shared index version token, creating one when missing."""
+
+    version = frappe.cache().get_value(INDEX_VERSION_KEY)
+    if not version:
+        version = bump_index_version()
+    return cstr(version)
+
+
+def bump_index_version() -> str:
+    """Publish a new version token so every worker rebuilds its indexes."""
+
+    version = frappe.generate_hash(length=12)
+    frappe.cache().set_value(INDEX_VERSION_KEY, version)
+    return version
+
+
+def invalidate_item_search_index(doc=None, method=None, *args):
+    """Document hook: rebuild all item search indexes once committed."""
+
+    frappe.db.after_commit.add(bump_index_version)
+
+
+def _publish_item_changes(item_codes: Sequence[str]) -> int:
+    """Append ``item_codes`` to the change feed and return their sequence number."""
+
+    cache = frappe.cache()
+    return cint(
+        cache.eval(
+            _PUBLISH_CHANGES,
+            2,
+            cache.make_key(INDEX_CHANGE_SEQ_KEY),
+            cache.make_key(INDEX_CHANGES_KEY),
+            MAX_INDEX_CHANGES,
+            *item_codes,
+        )
+    )
+
+
+def update_item_search_index(doc, method=None, *args):
+    """Item hook: re-index the item in every worker once committed.
+
+    ``after_rename`` passes the old name first, which is dropped as well.
+    """
+
+    item_codes = [doc.name]
+    if method == "after_rename" and args:
+        item_codes.append(args[0])
+    frappe.db.after_commit.add(partial(_publish_item_changes, item_codes))
+
+
+def _read_changes(since: int) -> Tuple[int, Optional[Set[str]]]:
+    """Return the feed's sequence number and the item codes changed after ``since``.
+
+    The codes are ``None`` when the feed no longer reaches back to ``since``.
+    """
+
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.get(cache.make_key(INDEX_CHANGE_SEQ_KEY))
+    pipe.zrangebyscore(cache.make_key(INDEX_CHANGES_KEY), since + 1, "+inf")
+    raw_seq, raw_codes = pipe.execute()
+    seq = cint(raw_seq)
+    if seq - since > MAX_INDEX_CHANGES:
+        return seq, None
+    return seq, {frappe.safe_decode(code) for code in raw_codes}
+
+
+def _fetch_index_rows(profile_name: str, item_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    filters: Dict[str, Any] = dict(BASE_FILTERS)
+    groups = get_item_groups(profile_name)
+    if groups:
+        filters["item_group"] = ["in", groups]
+    if item_codes is not None:
+        filters["name"] = ["in", list(item_codes)]
+
+    return frappe.get_all(
+        "Item",
+        filters=filters,
+        fields=INDEX_FIELDS,
+        order_by="item_name asc, name asc",
+        limit_page_length=0,
+    )
+
+
+def _group_children(doctype: str, fields: List[str], parents: Iterable[str]) -> Dict[str, List[Any]]:
+    grouped: Dict[str, List[Any]] = {}
+    parents = list(parents)
+    if not parents:
+        return grouped
+    for row in frappe.get_all(doctype, filters={"parent": ["in", parents]}, fields=["parent", *fields]):
+        grouped.setdefault(row.parent, []).append(row)
+    return grouped
+
+
+def _index_rows(index: ItemSearchIndex, rows: List[Dict[str, Any]]):
+    """Add ``rows`` to ``index`` with their barcodes and variant attributes.
+
+    Templates are also found by the attribute values of their variants.
+    """
+
+    names = [row.name for row in rows]
+    templates = [row.name for row in rows if row.has_variants]
+    variants: Dict[str, List[str]] = {}
+    if templates:
+        for variant in frappe.get_all(
+            "Item", filters={"variant_of": ["in", templates]}, fields=["name", "variant_of"]
+        ):
+            variants.setdefault(variant.variant_of, []).append(variant.name)
+
+    barcodes = _group_children("Item Barcode", ["barcode"], names)
+    attributes = _group_children(
+        "Item Variant Attribute",
+        ["attribute", "attribute_value"],
+        {*names, *(name for group in variants.values() for name in group)},
+    )
+
+    for row in rows:
+        values = [row.item_code, row.item_name, row.name, row.brand, row.description, row.item_group]
+        values.extend(b.barcode for b in barcodes.get(row.name, []))
+        for name in [row.name, *variants.get(row.name, [])]:
+            for attribute in attributes.get(name, []):
+                values.extend([attribute.attribute, attribute.attribute_value])
+        index.add(row, values)
+
+
+def build_index(profile_name: str, version: str, seq: int = 0) -> ItemSearchIndex:
+    """Load all sellable items of a profile and build their inverted index."""
+
+    index = ItemSearchIndex(version=version, seq=seq)
+    _index_rows(index, _fetch_index_rows(profile_name))
+    return index
+
+
+def _refresh_items(profile_name: str, index: ItemSearchIndex, item_codes: Set[str]):
+    """Re-index ``item_codes`` and the templates of any variant among them."""
+
+    rows = _fetch_index_rows(profile_name, item_codes)
+    templates = {row.variant_of for row in rows if row.variant_of}
+    for item_code in item_codes:
+        slot = index.code_map.get(item_code)
+        if slot is not None and index.rows[slot].get("variant_of"):
+            templates.add(index.rows[slot]["variant_of"])
+    templates -= item_codes
+    if templates:
+        rows.extend(_fetch_index_rows(profile_name, templates))
+
+    for item_code in item_codes:
+        index.remove(item_code)
+    _index_rows(index, rows)
+
+
+def get_index(profile_name: str) -> ItemSearchIndex:
+    """Return an up-to-date index for ``profile_name``.
+
+    The index is rebuilt when the version token moved or it fell behind the
+    change feed, and otherwise only the changed items are re-indexed.
+    """
+
+    now = time.monotonic()
+    with _indexes_lock:
+        index = _indexes.get(profile_name)
+        if index and now - index.checked_at < VERSION_CHECK_INTERVAL:
+            return index
+
+        version = get_index_version()
+        seq, item_codes = _read_changes(index.seq if index else 0)
+        if not index or index.version != version or item_codes is None:
+            # Items changing while this loads are replayed on the next check.
+            index = build_index(profile_name, version, seq)
+            _indexes[profile_name] = index
+        elif item_codes:
+            _refresh_items(profile_name, index, item_codes)
+            index.seq = seq
+        index.checked_at = now
+        return index
+
+
+def _like_matches(value: Any, pattern: str) -> bool:
+    regex = "^" + ".*".join(re.escape(part) for part in cstr(pattern).lower().split("%")) + "$"
+    return re.match(regex, cstr(value).lower(), re.DOTALL) is not None
+
+
+def _row_matches(row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Evaluate the subset of ORM filters produced by the search plan."""
+
+    for fieldname, condition in filters.items():
+        value = row.get(fieldname)
+        if not isinstance(condition, (list, tuple)):
+            if cstr(value) != cstr(condition) and value != condition:
+                return False
+            continue
+
+        operator, operand = condition[0], condition[1]
+        if operator == "in":
+            if value not in operand:
+                return False
+        elif operator == "like":
+            if not _like_matches(value, operand):
+                return False
+        elif operator == ">":
+            if value is None or cstr(value) <= cstr(operand):
+                return False
+        elif operator == "is":
+            is_set = value not in (None, "")
+            if (operand == "set") != is_set:
+                return False
+        else:
+            return False
+    return True
+
+
+def search_items(
+    profile_name: str,
+    search_words: Sequence[str],
+    filters: Dict[str, Any],
+    fields: Sequence[str],
+) -> Iterable[Dict[str, Any]]:
+    """Yield candidate item rows for ``search_words`` matching the plan ``filters``.
+
+    Rows are produced in ``item_name`` order and projected onto ``fields``.
+    Callers still apply the word filter to the shaped rows.
+    """
+
+    filters = {key: value for key, value in filters.items() if key not in BASE_FILTERS}
+
+    item_code = filters.pop("item_code", None)
+    with _indexes_lock:
+        index = get_index(profile_name)
+        if item_code and not isinstance(item_code, (list, tuple)):
+            slot = index.code_map.get(item_code)
+            slots = [slot] if slot is not None else []
+        else:
+            if item_code:
+                filters["item_code"] = item_code
+            slots = index.match(search_words)
+        rows = [index.rows[slot] for slot in slots]
+
+    for row in rows:
+        if _row_matches(row, filters):
+            yield {fieldname: row.get(fieldname) for fieldname in fields}
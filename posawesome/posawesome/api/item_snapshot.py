@@ -0,0 +1,124 @@
+"""Precomputed item catalogue snapshots shared by all terminals of a profile.
+
+A background job merges the full catalogue of a POS Profile / price list
+once and stores it zlib compressed in redis together with a content version. :func:`get_items` serves the snapshot to clients that opt in with a
+``snapshot_version`` and answers "not modified" when the client already holds
+the current version.
+
+A snapshot remembers the item search index version and the catalogue version
+it was built from; once either moves on the snapshot is rebuilt in the
+background and requests fall back to the live query meanwhile.
+
+Stock movements move neither, so snapshot rows carry no stock: the
+:data:`STOCK_FIELDS` are dropped and terminals load them with the item
+details after every catalogue load. Profiles that only display items in
+stock are never served from a snapshot, and neither are customers with
+prices of their own on the price list.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import now_datetime
+from frappe.utils.background_jobs import enqueue
+
+from .item_changes import get_catalogue_version
+from .item_search_index import get_index_version
+from .item_stream import DEFAULT_STREAM_PAGE_SIZE, iter_catalogue_pages
+from .utils import get_item_groups
+
+SNAPSHOT_KEY_PREFIX = "posa_item_snapshot"
+SNAPSHOT_TTL = 24 * 60 * 60
+# Detail fields that follow stock movements and are left out of snapshots.
+STOCK_FIELDS = ("actual_qty", "batch_no_data", "serial_no_data")
+
+
+def _snapshot_key(profile_name: str, price_list: Optional[str]) -> str:
+    return f"{SNAPSHOT_KEY_PREFIX}:{profile_name}:{price_list or ''}"
+
+
+def _source_state() -> str:
+    """Return a token that changes whenever catalogue data may have changed."""
+
+    return f"{get_index_version()}:{get_catalogue_version()}"
+
+
+def _has_customer_prices(price_list: Optional[str], customer: Optional[str]) -> bool:
+    if not (price_list and customer):
+        return False
+    return bool(frappe.db.exists("Item Price", {"price_list": price_list, "customer": customer}))
+
+
+def build_item_snapshot(profile_name: str, price_list: Optional[str]):
+    """Background job building and storing the catalogue snapshot."""
+
+    source = _source_state()
+    profile = frappe.get_doc("POS Profile", profile_name).as_dict()
+    rows: List[Dict[str, Any]] = []
+    for page in iter_catalogue_pages(
+        profile,
+        price_list,
+        None,
+        DEFAULT_STREAM_PAGE_SIZE,
+        include_description=False,
+        include_image=True,
+        item_groups=get_item_groups(profile_name),
+    ):
+        for row in page:
+            for field in STOCK_FIELDS:
+                row.pop(field, None)
+        rows.extend(page)
+
+    payload = zlib.compress(json.dumps(rows, default=str).encode())
+    snapshot = {
+        "version": hashlib.sha1(payload).hexdigest(),
+        "source": source,
+        "payload": payload,
+        "built_at": now_datetime(),
+    }
+    frappe.cache().set_value(_snapshot_key(profile_name, price_list), snapshot, expires_in_sec=SNAPSHOT_TTL)
+    return snapshot["version"]
+
+
+def _enqueue_build(profile_name: str, price_list: Optional[str]):
+    enqueue(
+        build_item_snapshot,
+        queue="long",
+        job_id=f"posa_item_snapshot::{profile_name}::{price_list or ''}",
+        deduplicate=True,
+        profile_name=profile_name,
+        price_list=price_list,
+    )
+
+
+def serve_item_snapshot(
+    profile_name: str,
+    price_list: Optional[str],
+    customer: Optional[str],
+    client_version: Optional[str],
+) -> Optional[List[Dict[str, Any]]]:
+    """Return snapshot rows for ``get_items`` or ``None`` to run the live query.
+
+    The current version is reported as ``snapshot_version`` in the response.
+    When it equals ``client_version`` no rows are sent and ``not_modified``
+    is set instead.
+    """
+
+    if _has_customer_prices(price_list, customer):
+        return None
+
+    snapshot = frappe.cache().get_value(_snapshot_key(profile_name, price_list))
+    if not snapshot or snapshot.get("source") != _source_state():
+        _enqueue_build(profile_name, price_list)
+        return None
+
+    frappe.response["snapshot_version"] = snapshot["version"]
+    if client_version and client_version == snapshot["version"]:
+        frappe.response["not_modified"] = 1
+        return []
+    return json.loads(zlib.decompress(snapshot["payload"]))
@@ -0,0 +1,125 @@
+"""Streaming item catalogue export used to bootstrap fresh terminals.
+
+:func:`stream_items` answers with gzip compressed NDJSON: one merged item row
+(price, stock, UOMs, barcodes...) per line, exactly as :func:`get_items`
+returns them. Rows are produced page by page while the response is sent, so
+server memory stays flat and the client can persist rows as they arrive.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint
+from werkzeug.wrappers import Response
+
+from .items import (
+    _append_shaped_rows,
+    _build_search_plan,
+    _ensure_pos_profile,
+    _prepare_item_groups,
+)
+
+DEFAULT_STREAM_PAGE_SIZE = 500
+MAX_STREAM_PAGE_SIZE = 2000
+
+
+def iter_catalogue_pages(
+    pos_profile: Dict[str, Any],
+    price_list: Optional[str],
+    customer: Optional[str],
+    page_size: int,
+    include_description: bool,
+    include_image: bool,
+    item_groups: List[str],
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield shaped catalogue rows one keyset page at a time."""
+
+    keyset: Optional[Tuple[str, str]] = None
+    while True:
+        plan = _build_search_plan(
+            pos_profile,
+            "",
+            "",
+            page_size,
+            None,
+            None,
+            None,
+            include_description,
+            include_image,
+            item_groups,
+            keyset,
+        )
+        items_data = frappe.get_all(
+            "Item",
+            filters=plan.filters,
+            or_filters=plan.or_filters or None,
+            fields=plan.fields,
+            limit_page_length=page_size,
+            order_by=plan.order_by,
+        )
+        if not items_data:
+            return
+
+        rows: List[Dict[str, Any]] = []
+        _append_shaped_rows(rows, items_data, pos_profile, price_list, customer, plan, apply_word_filter=False)
+        if rows:
+            yield rows
+
+        if len(items_data) < page_size:
+            return
+        keyset = (items_data[-1].item_name, items_data[-1].name)
+
+
+def _gzip_ndjson(site: str, user: str, **kwargs) -> Iterator[bytes]:
+    # The request context is torn down before werkzeug consumes the body, so the
+    # generator opens its own site connection for the duration of the stream.
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        frappe.set_user(user)
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        for rows in iter_catalogue_pages(**kwargs):
+            payload = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+            yield compressor.compress(payload.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        frappe.destroy()
+
+
+@frappe.whitelist()
+def stream_items(
+    pos_profile,
+    price_list=None,
+    customer=None,
+    page_size=None,
+    include_description=False,
+    include_image=False,
+    item_groups=None,
+):
+    """Stream the full item catalogue of a POS Profile as gzip NDJSON."""
+
+    profile, _ = _ensure_pos_profile(pos_profile)
+    page_size = min(cint(page_size) or DEFAULT_STREAM_PAGE_SIZE, MAX_STREAM_PAGE_SIZE)
+    groups_ctx = _prepare_item_groups(profile.get("name"), item_groups)
+
+    body = _gzip_ndjson(
+        frappe.local.site,
+        frappe.session.user,
+        pos_profile=profile,
+        price_list=price_list or profile.get("selling_price_list"),
+        customer=customer,
+        page_size=page_size,
+        include_description=cint(include_description),
+        include_image=cint(include_image),
+        item_groups=groups_ctx.groups,
+    )
+
+    response = Response(body, mimetype="application/x-ndjson", direct_passthrough=True)
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -4,6 +4,7 @@
 import json
 import re
 from dataclasses import dataclass
+from itertools import islice
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import frappe
@@ -13,16 +14,29 @@ from erpnext.stock.doctype.batch.batch import (
 )
 from erpnext.stock.get_item_details import get_item_details
 from frappe import _, as_json
-from frappe.utils import cstr, flt, get_datetime, nowdate
+from frappe.utils import cint, cstr, flt, get_datetime, nowdate
 from frappe.utils.background_jobs import enqueue
 from frappe.utils.caching import redis_cache
 
-from .item_fetchers import ItemDetailAggregator
+from .item_fetchers import (
+    ItemDetailAggregator,
+    _select_price,
+    get_item_meta,
+    get_item_prices,
+    price_rows_by_uom,
+)
+from .item_search_index import search_items
+from .scan_codes import (
+    get_scale_barcode_prefix,
+    lookup_scan_code,
+    parse_scale_barcode,
+)
 from .utils import (
     HAS_VARIANTS_EXCLUSION,
-    expand_item_groups,
     get_active_pos_profile,
     get_item_groups,
+    get_warehouse_scope,
+    resolve_item_groups,
 )
 
 
@@ -66,6 +80,7 @@ class SearchPlan:
     include_image: bool
     posa_display_items_in_stock: bool
     posa_show_template_items: bool
+    keyset: Optional[Tuple[str, str]] = None
 
 
 def normalize_brand(brand: str) -> str:
@@ -134,10 +149,10 @@ def get_stock_availability(item_code, warehouse):
     if not warehouse:
         return 0.0
 
-    warehouses = [warehouse]
-    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-        # Include all child warehouses when a group warehouse is set
-        warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
+    # Group warehouses expand to all of their child warehouses
+    warehouses = get_warehouse_scope(warehouse)
+    if not warehouses:
+        return 0.0
 
     rows = frappe.get_all(
         "Bin",
@@ -148,6 +163,117 @@ def get_stock_availability(item_code, warehouse):
     return flt(rows[0].actual_qty) if rows else 0.0
 
 
+def _expand_warehouses(warehouses) -> Dict[str, List[str]]:
+    """Map each warehouse to itself or, for groups, to its descendants."""
+
+    return {warehouse: get_warehouse_scope(warehouse) for warehouse in {w for w in warehouses if w}}
+
+
+def _bin_qty_map(pairs) -> Dict[Tuple[str, str], float]:
+    """Return ``{(item_code, warehouse): actual_qty}`` from one grouped Bin query."""
+
+    pairs = {(item_code, warehouse) for item_code, warehouse in pairs}
+    if not pairs:
+        return {}
+
+    scopes = _expand_warehouses(warehouse for _, warehouse in pairs)
+    leaf_warehouses = {leaf for leaves in scopes.values() for leaf in leaves}
+    if not leaf_warehouses:
+        return {}
+
+    rows = frappe.get_all(
+        "Bin",
+        fields=["item_code", "warehouse", "sum(actual_qty) as actual_qty"],
+        filters={
+            "item_code": ["in", list({item_code for item_code, _ in pairs})],
+            "warehouse": ["in", list(leaf_warehouses)],
+        },
+        group_by="item_code, warehouse",
+    )
+    leaf_qty = {(row.item_code, row.warehouse): flt(row.actual_qty) for row in rows}
+
+    return {
+        (item_code, warehouse): sum(leaf_qty.get((item_code, leaf), 0.0) for leaf in scopes.get(warehouse, []))
+        for item_code, warehouse in pairs
+    }
+
+
+def _batch_qty_map(pairs) -> Dict[Tuple[str, str], float]:
+    """Return ``{(batch_no, warehouse): qty}`` for submitted stock movements.
+
+    Quantities come from Serial and Batch Bundle entries plus legacy Stock
+    Ledger Entries that still carry ``batch_no`` directly, matching
+    ``get_batch_qty(batch_no, warehouse)``.
+    """
+
+    pairs = {(batch_no, warehouse) for batch_no, warehouse in pairs}
+    if not pairs:
+        return {}
+
+    params = {
+        "batches": tuple({batch_no for batch_no, _ in pairs}),
+        "warehouses": tuple({warehouse for _, warehouse in pairs}),
+    }
+    rows = frappe.db.sql(
+        """
+        select batch_no, warehouse, sum(qty) as qty
+        from (
+            select entry.batch_no, bundle.warehouse, entry.qty
+            from `tabSerial and Batch Entry` entry
+            inner join `tabSerial and Batch Bundle` bundle on bundle.name = entry.parent
+            where bundle.docstatus = 1
+                and bundle.is_cancelled = 0
+                and entry.batch_no in %(batches)s
+                and bundle.warehouse in %(warehouses)s
+            union all
+            select batch_no, warehouse, actual_qty as qty
+            from `tabStock Ledger Entry`
+            where is_cancelled = 0
+                and ifnull(serial_and_batch_bundle, '') = ''
+                and batch_no in %(batches)s
+                and warehouse in %(warehouses)s
+        ) batch_ledger
+        group by batch_no, warehouse
+        """,
+        params,
+        as_dict=True,
+    )
+    return {(row.batch_no, row.warehouse): flt(row.qty) for row in rows}
+
+
+def get_stock_availability_bulk(lines) -> List[float]:
+    """Return the available stock-UOM quantity of every line, in order.
+
+    Each line is a mapping with ``item_code``, ``warehouse`` and an optional
+    ``batch_no``; lines missing an item code or warehouse get ``0``. All lines
+    are resolved with one Bin query and one batch ledger query.
+    """
+
+    lines = list(lines or [])
+    bin_pairs = []
+    batch_pairs = []
+    for line in lines:
+        if not line.get("item_code") or not line.get("warehouse"):
+            continue
+        if line.get("batch_no"):
+            batch_pairs.append((line.get("batch_no"), line.get("warehouse")))
+        else:
+            bin_pairs.append((line.get("item_code"), line.get("warehouse")))
+
+    bin_qty = _bin_qty_map(bin_pairs)
+    batch_qty = _batch_qty_map(batch_pairs)
+
+    result = []
+    for line in lines:
+        if not line.get("item_code") or not line.get("warehouse"):
+            result.append(0.0)
+        elif line.get("batch_no"):
+            result.append(batch_qty.get((line.get("batch_no"), line.get("warehouse")), 0.0))
+        else:
+            result.append(bin_qty.get((line.get("item_code"), line.get("warehouse")), 0.0))
+    return result
+
+
 @frappe.whitelist()
 def get_available_qty(items):
     """Return available stock quantity for given items.
@@ -164,29 +290,17 @@ def get_available_qty(items):
     if isinstance(items, str):
         items = json.loads(items)
 
-    result = []
-    for it in items or []:
-        item_code = it.get("item_code")
-        warehouse = it.get("warehouse")
-        batch_no = it.get("batch_no")
-
-        if not item_code or not warehouse:
-            continue
-
-        if batch_no:
-            available_qty = get_batch_qty(batch_no, warehouse) or 0
-        else:
-            available_qty = get_stock_availability(item_code, warehouse)
+    lines = [it for it in items or [] if it.get("item_code") and it.get("warehouse")]
+    quantities = get_stock_availability_bulk(lines)
 
-        result.append(
-            {
-                "item_code": item_code,
-                "warehouse": warehouse,
-                "available_qty": flt(available_qty),
-            }
-        )
-
-    return result
+    return [
+        {
+            "item_code": it.get("item_code"),
+            "warehouse": it.get("warehouse"),
+            "available_qty": flt(available_qty),
+        }
+        for it, available_qty in zip(lines, quantities)
+    ]
 
 
 @frappe.whitelist()
@@ -203,10 +317,45 @@ def get_items(
     include_description=False,
     include_image=False,
     item_groups=None,
+    cursor=None,
+    snapshot_version=None,
 ):
+    """Return a page of POS item rows.
+
+    Pass ``cursor`` (the ``next_cursor`` of the previous response) together
+    with ``limit`` to page through the whole catalogue on the stable
+    ``(item_name, name)`` key instead of using ``offset``/``start_after``.
+
+    Clients loading the whole catalogue may pass ``snapshot_version`` (empty
+    on the first load) to be served from the shared catalogue snapshot. Its
+    rows carry no stock, which clients load with :func:`get_items_details`;
+    see :mod:`posawesome.posawesome.api.item_snapshot`.
+    """
     profile_ctx = _normalize_profile_context(pos_profile)
     groups_ctx = _prepare_item_groups(profile_ctx.profile_name, item_groups)
 
+    use_snapshot = (
+        snapshot_version is not None
+        and cint(include_image)
+        and not cint(include_description)
+        and not profile_ctx.pos_profile.get("posa_display_items_in_stock")
+        and _is_full_catalogue_request(
+            profile_ctx, groups_ctx, item_group, search_value, limit, offset, start_after, modified_after, cursor
+        )
+    )
+    if use_snapshot:
+        # Imported here: the snapshot builder itself depends on this module.
+        from .item_snapshot import serve_item_snapshot
+
+        snapshot_rows = serve_item_snapshot(
+            profile_ctx.profile_name,
+            price_list or profile_ctx.pos_profile.get("selling_price_list"),
+            customer,
+            snapshot_version,
+        )
+        if snapshot_rows is not None:
+            return snapshot_rows
+
     @redis_cache(ttl=profile_ctx.cache_ttl or 300)
     def __get_items(
         _pos_profile_name,
@@ -222,6 +371,7 @@ def get_items(
         include_description,
         include_image,
         item_groups_tuple,
+        cursor,
     ):
         return _execute_item_search(
             profile_ctx.pos_profile_json,
@@ -236,10 +386,12 @@ def get_items(
             include_description,
             include_image,
             list(item_groups_tuple),
+            cursor,
         )
 
+    keyset = _parse_cursor(cursor)
     if profile_ctx.use_price_list_cache:
-        return __get_items(
+        result = __get_items(
             profile_ctx.profile_name,
             profile_ctx.warehouse,
             price_list,
@@ -253,22 +405,66 @@ def get_items(
             include_description,
             include_image,
             groups_ctx.groups_tuple,
+            keyset,
+        )
+    else:
+        result = _execute_item_search(
+            profile_ctx.pos_profile_json,
+            price_list,
+            item_group,
+            search_value,
+            customer,
+            limit,
+            offset,
+            start_after,
+            modified_after,
+            include_description,
+            include_image,
+            groups_ctx.groups,
+            keyset,
         )
 
-    return _execute_item_search(
-        profile_ctx.pos_profile_json,
-        price_list,
-        item_group,
-        search_value,
-        customer,
-        limit,
-        offset,
-        start_after,
-        modified_after,
-        include_description,
-        include_image,
-        groups_ctx.groups,
-    )
+    page_length = _to_positive_int(limit)
+    if page_length and result and len(result) >= page_length:
+        last = result[-1]
+        frappe.response["next_cursor"] = json.dumps([last.get("item_name"), last.get("name")])
+    return result
+
+
+def _is_full_catalogue_request(
+    profile_ctx: ProfileContext,
+    groups_ctx: ItemGroupContext,
+    item_group,
+    search_value,
+    limit,
+    offset,
+    start_after,
+    modified_after,
+    cursor,
+) -> bool:
+    """Return True when ``get_items`` is asked for the unfiltered catalogue."""
+
+    if search_value or limit or offset or start_after or modified_after or cursor:
+        return False
+    if item_group and cstr(item_group).upper() != "ALL":
+        return False
+    profile_groups = get_item_groups(profile_ctx.profile_name) or []
+    return bool(profile_ctx.profile_name) and groups_ctx.groups_tuple == tuple(sorted(profile_groups))
+
+
+def _parse_cursor(cursor) -> Optional[Tuple[str, str]]:
+    """Decode a ``[item_name, name]`` keyset cursor sent by the client."""
+
+    if not cursor:
+        return None
+    if isinstance(cursor, str):
+        try:
+            cursor = json.loads(cursor)
+        except Exception:
+            frappe.throw(_("Invalid item cursor"))
+    if not isinstance(cursor, (list, tuple)) or len(cursor) != 2:
+        frappe.throw(_("Invalid item cursor"))
+    return cstr(cursor[0]), cstr(cursor[1])
 
 
 def _normalize_profile_context(pos_profile) -> ProfileContext:
@@ -305,10 +501,7 @@ def _prepare_item_groups(profile_name: Optional[str], item_groups) -> ItemGroupC
     else:
         groups = []
 
-    if not groups and profile_name:
-        groups = get_item_groups(profile_name)
-
-    groups = expand_item_groups(groups or [])
+    groups = resolve_item_groups(profile_name, groups)
     groups_tuple = tuple(sorted(groups)) if groups else tuple()
 
     return ItemGroupContext(groups=groups, groups_tuple=groups_tuple)
@@ -335,6 +528,7 @@ def _build_search_plan(
     include_description: bool,
     include_image: bool,
     item_groups: Optional[Sequence[str]],
+    keyset: Optional[Tuple[str, str]] = None,
 ) -> SearchPlan:
     """Assemble filters, pagination rules and search metadata."""
 
@@ -423,11 +617,17 @@ def _build_search_plan(
 
     limit_page_length: Optional[int] = None
     limit_start: Optional[int] = None
-    order_by = "item_name asc"
+    order_by = "item_name asc, name asc"
+
+    if keyset:
+        # (item_name, name) > keyset, written so the item_name index range applies
+        filters["item_name"] = [">=", keyset[0]]
+        if not or_filters:
+            or_filters = [["item_name", ">", keyset[0]], ["name", ">", keyset[1]]]
 
     if limit is not None:
         limit_page_length = limit
-        if offset and not start_after:
+        if offset and not start_after and not keyset:
             limit_start = offset
     elif use_limit_search and not pos_profile.get("posa_force_reload_items"):
         limit_page_length = search_limit
@@ -477,6 +677,7 @@ def _build_search_plan(
         include_image=include_image,
         posa_display_items_in_stock=bool(posa_display_items_in_stock),
         posa_show_template_items=bool(posa_show_template_items),
+        keyset=keyset,
     )
 
 
@@ -547,28 +748,83 @@ def _matches_search_words(row: Dict[str, Any], search_words: Sequence[str], word
     return True
 
 
+def _load_page_attributes(
+    items_data: Sequence[Dict[str, Any]],
+    plan: SearchPlan,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]:
+    """Load template and variant attributes of a whole page in two queries.
+
+    Returns ``(template_attributes, variant_attributes)`` keyed by item name,
+    shaped like :func:`get_item_attributes` and the per-variant
+    ``Item Variant Attribute`` rows respectively.
+    """
+
+    if not plan.posa_show_template_items:
+        return {}, {}
+
+    parents = [
+        item.get("name") for item in items_data if item.get("has_variants") or item.get("variant_of")
+    ]
+    if not parents:
+        return {}, {}
+
+    rows = frappe.get_all(
+        "Item Variant Attribute",
+        fields=["parent", "attribute", "attribute_value"],
+        filters={"parent": ["in", parents], "parentfield": "attributes"},
+        order_by="idx asc",
+    )
+
+    attribute_names: Dict[str, str] = {}
+    attribute_codes = {row.attribute for row in rows}
+    if attribute_codes:
+        attribute_names = dict(
+            frappe.get_all(
+                "Item Attribute",
+                fields=["name", "attribute_name"],
+                filters={"name": ["in", list(attribute_codes)]},
+                as_list=True,
+            )
+        )
+
+    templates = {item.get("name") for item in items_data if item.get("has_variants")}
+    template_attributes: Dict[str, List[Dict[str, Any]]] = {}
+    variant_attributes: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row.parent in templates:
+            attrs = template_attributes.setdefault(row.parent, [])
+            if row.attribute in attribute_names and not any(a["name"] == row.attribute for a in attrs):
+                attrs.append({"name": row.attribute, "attribute_name": attribute_names[row.attribute]})
+        else:
+            variant_attributes.setdefault(row.parent, []).append(
+                {"attribute": row.attribute, "attribute_value": row.attribute_value}
+            )
+    return template_attributes, variant_attributes
+
+
 def _shape_item_row(
     item: Dict[str, Any],
     detail: Dict[str, Any],
     plan: SearchPlan,
+    template_attributes: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    variant_attributes: Optional[Dict[str, List[Dict[str, Any]]]] = None,
 ) -> Optional[Dict[str, Any]]:
-    """Merge item and detail data while respecting stock and template settings."""
+    """Merge item and detail data while respecting stock and template settings.
+
+    Attributes are taken from the maps built by :func:`_load_page_attributes`.
+    """
 
     item_code = item.get("item_code")
     if not item_code:
         return None
 
-    attributes = ""
+    attributes: Any = ""
     if plan.posa_show_template_items and item.get("has_variants"):
-        attributes = get_item_attributes(item.get("name"))
+        attributes = (template_attributes or {}).get(item.get("name"))
 
     item_attributes: Any = ""
     if plan.posa_show_template_items and item.get("variant_of"):
-        item_attributes = frappe.get_all(
-            "Item Variant Attribute",
-            fields=["attribute", "attribute_value"],
-            filters={"parent": item.get("name"), "parentfield": "attributes"},
-        )
+        item_attributes = (variant_attributes or {}).get(item.get("name"))
 
     if (
         plan.posa_display_items_in_stock
@@ -584,6 +840,118 @@ def _shape_item_row(
     return row
 
 
+def _append_shaped_rows(
+    result: List[Dict[str, Any]],
+    items_data: List[Dict[str, Any]],
+    pos_profile: Dict[str, Any],
+    price_list: Optional[str],
+    customer: Optional[str],
+    plan: SearchPlan,
+    apply_word_filter: bool = True,
+) -> bool:
+    """Shape one page of Item rows into ``result``; return True once the limit is met."""
+
+    details = get_items_details(
+        json.dumps(pos_profile),
+        json.dumps(items_data),
+        price_list=price_list,
+        customer=customer,
+    )
+    detail_map = {d["item_code"]: d for d in details}
+    template_attributes, variant_attributes = _load_page_attributes(items_data, plan)
+
+    for item in items_data:
+        detail = detail_map.get(item.get("item_code"), {})
+        row = _shape_item_row(dict(item), detail, plan, template_attributes, variant_attributes)
+        if not row:
+            continue
+        if apply_word_filter and not _matches_search_words(row, plan.search_words, plan.word_filter_active):
+            continue
+        result.append(row)
+        if plan.limit_page_length and len(result) >= plan.limit_page_length:
+            return True
+    return False
+
+
+def _before_keyset(row: Dict[str, Any], keyset: Tuple[str, str]) -> bool:
+    """Return True when ``row`` sorts at or before the ``(item_name, name)`` cursor."""
+
+    item_name, name = (cstr(value).casefold() for value in keyset)
+    return cstr(row.get("item_name")).casefold() == item_name and cstr(row.get("name")).casefold() <= name
+
+
+# Plan filters the index evaluates exactly like the database does.
+INDEX_FILTER_FIELDS = {
+    "disabled",
+    "is_sales_item",
+    "is_fixed_asset",
+    "item_group",
+    "item_code",
+    "has_variants",
+    "variant_of",
+}
+
+
+def _can_use_search_index(pos_profile: Dict[str, Any], plan: SearchPlan) -> bool:
+    """Return True when the in-memory search index can answer the query.
+
+    The query filters by search words only after shaping, so the index may
+    replace it when it just narrows those rows down: only words long enough
+    for the word filter, no limit search ``or_filters``, no paging offset or
+    keyset and no filters beyond :data:`INDEX_FILTER_FIELDS`. The index holds
+    the profile's item groups only, so the group filter must stay within them.
+
+    The index matches words against token prefixes, so it finds the query
+    rows a word starts a token of (``wat`` for "Sparkling Water") but not
+    mid-word matches like ``ater``; the word filter still applies on top.
+    """
+
+    if not (plan.word_filter_active and pos_profile.get("name")):
+        return False
+    if plan.or_filters or plan.keyset or plan.initial_page_start:
+        return False
+    if not set(plan.filters) <= INDEX_FILTER_FIELDS:
+        return False
+
+    profile_groups = get_item_groups(pos_profile["name"])
+    if not profile_groups:
+        return True
+    condition = plan.filters.get("item_group")
+    return (
+        isinstance(condition, (list, tuple))
+        and condition[0] == "in"
+        and set(condition[1]) <= set(profile_groups)
+    )
+
+
+def _run_indexed_query(
+    pos_profile: Dict[str, Any],
+    price_list: Optional[str],
+    customer: Optional[str],
+    plan: SearchPlan,
+) -> List[Dict[str, Any]]:
+    """Answer a text search from the per-profile index instead of ``tabItem``.
+
+    See :func:`_can_use_search_index` for when this matches the query.
+    """
+
+    candidates = islice(
+        search_items(pos_profile["name"], plan.search_words, plan.filters, plan.fields),
+        plan.initial_page_start,
+        None,
+    )
+
+    result: List[Dict[str, Any]] = []
+    while True:
+        items_data = list(islice(candidates, plan.page_size))
+        if not items_data:
+            break
+        if _append_shaped_rows(result, items_data, pos_profile, price_list, customer, plan):
+            break
+
+    return result[: plan.limit_page_length] if plan.limit_page_length else result
+
+
 def _run_item_query(
     pos_profile: Dict[str, Any],
     price_list: Optional[str],
@@ -592,6 +960,9 @@ def _run_item_query(
 ) -> List[Dict[str, Any]]:
     """Execute the search described by ``plan`` and return shaped rows."""
 
+    if _can_use_search_index(pos_profile, plan):
+        return _run_indexed_query(pos_profile, price_list, customer, plan)
+
     result: List[Dict[str, Any]] = []
     page_start = plan.initial_page_start
 
@@ -624,30 +995,17 @@ def _run_item_query(
         if not items_data:
             break
 
-        details = get_items_details(
-            json.dumps(pos_profile),
-            json.dumps(items_data),
-            price_list=price_list,
-            customer=customer,
-        )
-        detail_map = {d["item_code"]: d for d in details}
-
-        for item in items_data:
-            detail = detail_map.get(item.get("item_code"), {})
-            row = _shape_item_row(dict(item), detail, plan)
-            if not row:
-                continue
-            if not _matches_search_words(row, plan.search_words, plan.word_filter_active):
-                continue
-            result.append(row)
-            if plan.limit_page_length and len(result) >= plan.limit_page_length:
-                break
+        fetched = len(items_data)
+        if plan.keyset:
+            # Search or_filters replace the keyset ones, so drop rows at or before
+            # the cursor here (case-insensitively, like the database collation).
+            items_data = [row for row in items_data if not _before_keyset(row, plan.keyset)]
 
-        if plan.limit_page_length and len(result) >= plan.limit_page_length:
+        if _append_shaped_rows(result, items_data, pos_profile, price_list, customer, plan):
             break
 
-        page_start += len(items_data)
-        if len(items_data) < plan.page_size:
+        page_start += fetched
+        if fetched < plan.page_size:
             break
 
     return result[: plan.limit_page_length] if plan.limit_page_length else result
@@ -666,6 +1024,7 @@ def _execute_item_search(
     include_description: bool,
     include_image: bool,
     item_groups: Optional[Sequence[str]],
+    keyset: Optional[Tuple[str, str]] = None,
 ) -> List[Dict[str, Any]]:
     """Orchestrate the helpers responsible for executing the search query."""
 
@@ -685,6 +1044,7 @@ def _execute_item_search(
         include_description,
         include_image,
         item_groups,
+        keyset,
     )
 
     return _run_item_query(pos_profile, price_list, customer, plan)
@@ -707,8 +1067,7 @@ def get_items_count(pos_profile, item_groups=None):
             item_groups = json.loads(item_groups)
         except Exception:
             item_groups = []
-    item_groups = item_groups or get_item_groups(pos_profile.get("name"))
-    item_groups = expand_item_groups(item_groups)
+    item_groups = resolve_item_groups(pos_profile.get("name"), item_groups)
     filters = {"disabled": 0, "is_sales_item": 1, "is_fixed_asset": 0}
     if item_groups:
         filters["item_group"] = ["in", item_groups]
@@ -931,34 +1290,50 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 
 
 @frappe.whitelist()
-def get_items_from_barcode(selling_price_list, currency, barcode):
-    search_item = frappe.db.get_value(
-        "Item Barcode",
-        {"barcode": barcode},
-        ["parent as item_code", "posa_uom"],
-        as_dict=1,
-    )
-    if search_item:
-        item_doc = frappe.get_cached_doc("Item", search_item.item_code)
-        item_price = frappe.db.get_value(
-            "Item Price",
-            {
-                "item_code": search_item.item_code,
-                "price_list": selling_price_list,
-                "currency": currency,
-            },
-            "price_list_rate",
-        )
+def get_items_from_barcode(selling_price_list, currency, barcode, customer=None, pos_profile=None):
+    """Resolve a scanned barcode or batch number to an item row priced for ``customer``.
 
-        return {
-            "item_code": item_doc.name,
-            "item_name": item_doc.item_name,
-            "barcode": barcode,
-            "rate": item_price or 0,
-            "uom": search_item.posa_uom or item_doc.stock_uom,
-            "currency": currency,
-        }
-    return None
+    Weight barcodes starting with the profile's ``posa_scale_barcode_start``
+    are split into their item barcode and a ``qty``. A batch number is priced
+    from the Item Price rows of that batch when there are any, and carries
+    the batch's ``batch_price`` like the batches listed by ``get_items``.
+    """
+    qty = None
+    scale = parse_scale_barcode(barcode, get_scale_barcode_prefix(pos_profile))
+    if scale:
+        barcode, qty = scale
+
+    match = lookup_scan_code(barcode, ("barcode", "batch"))
+    if not match:
+        return None
+
+    code_type, search_item = match
+    batch_no = cstr(barcode).strip() if code_type == "batch" else None
+    item_code = search_item["item_code"]
+    meta = next(iter(get_item_meta([item_code])), None)
+    if not meta:
+        return None
+
+    uom = search_item.get("uom") or meta.stock_uom
+    price_rows = price_rows_by_uom(
+        get_item_prices(selling_price_list, currency, [item_code], customer), batch_no
+    )
+    price = _select_price(price_rows, uom, meta.stock_uom)
+
+    result = {
+        "item_code": item_code,
+        "item_name": meta.item_name,
+        "barcode": barcode,
+        "rate": price.get("price_list_rate") or 0,
+        "uom": uom,
+        "currency": currency,
+    }
+    if batch_no:
+        result["batch_no"] = batch_no
+        result["batch_price"] = frappe.get_cached_value("Batch", batch_no, "posa_batch_price")
+    if qty is not None:
+        result["qty"] = qty
+    return result
 
 
 def build_item_cache(item_code):
@@ -1000,46 +1375,27 @@ def get_item_attributes(item_code):
 
 @frappe.whitelist()
 def search_serial_or_batch_or_barcode_number(search_value, search_serial_no=None, search_batch_no=None):
-    """Search for items by serial number, batch number, or barcode."""
-    # Search by barcode
-    barcode_data = frappe.db.get_value(
-        "Item Barcode",
-        {"barcode": search_value},
-        ["parent as item_code", "barcode"],
-        as_dict=True,
-    )
-    if barcode_data:
-        return {"item_code": barcode_data.item_code, "barcode": barcode_data.barcode}
+    """Search for items by serial number, batch number, or barcode.
 
-    # Search by batch number if enabled
+    All three are answered by one lookup in the scan code map.
+    """
+    code_types = ["barcode"]
     if search_batch_no:
-        batch_data = frappe.db.get_value(
-            "Batch",
-            {"name": search_value},
-            ["item as item_code", "name as batch_no"],
-            as_dict=True,
-        )
-        if batch_data:
-            return {
-                "item_code": batch_data.item_code,
-                "batch_no": batch_data.batch_no,
-            }
-
-    # Search by serial number if enabled
+        code_types.append("batch")
     if search_serial_no:
-        serial_data = frappe.db.get_value(
-            "Serial No",
-            {"name": search_value},
-            ["item_code", "name as serial_no"],
-            as_dict=True,
-        )
-        if serial_data:
-            return {
-                "item_code": serial_data.item_code,
-                "serial_no": serial_data.serial_no,
-            }
-
-    return {}
+        code_types.append("serial")
+
+    match = lookup_scan_code(search_value, code_types)
+    if not match:
+        return {}
+
+    code_type, entry = match
+    code = cstr(search_value).strip()
+    if code_type == "batch":
+        return {"item_code": entry["item_code"], "batch_no": code}
+    if code_type == "serial":
+        return {"item_code": entry["item_code"], "serial_no": code}
+    return {"item_code": entry["item_code"], "barcode": code}
 
 
 @frappe.whitelist()
@@ -0,0 +1,159 @@
+"""Batch replay of invoices captured while a terminal was offline.
+
+The POS queues offline invoices locally, each with a client generated
+idempotency key. :func:`sync_offline_invoices` submits a batch of them in one
+request and answers with a result per key. The key is stored on the invoice
+itself, so a batch that is retried after a timeout or a lost response finds
+the invoices created the first time through their unique
+``posa_idempotency_key`` instead of creating them again. Submitted results
+are also cached in redis as a fast path; the database stays authoritative,
+covering a cache that was flushed or a request that died between commit and
+caching its result.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import cstr, strip_html_tags
+
+from .invoices import (
+    IDEMPOTENCY_FIELD,
+    _find_by_idempotency_key,
+    _invoice_doctype,
+    submit_invoice,
+    update_invoice,
+)
+
+RESULT_KEY_PREFIX = "posa_offline_invoice"
+RESULT_TTL = 30 * 24 * 60 * 60
+LOCK_TTL = 10 * 60
+MAX_BATCH_SIZE = 100
+
+
+def _result_key(idempotency_key: str) -> str:
+    return f"{RESULT_KEY_PREFIX}:{idempotency_key}"
+
+
+def get_synced_result(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    """Return the stored outcome of an already replayed invoice."""
+
+    return frappe.cache().get_value(_result_key(idempotency_key))
+
+
+def _store_result(idempotency_key: str, result: Dict[str, Any]):
+    frappe.cache().set_value(_result_key(idempotency_key), result, expires_in_sec=RESULT_TTL)
+
+
+def _recorded_result(doctype: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+    """Return the outcome recorded on the invoice carrying ``idempotency_key``."""
+
+    existing = _find_by_idempotency_key(doctype, idempotency_key)
+    if not existing:
+        return None
+    # A cancelled invoice was submitted once; replaying it must not create another.
+    return {"status": "submitted" if existing.docstatus else "draft", "name": existing.name}
+
+
+def _claim(idempotency_key: str) -> bool:
+    """Take the processing lock of a key; ``False`` when another request holds it."""
+
+    cache = frappe.cache()
+    return bool(cache.set(cache.make_key(f"{_result_key(idempotency_key)}:lock"), 1, nx=True, ex=LOCK_TTL))
+
+
+def _release(idempotency_key: str):
+    cache = frappe.cache()
+    cache.delete(cache.make_key(f"{_result_key(idempotency_key)}:lock"))
+
+
+def _error_message(error: Exception) -> str:
+    """Return the message of a failed replay and drop it from the response."""
+
+    message = cstr(error)
+    if not message:
+        for entry in frappe.local.message_log or []:
+            entry = json.loads(entry) if isinstance(entry, str) else entry
+            message = cstr(entry.get("message")) or message
+    frappe.clear_messages()
+    return strip_html_tags(message) or error.__class__.__name__
+
+
+def _replay(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Submit one offline invoice, falling back to saving it as a draft."""
+
+    invoice = entry.get("invoice") or {}
+    data = entry.get("data") or {}
+    try:
+        submitted = submit_invoice(json.dumps(invoice), json.dumps(data))
+        frappe.db.commit()
+        return {"status": "submitted", "name": submitted.get("name")}
+    except Exception as error:
+        frappe.db.rollback()
+        submit_error = _error_message(error)
+
+    try:
+        draft = update_invoice(json.dumps(invoice))
+        frappe.db.commit()
+        return {"status": "draft", "name": draft.get("name"), "error": submit_error}
+    except Exception as error:
+        frappe.db.rollback()
+        return {"status": "failed", "error": _error_message(error) or submit_error}
+
+
+@frappe.whitelist()
+def sync_offline_invoices(invoices):
+    """Replay a batch of offline invoices.
+
+    ``invoices`` is a list of ``{"idempotency_key", "invoice", "data"}``.
+    Each invoice is submitted and committed on its own; when submission
+    fails it is saved as a draft instead, as the online flow does. Returns
+    one ``{"idempotency_key", "status", "name", "error"}`` per entry where
+    ``status`` is ``submitted``, ``draft``, ``failed`` or ``in_progress``
+    (the key is being replayed by another request). Keys submitted before
+    return their original result with ``duplicate`` set; keys saved as a
+    draft before submit that draft.
+    """
+
+    if isinstance(invoices, str):
+        invoices = json.loads(invoices)
+    if len(invoices) > MAX_BATCH_SIZE:
+        frappe.throw(_("At most {0} invoices can be synced per request").format(MAX_BATCH_SIZE))
+
+    results: List[Dict[str, Any]] = []
+    for entry in invoices:
+        key = cstr(entry.get("idempotency_key")).strip()
+        if not key:
+            results.append({"idempotency_key": None, "status": "failed", "error": _("Missing idempotency key")})
+            continue
+
+        if not _claim(key):
+            results.append({"idempotency_key": key, "status": "in_progress"})
+            continue
+        try:
+            # Read under the lock so a concurrent replay of the key is seen.
+            invoice = {**(entry.get("invoice") or {}), IDEMPOTENCY_FIELD: key}
+            previous = get_synced_result(key)
+            if not previous or previous.get("status") != "submitted":
+                previous = _recorded_result(_invoice_doctype(invoice.get("pos_profile")), key)
+                if previous and previous["status"] == "submitted":
+                    _store_result(key, previous)
+            if previous and previous.get("status") == "submitted":
+                results.append({**previous, "idempotency_key": key, "duplicate": 1})
+                continue
+            if previous:
+                # Saved as a draft on an earlier attempt: submit that draft.
+                invoice["name"] = previous["name"]
+            entry = {**entry, "invoice": invoice}
+
+            result = _replay(entry)
+            if result["status"] == "submitted":
+                _store_result(key, result)
+            results.append({**result, "idempotency_key": key})
+        finally:
+            _release(key)
+
+    return results
@@ -0,0 +1,291 @@
+"""Sampling profiler for slow POS API calls.
+
+Switched on in the site config for selected users and/or POS Profiles::
+
+    "posa_profiler": {
+        "users": ["cashier@example.com"],
+        "pos_profiles": ["Main Store"],
+        "threshold_ms": 1000,
+        "interval_ms": 5,
+        "keep": 20
+    }
+
+While a matching ``posawesome.posawesome.api`` call runs, a background thread
+samples the stack of the request thread every ``interval_ms``. Calls slower
+than ``threshold_ms`` are kept in redis; only the ``keep`` slowest profiles
+survive. Profiles can be exported as speedscope JSON or collapsed stacks
+(``flamegraph.pl`` / speedscope input) with :func:`export_slow_profile`.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+
+from .instrumentation import _request_method
+
+PROFILE_INDEX_KEY = "posa_slow_profiles"
+PROFILE_DATA_KEY = "posa_slow_profile_data"
+
+DEFAULT_THRESHOLD_MS = 1000
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_KEEP = 20
+MAX_STACK_DEPTH = 200
+
+Stack = Tuple[str, ...]
+
+
+class StackSampler(threading.Thread):
+    """Sample the stack of one thread at a fixed interval until stopped."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="posa-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_frame_stack(frame)] += 1
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self.join()
+        return self.samples
+
+
+def _frame_stack(frame) -> Stack:
+    """Return the stack of ``frame`` as labels, outermost call first."""
+
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        labels.append(f"{module}.{code.co_name}:{code.co_firstlineno}")
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _settings() -> Dict[str, Any]:
+    return frappe.conf.get("posa_profiler") or {}
+
+
+def _profile_name(value) -> Optional[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            return value
+    if isinstance(value, dict):
+        return value.get("pos_profile") or value.get("name")
+    return None
+
+
+def _request_pos_profile() -> Optional[str]:
+    """Best effort POS Profile of the current call, read from its arguments."""
+
+    form = frappe.local.form_dict or {}
+    for key in ("pos_profile", "profile_name", "profile"):
+        if form.get(key):
+            return _profile_name(form.get(key))
+    for key in ("invoice", "invoice_doc", "doc", "data"):
+        value = form.get(key)
+        if isinstance(value, str) and "pos_profile" in value:
+            value = _profile_name(value)
+            if value:
+                return value
+        elif isinstance(value, dict) and value.get("pos_profile"):
+            return value.get("pos_profile")
+    return None
+
+
+def _is_targeted(settings: Dict[str, Any], pos_profile: Optional[str]) -> bool:
+    if frappe.session.user in (settings.get("users") or []):
+        return True
+    return bool(pos_profile) and pos_profile in (settings.get("pos_profiles") or [])
+
+
+def start_profiling():
+    """``before_request`` hook starting the sampler for targeted POS API calls."""
+
+    settings = _settings()
+    if not settings:
+        return
+    method = _request_method()
+    if not method:
+        return
+    pos_profile = _request_pos_profile()
+    if not _is_targeted(settings, pos_profile):
+        return
+
+    interval = flt(settings.get("interval_ms") or DEFAULT_INTERVAL_MS) / 1000.0
+    sampler = StackSampler(threading.get_ident(), interval)
+    frappe.local.posa_profiler = {
+        "method": method,
+        "pos_profile": pos_profile,
+        "interval_ms": interval * 1000,
+        "started": time.perf_counter(),
+        "sampler": sampler,
+    }
+    sampler.start()
+
+
+def finish_profiling(response=None, request=None):
+    """``after_request`` hook storing the profile of a call above the threshold."""
+
+    state = getattr(frappe.local, "posa_profiler", None)
+    if not state:
+        return
+    frappe.local.posa_profiler = None
+    samples = state["sampler"].stop()
+    wall_ms = (time.perf_counter() - state["started"]) * 1000
+
+    settings = _settings()
+    if wall_ms < flt(settings.get("threshold_ms") or DEFAULT_THRESHOLD_MS) or not samples:
+        return
+
+    profile = {
+        "id": frappe.generate_hash(length=12),
+        "method": state["method"],
+        "user": frappe.session.user,
+        "pos_profile": state["pos_profile"],
+        "status": getattr(response, "status_code", None),
+        "wall_ms": round(wall_ms, 3),
+        "interval_ms": state["interval_ms"],
+        "at": str(now_datetime()),
+        "stacks": [[list(stack), count] for stack, count in samples.items()],
+    }
+    try:
+        _store_profile(profile, cint(settings.get("keep") or DEFAULT_KEEP))
+    except Exception:
+        # Profiling is diagnostic only and must never fail the request.
+        pass
+
+
+def _store_profile(profile: Dict[str, Any], keep: int):
+    cache = frappe.cache()
+    index_key = cache.make_key(PROFILE_INDEX_KEY)
+    data_key = cache.make_key(PROFILE_DATA_KEY)
+
+    pipe = cache.pipeline()
+    pipe.hset(data_key, profile["id"], json.dumps(profile))
+    pipe.zadd(index_key, {profile["id"]: profile["wall_ms"]})
+    pipe.zrange(index_key, 0, -(keep + 1))
+    evicted = pipe.execute()[-1]
+
+    if evicted:
+        pipe = cache.pipeline()
+        pipe.zrem(index_key, *evicted)
+        pipe.hdel(data_key, *evicted)
+        pipe.execute()
+
+
+def _load_profile(profile_id: str) -> Dict[str, Any]:
+    cache = frappe.cache()
+    raw = cache.hmget(cache.make_key(PROFILE_DATA_KEY), [profile_id])[0]
+    if not raw:
+        frappe.throw(_("Profile {0} not found").format(profile_id), frappe.DoesNotExistError)
+    return json.loads(raw)
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """Render a profile as collapsed stacks: ``frame;frame;frame count`` per line."""
+
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in profile["stacks"])
+
+
+def to_speedscope(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a profile in the speedscope file format (sampled profile)."""
+
+    frame_index: Dict[str, int] = {}
+    frames: List[Dict[str, Any]] = []
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in profile["stacks"]:
+        indices = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                name, _, line = label.rpartition(":")
+                frames.append({"name": name, "line": cint(line)})
+            indices.append(frame_index[label])
+        samples.append(indices)
+        weights.append(round(count * profile["interval_ms"], 3))
+
+    name = f"{profile['method']} {profile['wall_ms']} ms ({profile['at']})"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "posawesome",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+@frappe.whitelist()
+def get_slow_profiles():
+    """List the kept profiles, slowest first, without their stacks."""
+
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    ids = cache.zrevrange(cache.make_key(PROFILE_INDEX_KEY), 0, -1)
+    if not ids:
+        return []
+    raw = cache.hmget(cache.make_key(PROFILE_DATA_KEY), ids)
+    profiles = []
+    for value in raw:
+        if value:
+            profile = json.loads(value)
+            profile["samples"] = sum(count for stack, count in profile.pop("stacks"))
+            profiles.append(profile)
+    return profiles
+
+
+@frappe.whitelist()
+def export_slow_profile(profile_id, format="speedscope"):
+    """Download one profile as ``speedscope`` JSON or ``collapsed`` stacks."""
+
+    frappe.only_for("System Manager")
+    profile = _load_profile(profile_id)
+    method = profile["method"].rpartition(".")[2]
+    if format == "collapsed":
+        content = to_collapsed(profile)
+        filename = f"{method}-{profile_id}.folded"
+    else:
+        content = json.dumps(to_speedscope(profile))
+        filename = f"{method}-{profile_id}.speedscope.json"
+
+    frappe.response["filename"] = filename
+    frappe.response["filecontent"] = content
+    frappe.response["type"] = "download"
+
+
+@frappe.whitelist()
+def clear_slow_profiles():
+    """Drop every kept profile."""
+
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    cache.delete(cache.make_key(PROFILE_INDEX_KEY), cache.make_key(PROFILE_DATA_KEY))
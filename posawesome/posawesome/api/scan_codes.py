@@ -0,0 +1,302 @@
+"""Resolution of scanned codes to items without per-scan table lookups.
+
+Every scannable code - Item Barcode rows, Batch and Serial No names - is
+mirrored into one redis hash. Hash fields are the code prefixed with its type
+so that a single ``HMGET`` answers whether a value is a barcode, a batch or a
+serial number. The hash is built once by a background job and afterwards kept
+current by document hooks; until it is ready lookups fall back to the tables.
+"""
+
+from __future__ import annotations
+
+import json
+import pickle
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, cstr, flt
+from frappe.utils.background_jobs import enqueue
+
+SCAN_CODE_KEY = "posa_scan_codes"
+
+# Hash field marking a fully built map; codes missing from it are unknown.
+READY_FIELD = "__ready__"
+
+# Field prefixes per code type, in lookup precedence order.
+CODE_TYPES = (("barcode", "b:"), ("batch", "t:"), ("serial", "s:"))
+
+BUILD_CHUNK_SIZE = 20000
+BUILD_TIMEOUT = 3600
+
+# EAN-13 scale barcodes: prefix + item code + 5 weight digits + 1 check digit.
+SCALE_WEIGHT_DIGITS = 5
+SCALE_CHECK_DIGITS = 1
+
+ScanCodeChange = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def _field(code_type: str, code: str) -> str:
+    return dict(CODE_TYPES)[code_type] + cstr(code)
+
+
+def _hash_key(cache) -> str:
+    # Site scoped: codes of one site must never resolve items of another.
+    return cache.make_key(SCAN_CODE_KEY)
+
+
+def clear_scan_code_map():
+    """Drop the map; the next lookup falls back to the tables and rebuilds it."""
+
+    cache = frappe.cache()
+    cache.delete(_hash_key(cache))
+
+
+def _iter_rows(doctype: str, fields: List[str]):
+    """Yield all rows of ``doctype`` in name order, one chunk at a time."""
+
+    last_name = ""
+    while True:
+        rows = frappe.get_all(
+            doctype,
+            fields=["name", *fields],
+            filters={"name": [">", last_name]},
+            order_by="name asc",
+            limit_page_length=BUILD_CHUNK_SIZE,
+        )
+        yield from rows
+        if len(rows) < BUILD_CHUNK_SIZE:
+            return
+        last_name = rows[-1].name
+
+
+def _scan_code_sources() -> Iterable[ScanCodeChange]:
+    for row in _iter_rows("Item Barcode", ["barcode", "parent", "posa_uom"]):
+        if row.barcode:
+            yield "barcode", row.barcode, {"item_code": row.parent, "uom": row.posa_uom}
+    for row in _iter_rows("Batch", ["item"]):
+        yield "batch", row.name, {"item_code": row.item}
+    for row in _iter_rows("Serial No", ["item_code"]):
+        yield "serial", row.name, {"item_code": row.item_code}
+
+
+def _build_keys(cache) -> Dict[str, str]:
+    key = _hash_key(cache)
+    return {
+        "map": key,
+        "staging": f"{key}:building",
+        "journal": f"{key}:journal",
+        "building": f"{key}:build_started",
+    }
+
+
+def build_scan_code_map():
+    """Background job loading every scannable code into the redis hash.
+
+    The map is written under a temporary key and swapped in at the end so
+    lookups never see a partially built map. Hook updates committed while
+    the build runs are also journaled and replayed over the swapped in map:
+    the build may have read those rows before they changed, and the swap
+    replaces the live map they were written to.
+    """
+
+    cache = frappe.cache()
+    keys = _build_keys(cache)
+
+    # Start journaling before the first row is read.
+    pipe = cache.pipeline()
+    pipe.delete(keys["staging"], keys["journal"])
+    pipe.set(keys["building"], 1, ex=BUILD_TIMEOUT)
+    pipe.execute()
+
+    pipe = cache.pipeline()
+    for count, (code_type, code, entry) in enumerate(_scan_code_sources(), start=1):
+        pipe.hset(keys["staging"], _field(code_type, code), pickle.dumps(entry))
+        if count % BUILD_CHUNK_SIZE == 0:
+            pipe.execute()
+    pipe.hset(keys["staging"], READY_FIELD, pickle.dumps(1))
+    pipe.rename(keys["staging"], keys["map"])
+    pipe.execute()
+
+    _replay_journal(cache, keys)
+
+
+def _replay_journal(cache, keys: Dict[str, str]):
+    # A change landing while a pass is replayed is journaled too, so the next
+    # pass writes it again after any older entry; stop once nothing is left.
+    while True:
+        entries = cache.pipeline().lrange(keys["journal"], 0, -1).execute()[0]
+        if not entries:
+            break
+        _write_changes(cache, keys["map"], [tuple(json.loads(entry)) for entry in entries])
+        cache.pipeline().ltrim(keys["journal"], len(entries), -1).execute()
+    cache.delete(keys["building"], keys["journal"])
+
+
+def _enqueue_build():
+    enqueue(
+        build_scan_code_map,
+        queue="long",
+        timeout=BUILD_TIMEOUT,
+        job_id="posa_build_scan_code_map",
+        deduplicate=True,
+    )
+
+
+def _lookup_tables(code: str, code_types: Iterable[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Table lookups used until the map has been built."""
+
+    for code_type in code_types:
+        if code_type == "barcode":
+            row = frappe.db.get_value("Item Barcode", {"barcode": code}, ["parent", "posa_uom"], as_dict=True)
+            entry = row and {"item_code": row.parent, "uom": row.posa_uom}
+        elif code_type == "batch":
+            item_code = frappe.db.get_value("Batch", code, "item")
+            entry = item_code and {"item_code": item_code}
+        else:
+            item_code = frappe.db.get_value("Serial No", code, "item_code")
+            entry = item_code and {"item_code": item_code}
+        if entry:
+            return code_type, entry
+    return None
+
+
+def lookup_scan_code(
+    code: str,
+    code_types: Iterable[str] = ("barcode", "batch", "serial"),
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Return ``(code_type, entry)`` for a scanned value or ``None``.
+
+    ``entry`` holds the ``item_code`` and, for barcodes, the ``uom``. When a
+    value matches several types, barcodes win over batches over serials.
+    """
+
+    code = cstr(code).strip()
+    wanted = set(code_types)
+    code_types = [code_type for code_type, _ in CODE_TYPES if code_type in wanted]
+    if not code or not code_types:
+        return None
+
+    cache = frappe.cache()
+    values = cache.hmget(_hash_key(cache), [READY_FIELD, *(_field(t, code) for t in code_types)])
+    if values[0] is None:
+        _enqueue_build()
+        return _lookup_tables(code, code_types)
+
+    for code_type, raw in zip(code_types, values[1:], strict=True):
+        if raw is not None:
+            return code_type, pickle.loads(raw)
+    return None
+
+
+def resolve_barcode(barcode: str) -> Optional[Dict[str, Any]]:
+    """Return ``{"item_code", "uom"}`` for a barcode, or ``None`` when unknown."""
+
+    match = lookup_scan_code(barcode, ("barcode",))
+    return match[1] if match else None
+
+
+def _write_changes(cache, key: str, changes: List[ScanCodeChange], journal: Optional[str] = None):
+    pipe = cache.pipeline()
+    for code_type, code, entry in changes:
+        if entry is None:
+            pipe.hdel(key, _field(code_type, code))
+        else:
+            pipe.hset(key, _field(code_type, code), pickle.dumps(entry))
+        if journal:
+            pipe.rpush(journal, json.dumps([code_type, code, entry]))
+    # One MULTI: a change is in the journal exactly when it is in the map.
+    pipe.execute()
+
+
+def _apply_changes(changes: List[ScanCodeChange]):
+    cache = frappe.cache()
+    keys = _build_keys(cache)
+    journal = keys["journal"] if cache.get(keys["building"]) else None
+    _write_changes(cache, keys["map"], changes, journal)
+
+
+def _queue_changes(changes: List[ScanCodeChange]):
+    # Applied after commit so a rolled back save never leaks into the map.
+    if changes:
+        frappe.db.after_commit.add(lambda: _apply_changes(changes))
+
+
+def _barcode_entries(doc) -> Dict[str, Dict[str, Any]]:
+    if not doc:
+        return {}
+    return {
+        cstr(row.barcode): {"item_code": doc.name, "uom": row.get("posa_uom")}
+        for row in doc.get("barcodes") or []
+        if row.barcode
+    }
+
+
+def update_item_scan_codes(doc, method=None, *args):
+    """Item hook keeping barcode entries in sync."""
+
+    if method == "on_trash":
+        current, previous = {}, _barcode_entries(doc)
+    else:
+        current, previous = _barcode_entries(doc), _barcode_entries(doc.get_doc_before_save())
+
+    changes: List[ScanCodeChange] = [("barcode", code, None) for code in set(previous) - set(current)]
+    changes.extend(("barcode", code, entry) for code, entry in current.items())
+    _queue_changes(changes)
+
+
+def update_batch_scan_code(doc, method=None, *args):
+    """Batch hook keeping batch entries in sync."""
+
+    _update_named_code("batch", doc, doc.get("item"), method, args)
+
+
+def update_serial_scan_code(doc, method=None, *args):
+    """Serial No hook keeping serial number entries in sync."""
+
+    _update_named_code("serial", doc, doc.get("item_code"), method, args)
+
+
+def _update_named_code(code_type: str, doc, item_code: Optional[str], method, args):
+    changes: List[ScanCodeChange] = []
+    if method == "after_rename" and args:
+        changes.append((code_type, args[0], None))
+    if method == "on_trash":
+        changes.append((code_type, doc.name, None))
+    elif item_code:
+        changes.append((code_type, doc.name, {"item_code": item_code}))
+    _queue_changes(changes)
+
+
+def parse_scale_barcode(barcode: str, prefix: Optional[str]) -> Optional[Tuple[str, float]]:
+    """Split a weight barcode into its lookup code and quantity.
+
+    Mirrors the POS frontend: the code is everything before the weight digits
+    (prefix included) and the weight is expressed in thousandths.
+    """
+
+    barcode = cstr(barcode).strip()
+    prefix = cstr(prefix)
+    suffix_len = SCALE_WEIGHT_DIGITS + SCALE_CHECK_DIGITS
+    if not prefix or not barcode.startswith(prefix) or len(barcode) <= len(prefix) + suffix_len:
+        return None
+
+    weight = barcode[-suffix_len:-SCALE_CHECK_DIGITS]
+    if not weight.isdigit():
+        return None
+    return barcode[:-suffix_len], flt(cint(weight) / 1000.0)
+
+
+def get_scale_barcode_prefix(pos_profile) -> Optional[str]:
+    """Return ``posa_scale_barcode_start`` of a profile given as name, dict or JSON."""
+
+    if not pos_profile:
+        return None
+    if isinstance(pos_profile, str):
+        try:
+            decoded = json.loads(pos_profile)
+        except Exception:
+            decoded = None
+        if not isinstance(decoded, dict):
+            return frappe.get_cached_value("POS Profile", pos_profile, "posa_scale_barcode_start")
+        pos_profile = decoded
+    return pos_profile.get("posa_scale_barcode_start") if isinstance(pos_profile, dict) else None
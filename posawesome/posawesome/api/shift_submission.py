@@ -0,0 +1,292 @@
+"""Submission of a shift's printed drafts before it is closed.
+
+Printed drafts left in a shift used to be submitted one by one inside the
+closing request, which times out on busy shifts. :func:`submit_shift_invoices`
+instead splits them over at most :data:`POOL_SIZE` background jobs. Each job
+submits its share under a row lock, so a draft submitted meanwhile by the
+background queue or a retry is skipped, and reports every invoice over the
+``posa_shift_submission_progress`` realtime event. The last job to finish
+publishes the final event with ``complete`` set; the POS builds the closing
+shift only then.
+
+Progress is kept in a redis hash per opening shift and can also be polled
+with :func:`get_shift_submission_progress`. A run whose jobs all ended
+without reporting back, e.g. killed on timeout, counts as complete with
+``interrupted`` set; the closing shift submits whatever drafts it left.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, now_datetime
+from frappe.utils.background_jobs import enqueue, is_job_enqueued
+
+from posawesome.posawesome.api.submission_queue import submit_draft
+
+PROGRESS_EVENT = "posa_shift_submission_progress"
+STATE_KEY_PREFIX = "posa_shift_submission"
+STATE_TTL = 24 * 60 * 60
+
+# Default number of parallel jobs; ``posa_shift_submission_workers`` in the
+# site config overrides it.
+POOL_SIZE = 4
+JOB_TIMEOUT = 1500
+# Upper bound for starting a run; the lock is released as soon as it is queued.
+START_LOCK_TTL = 60
+
+
+def _state_key(cache, pos_opening_shift: str) -> str:
+    return cache.make_key(f"{STATE_KEY_PREFIX}:{pos_opening_shift}")
+
+
+def _errors_key(cache, pos_opening_shift: str) -> str:
+    return cache.make_key(f"{STATE_KEY_PREFIX}:{pos_opening_shift}:errors")
+
+
+def _start_lock_key(cache, pos_opening_shift: str) -> str:
+    return cache.make_key(f"{STATE_KEY_PREFIX}:{pos_opening_shift}:lock")
+
+
+def _pool_size() -> int:
+    return max(1, cint(frappe.conf.get("posa_shift_submission_workers")) or POOL_SIZE)
+
+
+def shift_invoice_doctype(pos_opening_shift: str) -> str:
+    pos_profile = frappe.db.get_value("POS Opening Shift", pos_opening_shift, "pos_profile")
+    use_pos_invoice = frappe.db.get_value(
+        "POS Profile",
+        pos_profile,
+        "create_pos_invoice_instead_of_sales_invoice",
+    )
+    return "POS Invoice" if use_pos_invoice else "Sales Invoice"
+
+
+def printed_drafts(pos_opening_shift: str, doctype: str) -> List[str]:
+    return frappe.get_all(
+        doctype,
+        filters={
+            "posa_pos_opening_shift": pos_opening_shift,
+            "docstatus": 0,
+            "posa_is_printed": 1,
+        },
+        pluck="name",
+        order_by="creation asc",
+    )
+
+
+def _jobs_alive(cache, pos_opening_shift: str, jobs: str) -> bool:
+    if not jobs:
+        # Not queued yet: alive for as long as the request starting it is.
+        return bool(cache.get(_start_lock_key(cache, pos_opening_shift)))
+    return any(is_job_enqueued(job_id) for job_id in jobs.split(","))
+
+
+def _read_state(pos_opening_shift: str, check_jobs: bool = True) -> Optional[Dict[str, Any]]:
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hgetall(_state_key(cache, pos_opening_shift))
+    pipe.lrange(_errors_key(cache, pos_opening_shift), 0, -1)
+    raw, errors = pipe.execute()
+    if not raw:
+        return None
+
+    state = {cstr(field): cstr(value) for field, value in raw.items()}
+    finished = cint(state.get("finished")) >= cint(state.get("workers"))
+    interrupted = (
+        not finished and check_jobs and not _jobs_alive(cache, pos_opening_shift, state.get("jobs"))
+    )
+    return {
+        "pos_opening_shift": pos_opening_shift,
+        "doctype": state.get("doctype"),
+        "total": cint(state.get("total")),
+        "done": cint(state.get("done")),
+        "failed": cint(state.get("failed")),
+        "workers": cint(state.get("workers")),
+        "complete": finished or interrupted,
+        "interrupted": interrupted,
+        "pending": False,
+        "errors": [json.loads(error) for error in errors],
+        "started": state.get("started"),
+    }
+
+
+def _pending_state(pos_opening_shift: str) -> Dict[str, Any]:
+    """Progress of a run another request is starting and has not recorded yet."""
+
+    return {
+        "pos_opening_shift": pos_opening_shift,
+        "doctype": None,
+        "total": 0,
+        "done": 0,
+        "failed": 0,
+        "workers": 0,
+        "complete": False,
+        "interrupted": False,
+        "pending": True,
+        "errors": [],
+        "started": None,
+    }
+
+
+def check_shift_access(pos_opening_shift: str):
+    """Allow the shift's cashier and users who may read the opening shift."""
+
+    user = frappe.db.get_value("POS Opening Shift", pos_opening_shift, "user")
+    if user != frappe.session.user and not frappe.has_permission(
+        "POS Opening Shift", "read", pos_opening_shift
+    ):
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+
+
+def ensure_no_running_submission(pos_opening_shift: str):
+    state = _read_state(pos_opening_shift)
+    if state and not state["complete"]:
+        frappe.throw(_("Printed invoices of this shift are still being submitted. Please wait."))
+
+
+@frappe.whitelist()
+def submit_shift_invoices(pos_opening_shift):
+    """Start submitting the printed drafts of ``pos_opening_shift`` in the background.
+
+    Returns the progress of the run. A run already in progress for the shift
+    is reported instead of starting a second one.
+    """
+
+    check_shift_access(pos_opening_shift)
+    cache = frappe.cache()
+    lock_key = _start_lock_key(cache, pos_opening_shift)
+    if not cache.set(lock_key, frappe.session.user, nx=True, ex=START_LOCK_TTL):
+        # Another request is starting a run right now. Until it has recorded
+        # the run, any state found is the previous run's.
+        return _pending_state(pos_opening_shift)
+
+    try:
+        state = _read_state(pos_opening_shift)
+        if state and not state["complete"]:
+            return state
+        _start_run(cache, pos_opening_shift)
+    finally:
+        cache.delete(lock_key)
+
+    return _read_state(pos_opening_shift)
+
+
+def _start_run(cache, pos_opening_shift: str):
+    doctype = shift_invoice_doctype(pos_opening_shift)
+    names = printed_drafts(pos_opening_shift, doctype)
+    pool_size = _pool_size()
+    chunks = [chunk for chunk in (names[i::pool_size] for i in range(pool_size)) if chunk]
+
+    state_key = _state_key(cache, pos_opening_shift)
+    errors_key = _errors_key(cache, pos_opening_shift)
+    pipe = cache.pipeline()
+    pipe.delete(state_key, errors_key)
+    pipe.hset(
+        state_key,
+        mapping={
+            "doctype": doctype,
+            "user": frappe.session.user,
+            "total": len(names),
+            "done": 0,
+            "failed": 0,
+            "workers": len(chunks),
+            "finished": 0,
+            "started": str(now_datetime()),
+        },
+    )
+    pipe.expire(state_key, STATE_TTL)
+    pipe.execute()
+
+    # enqueue() pushes to redis right away, before this request commits; the
+    # workers only read the drafts, which are committed already, and the state
+    # above lives in redis too, so nothing they need waits on the commit.
+    run = frappe.generate_hash(length=8)
+    jobs = []
+    try:
+        for index, chunk in enumerate(chunks):
+            job_id = f"posa_shift_submission::{pos_opening_shift}::{run}::{index}"
+            enqueue(
+                submit_invoice_chunk,
+                queue="long",
+                timeout=JOB_TIMEOUT,
+                job_id=job_id,
+                pos_opening_shift=pos_opening_shift,
+                doctype=doctype,
+                names=chunk,
+            )
+            jobs.append(job_id)
+    finally:
+        # Recorded even when queueing failed half way, so the missing
+        # workers show up as an interrupted run rather than a stuck one.
+        cache.pipeline().hset(state_key, "jobs", ",".join(jobs)).execute()
+
+
+def submit_invoice_chunk(pos_opening_shift: str, doctype: str, names: List[str]):
+    """Background job submitting one worker's share of a shift's printed drafts."""
+
+    cache = frappe.cache()
+    state_key = _state_key(cache, pos_opening_shift)
+    user = cstr(cache.hmget(state_key, ["user"])[0]) or None
+
+    try:
+        for name in names:
+            error = None
+            try:
+                submit_draft(doctype, name)
+                frappe.db.commit()
+            except Exception:
+                frappe.db.rollback()
+                frappe.log_error(frappe.get_traceback(), f"POS shift submission failed: {name}")
+                error = frappe.get_traceback().strip().splitlines()[-1]
+                frappe.clear_messages()
+
+            pipe = cache.pipeline()
+            if error:
+                pipe.hincrby(state_key, "failed", 1)
+                pipe.rpush(
+                    _errors_key(cache, pos_opening_shift),
+                    json.dumps({"invoice": name, "error": error}),
+                )
+                pipe.expire(_errors_key(cache, pos_opening_shift), STATE_TTL)
+            else:
+                pipe.hincrby(state_key, "done", 1)
+            pipe.execute()
+            _publish(pos_opening_shift, user, invoice=name, error=error)
+    finally:
+        pipe = cache.pipeline()
+        pipe.hincrby(state_key, "finished", 1)
+        pipe.hget(state_key, "workers")
+        finished, workers = pipe.execute()
+        # Only the last worker to report back announces completion.
+        if finished == cint(workers):
+            _publish(pos_opening_shift, user)
+
+
+def _publish(pos_opening_shift: str, user: Optional[str], **message):
+    # Called from the running jobs themselves, so they need no liveness check.
+    state = _read_state(pos_opening_shift, check_jobs=False)
+    if not state:
+        return
+    frappe.publish_realtime(
+        PROGRESS_EVENT,
+        {**state, **message},
+        user=user,
+    )
+
+
+@frappe.whitelist()
+def get_shift_submission_progress(pos_opening_shift):
+    """Return the progress of the last run for ``pos_opening_shift``, if any.
+
+    While a run is being started the progress is reported as ``pending``.
+    """
+
+    check_shift_access(pos_opening_shift)
+    cache = frappe.cache()
+    if cache.get(_start_lock_key(cache, pos_opening_shift)):
+        return _pending_state(pos_opening_shift)
+    return _read_state(pos_opening_shift)
@@ -0,0 +1,410 @@
+"""Running totals per POS Opening Shift.
+
+Every submitted or cancelled shift invoice and shift payment entry adds its
+amounts to ``POS Shift Total`` rows: one row per shift, metric, dimension
+(mode of payment or tax account), tax rate and currency. Each row holds both
+transaction and company currency sums. Closing a shift or an X-report then
+reads a handful of rows instead of the shift's invoices.
+
+The document hooks only collect the deltas. The rows are upserted with
+``INSERT ... ON DUPLICATE KEY UPDATE`` just before the transaction commits,
+so concurrent submissions in one shift hold the shared rows for the commit
+only, not for the whole submit. A rolled back submit drops its deltas too.
+
+Totals are complete only for shifts opened after this was introduced. Those
+shifts carry the :data:`OPENED` marker row; :func:`get_shift_totals` returns
+``None`` for the others and :func:`get_shift_summary` falls back to summing
+the invoices in the database.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, cstr, flt, now_datetime
+
+SHIFT_TOTAL_DOCTYPE = "POS Shift Total"
+
+OPENED = "opened"
+INVOICES = "invoices"
+GRAND_TOTAL = "grand_total"
+NET_TOTAL = "net_total"
+QUANTITY = "total_qty"
+CHANGE = "change_amount"
+TAX = "tax"
+PAYMENT = "payment"
+PAYMENT_ENTRY = "payment_entry"
+
+# (metric, dimension, rate, currency); deltas map it to [amount, base_amount, document_count].
+RowKey = Tuple[str, str, float, str]
+
+
+def _row_name(pos_opening_shift: str, key: RowKey) -> str:
+    metric, dimension, rate, currency = key
+    raw = f"{pos_opening_shift}\x1f{metric}\x1f{dimension}\x1f{flt(rate)}\x1f{currency}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _add(
+    deltas: Dict[RowKey, List[float]],
+    metric: str,
+    amount,
+    base_amount,
+    count: int = 0,
+    dimension: str = "",
+    rate=0,
+    currency: str = "",
+):
+    row = deltas.setdefault((metric, cstr(dimension), flt(rate), cstr(currency)), [0.0, 0.0, 0])
+    row[0] += flt(amount)
+    row[1] += flt(base_amount)
+    row[2] += count
+
+
+def _upsert(pos_opening_shift: str, deltas: Dict[RowKey, List[float]]):
+    if not deltas:
+        return
+
+    timestamp = now_datetime()
+    user = frappe.session.user
+    # Rows in a fixed order, so concurrent upserts lock them in the same order.
+    rows = sorted((_row_name(pos_opening_shift, key), key, values) for key, values in deltas.items())
+    params: List[Any] = []
+    for name, (metric, dimension, rate, currency), (amount, base_amount, count) in rows:
+        params += [name, timestamp, timestamp, user, user, pos_opening_shift]
+        params += [metric, dimension, rate, currency or None, amount, base_amount, count]
+
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * 13) + ")"] * len(rows))
+    frappe.db.sql(
+        f"""
+        insert into `tab{SHIFT_TOTAL_DOCTYPE}`
+            (name, creation, modified, owner, modified_by, pos_opening_shift,
+             metric, dimension, rate, currency, amount, base_amount, document_count)
+        values {placeholders}
+        on duplicate key update
+            amount = amount + values(amount),
+            base_amount = base_amount + values(base_amount),
+            document_count = document_count + values(document_count),
+            modified = values(modified),
+            modified_by = values(modified_by)
+        """,
+        params,
+    )
+
+
+def _apply_before_commit(pos_opening_shift: str, deltas: Dict[RowKey, List[float]]):
+    frappe.db.before_commit.add(lambda: _upsert(pos_opening_shift, deltas))
+
+
+def _invoice_deltas(doc, sign: int) -> Dict[RowKey, List[float]]:
+    currency = doc.currency
+    deltas: Dict[RowKey, List[float]] = {}
+    _add(deltas, INVOICES, 0, 0, sign, currency=currency)
+    for metric in (GRAND_TOTAL, NET_TOTAL):
+        amount, base_amount = flt(doc.get(metric)), flt(doc.get(f"base_{metric}"))
+        _add(deltas, metric, sign * amount, sign * base_amount, currency=currency)
+    _add(deltas, QUANTITY, sign * flt(doc.total_qty), sign * flt(doc.total_qty))
+    if flt(doc.change_amount):
+        _add(
+            deltas,
+            CHANGE,
+            sign * flt(doc.change_amount),
+            sign * flt(doc.base_change_amount),
+            currency=currency,
+        )
+    for tax in doc.get("taxes") or []:
+        _add(
+            deltas,
+            TAX,
+            sign * flt(tax.tax_amount),
+            sign * flt(tax.base_tax_amount),
+            dimension=tax.account_head,
+            rate=tax.rate,
+            currency=currency,
+        )
+    for payment in doc.get("payments") or []:
+        if flt(payment.amount):
+            _add(
+                deltas,
+                PAYMENT,
+                sign * flt(payment.amount),
+                sign * flt(payment.base_amount),
+                dimension=payment.mode_of_payment,
+                currency=currency,
+            )
+    return deltas
+
+
+def update_invoice_totals(doc, sign: int):
+    """Add (``sign=1``) or take back (``sign=-1``) a shift invoice."""
+
+    if not doc.get("posa_pos_opening_shift") or doc.get("is_consolidated"):
+        return
+    _apply_before_commit(doc.posa_pos_opening_shift, _invoice_deltas(doc, sign))
+
+
+def _payment_entry_shift(doc) -> Optional[str]:
+    if doc.payment_type != "Receive" or not doc.reference_no:
+        return None
+    if not frappe.db.exists("POS Opening Shift", doc.reference_no):
+        return None
+    return doc.reference_no
+
+
+def update_payment_entry_totals(doc, method=None):
+    """Payment Entry ``on_submit`` / ``on_cancel`` hook for shift payments."""
+
+    pos_opening_shift = _payment_entry_shift(doc)
+    if not pos_opening_shift:
+        return
+    sign = -1 if method == "on_cancel" else 1
+    deltas: Dict[RowKey, List[float]] = {}
+    _add(
+        deltas,
+        PAYMENT_ENTRY,
+        sign * flt(doc.paid_amount),
+        sign * flt(doc.base_paid_amount),
+        sign,
+        dimension=doc.mode_of_payment,
+        currency=doc.paid_from_account_currency or doc.paid_to_account_currency,
+    )
+    _apply_before_commit(pos_opening_shift, deltas)
+
+
+def mark_shift_opened(pos_opening_shift: str):
+    """Start the running totals of a new shift."""
+
+    _upsert(pos_opening_shift, {(OPENED, "", 0.0, ""): [0.0, 0.0, 1]})
+
+
+def get_shift_totals(pos_opening_shift: str) -> Optional[frappe._dict]:
+    """Return the running totals of a shift, or ``None`` when they are incomplete.
+
+    Totals are in company currency; ``currencies`` breaks sales, net and change
+    down per transaction currency and ``payments`` / ``payment_entries`` per
+    mode of payment and currency.
+    """
+
+    rows = frappe.db.sql(
+        f"""
+        select metric, dimension, rate, currency, amount, base_amount, document_count
+        from `tab{SHIFT_TOTAL_DOCTYPE}`
+        where pos_opening_shift = %s
+        """,
+        pos_opening_shift,
+        as_dict=1,
+    )
+    if not any(row.metric == OPENED for row in rows):
+        return None
+
+    totals = frappe._dict(
+        invoices=0,
+        grand_total=0.0,
+        net_total=0.0,
+        total_qty=0.0,
+        change_amount=0.0,
+        currencies={},
+        taxes={},
+        payments=[],
+        payment_entries=[],
+    )
+    for row in rows:
+        if row.metric == INVOICES:
+            totals.invoices += cint(row.document_count)
+        elif row.metric in (GRAND_TOTAL, NET_TOTAL, CHANGE):
+            totals[row.metric] += flt(row.base_amount)
+            currency = totals.currencies.setdefault(
+                row.currency, frappe._dict(grand_total=0.0, net_total=0.0, change_amount=0.0)
+            )
+            currency[row.metric] += flt(row.amount)
+        elif row.metric == QUANTITY:
+            totals.total_qty += flt(row.amount)
+        elif row.metric == TAX:
+            # Tax rows are kept per currency; the summary is in company currency.
+            tax = totals.taxes.setdefault(
+                (row.dimension, flt(row.rate)),
+                frappe._dict(account_head=row.dimension, rate=flt(row.rate), amount=0.0),
+            )
+            tax.amount += flt(row.base_amount)
+        elif row.metric in (PAYMENT, PAYMENT_ENTRY):
+            totals[f"{row.metric}s"].append(
+                frappe._dict(
+                    mode_of_payment=row.dimension,
+                    currency=row.currency,
+                    amount=flt(row.amount),
+                    base_amount=flt(row.base_amount),
+                    count=cint(row.document_count),
+                )
+            )
+
+    totals.taxes = sorted(totals.taxes.values(), key=lambda tax: (tax.account_head, tax.rate))
+    totals.payments.sort(key=lambda row: (row.mode_of_payment, cstr(row.currency)))
+    totals.payment_entries.sort(key=lambda row: (row.mode_of_payment, cstr(row.currency)))
+    return totals
+
+
+# Both invoice doctypes share these child tables.
+TAX_TABLE = "Sales Taxes and Charges"
+PAYMENT_TABLE = "Sales Invoice Payment"
+
+
+def _base_sql(field, base_field):
+    """SQL for a company currency amount of ``inv`` or a child row."""
+
+    return f"ifnull({base_field}, {field} * ifnull(nullif(inv.conversion_rate, 0), 1))"
+
+
+def shift_invoice_condition(doctype):
+    """SQL condition on alias ``inv`` selecting the submitted invoices of a shift."""
+
+    condition = "inv.docstatus = 1 and inv.posa_pos_opening_shift = %(pos_opening_shift)s"
+    if doctype == "POS Invoice":
+        condition += " and ifnull(inv.consolidated_invoice, '') = ''"
+    else:
+        # Merged from POS Invoices counted already; the running totals skip them too.
+        condition += " and ifnull(inv.is_consolidated, 0) = 0"
+    return condition
+
+
+def get_invoice_rows(doctype, condition, values):
+    """Return one light row per invoice matching ``condition`` (on alias ``inv``)."""
+
+    return frappe.db.sql(
+        f"""
+        select
+            inv.name, inv.posting_date, inv.customer, inv.currency, inv.conversion_rate,
+            inv.grand_total, inv.base_grand_total, inv.net_total, inv.base_net_total,
+            inv.total_qty, inv.change_amount, inv.base_change_amount
+        from `tab{doctype}` inv
+        where {condition}
+        order by inv.posting_date, inv.posting_time, inv.name
+        """,
+        values,
+        as_dict=1,
+    )
+
+
+def get_currency_totals(doctype, condition, values):
+    """Invoice totals per transaction currency, in that currency and in company currency."""
+
+    return frappe.db.sql(
+        f"""
+        select
+            inv.currency,
+            sum(inv.grand_total) as grand_total,
+            sum({_base_sql("inv.grand_total", "inv.base_grand_total")}) as base_grand_total,
+            sum(inv.net_total) as net_total,
+            sum({_base_sql("inv.net_total", "inv.base_net_total")}) as base_net_total,
+            sum(inv.total_qty) as total_qty,
+            sum(inv.change_amount) as change_amount,
+            sum({_base_sql("inv.change_amount", "inv.base_change_amount")}) as base_change_amount
+        from `tab{doctype}` inv
+        where {condition}
+        group by inv.currency
+        """,
+        values,
+        as_dict=1,
+    )
+
+
+def get_payment_totals(doctype, condition, values):
+    """Invoice payments per mode of payment and transaction currency."""
+
+    return frappe.db.sql(
+        f"""
+        select
+            p.mode_of_payment,
+            inv.currency,
+            sum(p.amount) as amount,
+            sum({_base_sql("p.amount", "p.base_amount")}) as base_amount
+        from `tab{PAYMENT_TABLE}` p
+        inner join `tab{doctype}` inv on inv.name = p.parent and p.parenttype = %(doctype)s
+        where {condition}
+        group by p.mode_of_payment, inv.currency
+        order by min(p.idx), p.mode_of_payment
+        """,
+        {**values, "doctype": doctype},
+        as_dict=1,
+    )
+
+
+def get_tax_totals(doctype, condition, values):
+    """Invoice taxes in company currency per account head and rate."""
+
+    return frappe.db.sql(
+        f"""
+        select
+            t.account_head,
+            t.rate,
+            sum({_base_sql("t.tax_amount", "t.base_tax_amount")}) as amount
+        from `tab{TAX_TABLE}` t
+        inner join `tab{doctype}` inv on inv.name = t.parent and t.parenttype = %(doctype)s
+        where {condition}
+        group by t.account_head, t.rate
+        order by min(t.idx), t.account_head
+        """,
+        {**values, "doctype": doctype},
+        as_dict=1,
+    )
+
+
+def get_child_rows(doctype, child_doctype, fields, condition, values):
+    """Return child rows of the matching invoices grouped by parent name."""
+
+    rows = frappe.db.sql(
+        f"""
+        select c.parent, {", ".join(f"c.{field}" for field in fields)}
+        from `tab{child_doctype}` c
+        inner join `tab{doctype}` inv on inv.name = c.parent and c.parenttype = %(doctype)s
+        where {condition}
+        order by c.parent, c.idx
+        """,
+        {**values, "doctype": doctype},
+        as_dict=1,
+    )
+    by_parent = defaultdict(list)
+    for row in rows:
+        by_parent[row.pop("parent")].append(row)
+    return by_parent
+
+
+def get_shift_summary(pos_opening_shift, doctype):
+    """Company currency totals, taxes and payments of a shift's invoices.
+
+    Read from the running ``POS Shift Total`` rows when the shift has them,
+    otherwise summed by the database; either way closing costs the same
+    handful of queries whatever the number of invoices.
+    """
+
+    summary = get_shift_totals(pos_opening_shift)
+    if summary:
+        return summary
+
+    condition = shift_invoice_condition(doctype)
+    values = {"pos_opening_shift": pos_opening_shift}
+    summary = frappe._dict(
+        grand_total=0.0,
+        net_total=0.0,
+        total_qty=0.0,
+        change_amount=0.0,
+        currencies={},
+        payments=get_payment_totals(doctype, condition, values),
+        taxes=[
+            frappe._dict(account_head=t.account_head, rate=t.rate, amount=flt(t.amount))
+            for t in get_tax_totals(doctype, condition, values)
+        ],
+    )
+    for totals in get_currency_totals(doctype, condition, values):
+        summary.grand_total += flt(totals.base_grand_total)
+        summary.net_total += flt(totals.base_net_total)
+        summary.total_qty += flt(totals.total_qty)
+        summary.change_amount += flt(totals.base_change_amount)
+        summary.currencies[totals.currency] = frappe._dict(
+            grand_total=flt(totals.grand_total),
+            net_total=flt(totals.net_total),
+            change_amount=flt(totals.change_amount),
+        )
+    return summary
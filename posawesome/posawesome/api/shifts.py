@@ -5,9 +5,11 @@
 from __future__ import unicode_literals
 import json
 import frappe
-from frappe.utils import cint, nowdate, flt
+from frappe.utils import cint, cstr, nowdate, flt, now_datetime
 from frappe import _
 from .utilities import get_version
+from .shift_submission import check_shift_access, shift_invoice_doctype
+from .shift_totals import get_shift_summary, get_shift_totals
 
 
 @frappe.whitelist()
@@ -110,3 +112,140 @@ def update_opening_shift_data(data, pos_profile):
     allow_negative_stock = cint(frappe.db.get_single_value("Stock Settings", "allow_negative_stock") or 0)
     data["stock_settings"] = {}
     data["stock_settings"].update({"allow_negative_stock": bool(allow_negative_stock)})
+
+
+# Legacy shifts without running totals are summed from their invoices; the
+# result is cached briefly so a polling dashboard does not rerun the sums.
+X_REPORT_FALLBACK_TTL = 10
+
+
+def _x_report_summary(opening_shift):
+    summary = get_shift_totals(opening_shift.name)
+    if summary:
+        summary.source = "running_totals"
+        return summary
+
+    cache_key = f"posa_x_report:{opening_shift.name}"
+    summary = frappe.cache().get_value(cache_key)
+    if summary:
+        return frappe._dict(summary)
+
+    doctype = shift_invoice_doctype(opening_shift.name)
+    summary = get_shift_summary(opening_shift.name, doctype)
+    summary.source = "invoices"
+    summary.payment_entries = frappe.db.sql(
+        """
+        select
+            mode_of_payment,
+            ifnull(paid_from_account_currency, paid_to_account_currency) as currency,
+            sum(paid_amount) as amount,
+            sum(base_paid_amount) as base_amount,
+            count(*) as count
+        from `tabPayment Entry`
+        where docstatus = 1 and payment_type = 'Receive' and reference_no = %s
+        group by mode_of_payment, ifnull(paid_from_account_currency, paid_to_account_currency)
+        """,
+        opening_shift.name,
+        as_dict=1,
+    )
+    frappe.cache().set_value(cache_key, summary, expires_in_sec=X_REPORT_FALLBACK_TTL)
+    return summary
+
+
+@frappe.whitelist()
+def get_x_report(pos_opening_shift):
+    """Current totals of an open or closed shift, for mid-shift cash counts.
+
+    Read only: nothing is submitted and no invoice row is locked, so it can be
+    polled while the shift is trading. Amounts are in company currency unless
+    listed under ``currencies``; each mode of payment carries its opening
+    float, invoice and payment entry takings, the change given (cash only) and
+    the resulting expected amount.
+    """
+
+    opening_shift = frappe.db.get_value(
+        "POS Opening Shift",
+        pos_opening_shift,
+        ["name", "pos_profile", "company", "user", "status", "period_start_date"],
+        as_dict=1,
+    )
+    if not opening_shift:
+        frappe.throw(_("POS Opening Shift {0} not found").format(pos_opening_shift), frappe.DoesNotExistError)
+    check_shift_access(pos_opening_shift)
+    summary = _x_report_summary(opening_shift)
+    cash_mode_of_payment = (
+        frappe.db.get_value("POS Profile", opening_shift.pos_profile, "posa_cash_mode_of_payment") or "Cash"
+    )
+
+    modes = {}
+
+    def mode_row(mode_of_payment):
+        return modes.setdefault(
+            mode_of_payment,
+            frappe._dict(
+                mode_of_payment=mode_of_payment,
+                opening_amount=0.0,
+                invoice_amount=0.0,
+                payment_entry_amount=0.0,
+                change_amount=0.0,
+                expected_amount=0.0,
+                currencies={},
+            ),
+        )
+
+    for detail in frappe.get_all(
+        "POS Opening Shift Detail",
+        filters={"parent": opening_shift.name, "parenttype": "POS Opening Shift"},
+        fields=["mode_of_payment", "amount"],
+        order_by="idx",
+    ):
+        mode_row(detail.mode_of_payment).opening_amount += flt(detail.amount)
+
+    def add_currency_amount(row, currency, amount):
+        currency = cstr(currency)
+        row.currencies[currency] = row.currencies.get(currency, 0.0) + flt(amount)
+
+    takings = (("invoice_amount", summary.payments), ("payment_entry_amount", summary.payment_entries))
+    for field, payments in takings:
+        for payment in payments:
+            row = mode_row(payment.mode_of_payment)
+            row[field] += flt(payment.base_amount)
+            add_currency_amount(row, payment.currency, payment.amount)
+
+    if summary.change_amount:
+        row = mode_row(cash_mode_of_payment)
+        row.change_amount = flt(summary.change_amount)
+        for currency, totals in summary.currencies.items():
+            add_currency_amount(row, currency, -flt(totals.change_amount))
+
+    for row in modes.values():
+        row.expected_amount = (
+            row.opening_amount + row.invoice_amount + row.payment_entry_amount - row.change_amount
+        )
+        row.currencies = [
+            {"currency": currency or None, "amount": amount}
+            for currency, amount in sorted(row.currencies.items())
+            if amount
+        ]
+
+    return {
+        "pos_opening_shift": opening_shift.name,
+        "pos_profile": opening_shift.pos_profile,
+        "user": opening_shift.user,
+        "status": opening_shift.status,
+        "period_start_date": opening_shift.period_start_date,
+        "generated_at": now_datetime(),
+        "company_currency": frappe.get_cached_value("Company", opening_shift.company, "default_currency"),
+        "source": summary.source,
+        "invoices": summary.get("invoices"),
+        "grand_total": flt(summary.grand_total),
+        "net_total": flt(summary.net_total),
+        "total_qty": flt(summary.total_qty),
+        "change_amount": flt(summary.change_amount),
+        "currencies": [
+            {"currency": currency, **totals}
+            for currency, totals in sorted(summary.currencies.items(), key=lambda item: cstr(item[0]))
+        ],
+        "payments": list(modes.values()),
+        "taxes": summary.taxes,
+    }
@@ -0,0 +1,229 @@
+"""Background submission of printed POS drafts.
+
+Profiles with ``posa_allow_submissions_in_background_job`` save the invoice as
+a printed draft at checkout and leave the submit to a worker. Drafts are kept
+in a redis sorted set scored by the time they were queued: one entry per
+invoice holding only ``doctype::name``, so queuing an invoice twice is a
+no-op. A single drain job, guarded by a redis lock, submits the oldest drafts
+in batches until the queue is empty.
+
+Invoices that fail are retried at the back of the queue and dropped after
+:data:`MAX_ATTEMPTS`; their last error stays visible through
+:func:`get_submission_queue_status`.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, Optional
+
+import frappe
+from frappe.utils import cstr, now_datetime
+from frappe.utils.background_jobs import enqueue
+
+from posawesome.posawesome.api.payments import redeeming_customer_credit
+
+QUEUE_KEY = "posa_submission_queue"
+ARGS_KEY = "posa_submission_queue:args"
+FAILURES_KEY = "posa_submission_queue:failures"
+DRAIN_LOCK_KEY = "posa_submission_queue:draining"
+DRAIN_JOB_ID = "posa_drain_submission_queue"
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 3
+# The drain job hands over to a fresh job after this many seconds.
+DRAIN_TIME_BUDGET = 240
+DRAIN_LOCK_TTL = DRAIN_TIME_BUDGET + 60
+
+
+def _member(doctype: str, name: str) -> str:
+    return f"{doctype}::{name}"
+
+
+def _keys(cache) -> Dict[str, str]:
+    return {
+        "queue": cache.make_key(QUEUE_KEY),
+        "args": cache.make_key(ARGS_KEY),
+        "failures": cache.make_key(FAILURES_KEY),
+        "lock": cache.make_key(DRAIN_LOCK_KEY),
+    }
+
+
+def queue_invoice_submission(invoice_doc, data: Dict[str, Any], settlement: Dict[str, Any]):
+    """Queue a saved draft for background submission once the request commits.
+
+    Only customer credit redemptions need more than the invoice itself; their
+    arguments are kept next to the queue entry.
+    """
+
+    member = _member(invoice_doc.doctype, invoice_doc.name)
+    args = None
+    if data.get("redeemed_customer_credit"):
+        args = {
+            "data": {
+                "redeemed_customer_credit": data.get("redeemed_customer_credit"),
+                "customer_credit_dict": data.get("customer_credit_dict"),
+            },
+            "is_payment_entry": settlement.get("is_payment_entry"),
+            "total_cash": settlement.get("total_cash"),
+            "cash_account": settlement.get("cash_account"),
+        }
+    frappe.db.after_commit.add(lambda: _push(member, args))
+
+
+def _push(member: str, args: Optional[Dict[str, Any]]):
+    cache = frappe.cache()
+    keys = _keys(cache)
+    pipe = cache.pipeline()
+    if args:
+        pipe.hset(keys["args"], member, json.dumps(args, default=str))
+    pipe.zadd(keys["queue"], {member: time.time()}, nx=True)
+    pipe.execute()
+    _enqueue_drain()
+
+
+def _enqueue_drain(handover: bool = False):
+    job_id = DRAIN_JOB_ID
+    if handover:
+        # Deduplication counts started jobs too, so the drain job handing over
+        # would find itself under the shared id and enqueue nothing.
+        job_id = f"{DRAIN_JOB_ID}::{frappe.generate_hash(length=8)}"
+    enqueue(
+        drain_submission_queue,
+        queue="short",
+        timeout=DRAIN_LOCK_TTL,
+        job_id=job_id,
+        deduplicate=True,
+    )
+
+
+def ensure_queue_draining():
+    """Scheduler safety net for drafts the drain jobs may have missed.
+
+    A draft queued between a drain job's final look at the queue and the end
+    of that job is enqueued under the still started job's id, which
+    deduplication swallows.
+    """
+
+    cache = frappe.cache()
+    if cache.zcard(_keys(cache)["queue"]):
+        _enqueue_drain()
+
+
+def drain_submission_queue():
+    """Background job submitting queued drafts, oldest first."""
+
+    cache = frappe.cache()
+    keys = _keys(cache)
+    if not cache.set(keys["lock"], 1, nx=True, ex=DRAIN_LOCK_TTL):
+        return
+
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < DRAIN_TIME_BUDGET:
+            members = cache.zrange(keys["queue"], 0, BATCH_SIZE - 1)
+            if not members:
+                break
+            for member in members:
+                _submit_queued(cache, keys, cstr(member))
+    finally:
+        cache.delete(keys["lock"])
+
+    # Drafts left when the time budget ran out, or queued after the last batch
+    # while _push could not enqueue past this job: continue in a fresh job.
+    if cache.zcard(keys["queue"]):
+        _enqueue_drain(handover=True)
+
+
+def submit_draft(doctype: str, name: str):
+    """Submit a draft invoice under a row lock.
+
+    Returns the submitted document, or ``None`` when the invoice is no
+    longer a draft because another worker or request submitted it first.
+    """
+
+    # Row lock: a concurrent submit of the same draft waits here.
+    if frappe.db.get_value(doctype, name, "docstatus", for_update=True) != 0:
+        return None
+    invoice_doc = frappe.get_doc(doctype, name)
+    invoice_doc.flags.ignore_permissions = True
+    frappe.flags.ignore_account_permission = True
+    invoice_doc.submit()
+    return invoice_doc
+
+
+def _submit_queued(cache, keys: Dict[str, str], member: str):
+    doctype, name = member.split("::", 1)
+    raw_args = cache.hmget(keys["args"], [member])[0]
+    args = json.loads(raw_args) if raw_args else None
+
+    try:
+        invoice_doc = submit_draft(doctype, name)
+        if invoice_doc and args:
+            redeeming_customer_credit(
+                invoice_doc,
+                args["data"],
+                args["is_payment_entry"],
+                args["total_cash"],
+                args["cash_account"],
+                invoice_doc.payments,
+            )
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"POS background submission failed: {name}")
+        _record_failure(cache, keys, member)
+        return
+
+    pipe = cache.pipeline()
+    pipe.zrem(keys["queue"], member)
+    pipe.hdel(keys["args"], member)
+    pipe.hdel(keys["failures"], member)
+    pipe.execute()
+
+
+def _record_failure(cache, keys: Dict[str, str], member: str):
+    raw = cache.hmget(keys["failures"], [member])[0]
+    failure = json.loads(raw) if raw else {"attempts": 0}
+    failure["attempts"] += 1
+    failure["error"] = frappe.get_traceback().strip().splitlines()[-1]
+    failure["at"] = str(now_datetime())
+
+    pipe = cache.pipeline()
+    pipe.hset(keys["failures"], member, json.dumps(failure))
+    if failure["attempts"] >= MAX_ATTEMPTS:
+        pipe.zrem(keys["queue"], member)
+        pipe.hdel(keys["args"], member)
+    else:
+        # Retry after the drafts queued in the meantime.
+        pipe.zadd(keys["queue"], {member: time.time()}, xx=True)
+    pipe.execute()
+
+
+@frappe.whitelist()
+def get_submission_queue_status():
+    """Return queue depth, the age of the oldest queued draft and recent failures."""
+
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    keys = _keys(cache)
+    pipe = cache.pipeline()
+    pipe.zcard(keys["queue"])
+    pipe.zrange(keys["queue"], 0, 0, withscores=True)
+    pipe.hgetall(keys["failures"])
+    pipe.get(keys["lock"])
+    depth, oldest, failures, draining = pipe.execute()
+
+    failed = []
+    for member, value in failures.items():
+        doctype, name = cstr(member).split("::", 1)
+        failed.append({"doctype": doctype, "invoice": name, **json.loads(value)})
+
+    return {
+        "depth": depth,
+        "oldest": cstr(oldest[0][0]) if oldest else None,
+        "lag_seconds": round(time.time() - oldest[0][1], 1) if oldest else 0,
+        "draining": bool(draining),
+        "failed": failed,
+    }
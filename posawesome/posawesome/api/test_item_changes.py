@@ -0,0 +1,117 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from posawesome.posawesome.api.item_changes import (
+    CHANGE_LOG_DOCTYPE,
+    CURSOR_SAFETY_LAG,
+    _log_change,
+    get_item_changes,
+    log_stock_change,
+)
+
+MODULE = "posawesome.posawesome.api.item_changes"
+ITEM_CODE = "POSA-CHANGES-TEST"
+REMOVED_CODE = "POSA-CHANGES-GONE"
+PROFILE = {"name": "TestProfile", "selling_price_list": "Standard Selling"}
+
+
+def _shape_rows(rows, items_data, *args, **kwargs):
+    rows.extend({"item_code": item.item_code} for item in items_data)
+
+
+class TestItemChanges(FrappeTestCase):
+    def setUp(self):
+        if not frappe.db.exists("Item", ITEM_CODE):
+            frappe.get_doc(
+                {
+                    "doctype": "Item",
+                    "item_code": ITEM_CODE,
+                    "item_name": "Changes Test",
+                    "stock_uom": "Nos",
+                    "is_stock_item": 0,
+                    "item_group": "All Item Groups",
+                    "is_sales_item": 1,
+                    "is_fixed_asset": 0,
+                }
+            ).insert(ignore_permissions=True, ignore_mandatory=True)
+        frappe.db.delete(CHANGE_LOG_DOCTYPE)
+
+        patcher = patch(f"{MODULE}._append_shaped_rows", side_effect=_shape_rows)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log(self, item_code, age=CURSOR_SAFETY_LAG + 5):
+        _log_change(item_code, "Item")
+        name = frappe.db.sql(f"select max(name) from `tab{CHANGE_LOG_DOCTYPE}`")[0][0]
+        frappe.db.sql(
+            f"update `tab{CHANGE_LOG_DOCTYPE}` set creation = %s where name = %s",
+            (add_to_date(now_datetime(), seconds=-age), name),
+        )
+        return name
+
+    def test_missing_cursor_resets(self):
+        latest = self.log(ITEM_CODE)
+        response = get_item_changes(PROFILE)
+        self.assertTrue(response["reset"])
+        self.assertEqual(response["cursor"], latest)
+        self.assertEqual(response["items"], [])
+
+    def test_cursor_older_than_journal_resets(self):
+        oldest = self.log(ITEM_CODE)
+        self.log(ITEM_CODE)
+        self.assertTrue(get_item_changes(PROFILE, cursor=oldest - 2)["reset"])
+        self.assertFalse(get_item_changes(PROFILE, cursor=oldest - 1)["reset"])
+
+    def test_cursor_holds_back_recent_changes(self):
+        settled = self.log(ITEM_CODE)
+        self.log(REMOVED_CODE, age=0)
+
+        response = get_item_changes(PROFILE, cursor=settled - 1)
+        self.assertEqual(response["cursor"], settled)
+        self.assertEqual(response["items"], [{"item_code": ITEM_CODE}])
+        self.assertEqual(response["removed"], [])
+
+        response = get_item_changes(PROFILE, cursor=settled)
+        self.assertEqual(response["cursor"], settled)
+        self.assertEqual(response["items"], [])
+
+    def test_unsellable_items_are_removed(self):
+        first = self.log(ITEM_CODE)
+        self.log(REMOVED_CODE)
+        self.log(ITEM_CODE)
+
+        response = get_item_changes(PROFILE, cursor=first - 1)
+        self.assertEqual(response["items"], [{"item_code": ITEM_CODE}])
+        self.assertEqual(response["removed"], [REMOVED_CODE])
+        self.assertFalse(response["has_more"])
+
+    def test_page_limit_moves_cursor_to_last_row(self):
+        first = self.log(ITEM_CODE)
+        self.log(REMOVED_CODE)
+
+        response = get_item_changes(PROFILE, cursor=first - 1, limit=1)
+        self.assertTrue(response["has_more"])
+        self.assertEqual(response["cursor"], first)
+        self.assertEqual(response["items"], [{"item_code": ITEM_CODE}])
+
+    def test_stock_changes_are_journalled_once_per_item_and_warehouse(self):
+        def ledger_entry(warehouse, qty=1):
+            return frappe._dict(
+                doctype="Stock Ledger Entry", item_code=ITEM_CODE, warehouse=warehouse, actual_qty=qty
+            )
+
+        for doc in (ledger_entry("Stores - A"), ledger_entry("Stores - A", -2), ledger_entry("Shop - A")):
+            log_stock_change(doc)
+        log_stock_change(ledger_entry("Stores - A", 0))
+        self.assertEqual(frappe.db.count(CHANGE_LOG_DOCTYPE), 0)
+
+        # What frappe.db.commit() runs first, keeping the test transaction open.
+        frappe.db.before_commit.run()
+        rows = frappe.get_all(CHANGE_LOG_DOCTYPE, fields=["item_code", "warehouse"], order_by="warehouse")
+        self.assertEqual(
+            [(row.item_code, row.warehouse) for row in rows],
+            [(ITEM_CODE, "Shop - A"), (ITEM_CODE, "Stores - A")],
+        )
@@ -0,0 +1,58 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.item_fetchers import (
+    CacheSpec,
+    evict_item_caches,
+    price_rows_by_uom,
+    read_item_caches,
+)
+
+ITEM_CODE = "POSA-FETCHERS-TEST"
+
+
+class TestItemCacheWriteBack(FrappeTestCase):
+    def setUp(self):
+        evict_item_caches([ITEM_CODE], ["meta"])
+        self.addCleanup(evict_item_caches, [ITEM_CODE], ["meta"])
+        self.fetches = 0
+
+    def spec(self, during_fetch=None):
+        def fetch(item_codes):
+            self.fetches += 1
+            if during_fetch:
+                during_fetch()
+            return [frappe._dict(item_code=code, fetch=self.fetches) for code in item_codes]
+
+        return CacheSpec(kind="meta", scope="test", fetch=fetch, item_field="item_code")
+
+    def test_misses_are_written_back(self):
+        spec = self.spec()
+        self.assertEqual(read_item_caches([(spec, [ITEM_CODE])], None)[0][0].fetch, 1)
+        self.assertEqual(read_item_caches([(spec, [ITEM_CODE])], None)[0][0].fetch, 1)
+        self.assertEqual(self.fetches, 1)
+
+    def test_eviction_during_load_skips_the_write_back(self):
+        # An invalidating commit lands while the rows are being loaded.
+        stale = self.spec(during_fetch=lambda: evict_item_caches([ITEM_CODE], ["meta"]))
+        read_item_caches([(stale, [ITEM_CODE])], None)
+
+        fresh = self.spec()
+        self.assertEqual(read_item_caches([(fresh, [ITEM_CODE])], None)[0][0].fetch, 2)
+
+
+class TestPriceRowsByUom(FrappeTestCase):
+    ROWS = [
+        frappe._dict(uom="Nos", price_list_rate=10, batch_no=None),
+        frappe._dict(uom="Nos", price_list_rate=8, batch_no="B1"),
+        frappe._dict(uom="Box", price_list_rate=90, batch_no=None),
+        frappe._dict(uom="Nos", price_list_rate=7, batch_no="B2"),
+    ]
+
+    def rates(self, batch_no=None):
+        return {uom: row.price_list_rate for uom, row in price_rows_by_uom(self.ROWS, batch_no).items()}
+
+    def test_batch_rows_only_apply_to_their_batch(self):
+        self.assertEqual(self.rates(), {"Nos": 10, "Box": 90})
+        self.assertEqual(self.rates("B1"), {"Nos": 8, "Box": 90})
+        self.assertEqual(self.rates("B3"), {"Nos": 10, "Box": 90})
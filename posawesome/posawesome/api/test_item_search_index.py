@@ -0,0 +1,162 @@
+import dataclasses
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.item_search_index import (
+    ItemSearchIndex,
+    _publish_item_changes,
+    _row_matches,
+    bump_index_version,
+    get_index,
+    tokenize,
+)
+from posawesome.posawesome.api.items import (
+    _build_search_plan,
+    _can_use_search_index,
+    _run_indexed_query,
+    _run_item_query,
+)
+
+MODULE = "posawesome.posawesome.api.items"
+PROFILE = {"name": "TestProfile"}
+
+
+class TestItemSearchIndex(FrappeTestCase):
+    def setUp(self):
+        self.rows = [
+            {"item_code": "CC-330", "item_name": "Coca Cola 330ml", "name": "CC-330", "has_variants": 0},
+            {"item_code": "CC-1L", "item_name": "Coca Cola 1L", "name": "CC-1L", "has_variants": 0},
+            {"item_code": "PEP-330", "item_name": "Pepsi 330ml", "name": "PEP-330", "has_variants": 0},
+        ]
+        self.index = ItemSearchIndex(version="test")
+        for row in self.rows:
+            self.index.add(row, [row["item_code"], row["item_name"]])
+
+    def codes(self, words):
+        return [self.index.rows[slot]["item_code"] for slot in self.index.match(words)]
+
+    def test_tokens_include_tails_after_punctuation(self):
+        self.assertEqual(
+            tokenize(["POSA-IDX-001", "Cola (1L)"]),
+            {"posa-idx-001", "idx-001", "001", "cola", "(1l)", "1l)"},
+        )
+
+    def test_prefix_and_multi_word_and(self):
+        self.assertEqual(self.codes(["coc"]), ["CC-1L", "CC-330"])
+        self.assertEqual(self.codes(["330"]), ["CC-330", "PEP-330"])
+        self.assertEqual(self.codes(["cola", "330"]), ["CC-330"])
+        self.assertEqual(self.codes(["cc-3"]), ["CC-330"])
+        self.assertEqual(self.codes(["cola", "pepsi"]), [])
+
+    def test_words_only_match_token_prefixes(self):
+        self.assertEqual(self.codes(["ola"]), [])
+        self.assertEqual(self.codes(["c-3"]), [])
+        self.assertEqual(self.codes(["330coca"]), [])
+
+    def test_readding_an_item_replaces_its_tokens(self):
+        renamed = dict(self.rows[2], item_name="Pepsi Max 330ml")
+        self.index.add(renamed, [renamed["item_code"], renamed["item_name"]])
+        self.assertEqual(self.codes(["max"]), ["PEP-330"])
+        self.assertEqual(self.codes(["330"]), ["CC-330", "PEP-330"])
+
+        self.index.remove("PEP-330")
+        self.assertEqual(self.codes(["pepsi"]), [])
+        self.assertNotIn("pepsi", self.index.tokens)
+
+    def test_row_filters(self):
+        row = self.rows[0]
+        self.assertTrue(_row_matches(row, {"has_variants": 0}))
+        self.assertTrue(_row_matches(row, {"item_name": ["like", "%cola%"]}))
+        self.assertFalse(_row_matches(row, {"item_name": [">", "Pepsi"]}))
+        self.assertTrue(_row_matches(row, {"variant_of": ["is", "not set"]}))
+
+
+class TestIndexedSearchMatchesQuery(FrappeTestCase):
+    ITEMS = [
+        ("POSA-IDX-001", "Sparkling Water 500ml", "Still and sparkling mineral water"),
+        ("POSA-IDX-002", "Orange Juice 1L", "Freshly squeezed"),
+        ("POSA-IDX-003", "Water Melon", "Seasonal fruit"),
+    ]
+
+    def setUp(self):
+        for code, name, description in self.ITEMS:
+            if not frappe.db.exists("Item", code):
+                frappe.get_doc(
+                    {
+                        "doctype": "Item",
+                        "item_code": code,
+                        "item_name": name,
+                        "description": description,
+                        "stock_uom": "Nos",
+                        "is_stock_item": 0,
+                        "item_group": "All Item Groups",
+                        "is_sales_item": 1,
+                        "is_fixed_asset": 0,
+                    }
+                ).insert(ignore_permissions=True, ignore_mandatory=True)
+        bump_index_version()
+
+        patcher = patch(f"{MODULE}.get_items_details", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def plan(self, search_value, include_description=False, item_group=""):
+        return _build_search_plan(
+            PROFILE, item_group, search_value, None, None, None, None, include_description, False, []
+        )
+
+    def codes(self, rows):
+        return [row["item_code"] for row in rows]
+
+    def indexed(self, search_value):
+        return self.codes(_run_indexed_query(PROFILE, None, None, self.plan(search_value)))
+
+    def test_index_returns_the_query_rows(self):
+        for search_value, include_description in [
+            ("wat", False),
+            ("water 500", False),
+            ("posa-idx", False),
+            ("idx-00", False),
+            ("squeezed", True),
+            ("squeezed", False),
+            ("mineral water", True),
+        ]:
+            plan = self.plan(search_value, include_description)
+            self.assertTrue(_can_use_search_index(PROFILE, plan))
+            with patch(f"{MODULE}._can_use_search_index", return_value=False):
+                expected = self.codes(_run_item_query(PROFILE, None, None, plan))
+            indexed = self.codes(_run_indexed_query(PROFILE, None, None, plan))
+            self.assertEqual(indexed, expected, search_value)
+
+    def test_mid_word_matches_are_not_found(self):
+        self.assertEqual(self.indexed("ater"), [])
+
+    def test_changed_items_are_reindexed_in_place(self):
+        index = get_index(PROFILE["name"])
+        frappe.db.set_value("Item", "POSA-IDX-003", "item_name", "Honeydew Melon")
+        _publish_item_changes(["POSA-IDX-003"])
+        index.checked_at = 0
+
+        self.assertIs(get_index(PROFILE["name"]), index)
+        self.assertEqual(self.indexed("honeydew"), ["POSA-IDX-003"])
+        self.assertNotIn("POSA-IDX-003", self.indexed("water"))
+
+    def test_query_only_plans_skip_the_index(self):
+        # Too short for the word filter: the query returns every item.
+        self.assertFalse(_can_use_search_index(PROFILE, self.plan("wa")))
+        # Paging past the first rows counts rows before the word filter.
+        plan = dataclasses.replace(self.plan("water"), initial_page_start=20)
+        self.assertFalse(_can_use_search_index(PROFILE, plan))
+
+    def test_group_filter_must_stay_within_profile_groups(self):
+        plan = self.plan("water", item_group="Drinks")
+        with patch(f"{MODULE}.get_item_groups", return_value=[]):
+            self.assertTrue(_can_use_search_index(PROFILE, plan))
+        with patch(f"{MODULE}.get_item_groups", return_value=["Drinks"]):
+            self.assertFalse(_can_use_search_index(PROFILE, plan))
+            plan.filters["item_group"] = ["in", ["Drinks"]]
+            self.assertTrue(_can_use_search_index(PROFILE, plan))
+            plan.filters["item_group"] = ["in", ["Drinks", "Snacks"]]
+            self.assertFalse(_can_use_search_index(PROFILE, plan))
@@ -0,0 +1,32 @@
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.profiler import to_collapsed, to_speedscope
+
+PROFILE = {
+    "method": "posawesome.posawesome.api.invoices.submit_invoice",
+    "wall_ms": 1500.0,
+    "interval_ms": 5.0,
+    "at": "2024-01-01 10:00:00",
+    "stacks": [
+        [["app.handle:10", "invoices.submit_invoice:20"], 3],
+        [["app.handle:10", "invoices.submit_invoice:20", "db.sql:30"], 2],
+    ],
+}
+
+
+class TestProfileExport(FrappeTestCase):
+    def test_collapsed_stacks(self):
+        self.assertEqual(
+            to_collapsed(PROFILE),
+            "app.handle:10;invoices.submit_invoice:20 3\n"
+            "app.handle:10;invoices.submit_invoice:20;db.sql:30 2\n",
+        )
+
+    def test_speedscope_shares_frames(self):
+        document = to_speedscope(PROFILE)
+        frames = document["shared"]["frames"]
+        self.assertEqual([frame["name"] for frame in frames], ["app.handle", "invoices.submit_invoice", "db.sql"])
+        profile = document["profiles"][0]
+        self.assertEqual(profile["samples"], [[0, 1], [0, 1, 2]])
+        self.assertEqual(profile["weights"], [15.0, 10.0])
+        self.assertEqual(profile["endValue"], 25.0)
@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.scan_codes import (
+    _apply_changes,
+    build_scan_code_map,
+    clear_scan_code_map,
+    get_scale_barcode_prefix,
+    lookup_scan_code,
+    parse_scale_barcode,
+)
+
+MODULE = "posawesome.posawesome.api.scan_codes"
+
+
+class TestScaleBarcode(FrappeTestCase):
+    def test_splits_code_and_weight(self):
+        self.assertEqual(parse_scale_barcode("2012345012348", "20"), ("2012345", 1.234))
+        self.assertEqual(parse_scale_barcode("2012345000058", "20"), ("2012345", 0.005))
+        self.assertEqual(parse_scale_barcode("2012345123458", "20"), ("2012345", 12.345))
+
+    def test_ignores_other_barcodes(self):
+        self.assertIsNone(parse_scale_barcode("4006381333931", "20"))
+        self.assertIsNone(parse_scale_barcode("2012345012348", ""))
+        self.assertIsNone(parse_scale_barcode("20123", "20"))
+        self.assertIsNone(parse_scale_barcode("20123450AB348", "20"))
+
+    def test_prefix_from_profile_dict_or_json(self):
+        self.assertEqual(get_scale_barcode_prefix({"posa_scale_barcode_start": "21"}), "21")
+        self.assertEqual(get_scale_barcode_prefix('{"posa_scale_barcode_start": "22"}'), "22")
+        self.assertIsNone(get_scale_barcode_prefix({}))
+        self.assertIsNone(get_scale_barcode_prefix(None))
+
+
+class TestScanCodeMap(FrappeTestCase):
+    SOURCES = [
+        ("barcode", "C1", {"item_code": "ITEM-A", "uom": "Nos"}),
+        ("batch", "C1", {"item_code": "ITEM-B"}),
+        ("serial", "S1", {"item_code": "ITEM-C"}),
+    ]
+
+    def setUp(self):
+        clear_scan_code_map()
+        self.addCleanup(clear_scan_code_map)
+
+    def build(self, sources):
+        with patch(f"{MODULE}._scan_code_sources", return_value=iter(sources)):
+            build_scan_code_map()
+
+    def test_lookup_follows_type_precedence(self):
+        self.build(self.SOURCES)
+        with patch(f"{MODULE}._lookup_tables") as lookup_tables:
+            self.assertEqual(lookup_scan_code("C1"), ("barcode", {"item_code": "ITEM-A", "uom": "Nos"}))
+            self.assertEqual(lookup_scan_code("C1", ("batch", "serial")), ("batch", {"item_code": "ITEM-B"}))
+            self.assertEqual(lookup_scan_code(" S1 "), ("serial", {"item_code": "ITEM-C"}))
+            self.assertIsNone(lookup_scan_code("UNKNOWN"))
+            lookup_tables.assert_not_called()
+
+    def test_apply_changes_updates_entries(self):
+        self.build(self.SOURCES)
+        _apply_changes([("barcode", "C2", {"item_code": "ITEM-D", "uom": "Box"}), ("barcode", "C1", None)])
+        self.assertEqual(lookup_scan_code("C2"), ("barcode", {"item_code": "ITEM-D", "uom": "Box"}))
+        self.assertEqual(lookup_scan_code("C1"), ("batch", {"item_code": "ITEM-B"}))
+
+    def test_missing_map_falls_back_and_rebuilds(self):
+        table_match = ("barcode", {"item_code": "ITEM-A", "uom": None})
+        with patch(f"{MODULE}._enqueue_build") as enqueue_build, patch(
+            f"{MODULE}._lookup_tables", return_value=table_match
+        ) as lookup_tables:
+            self.assertEqual(lookup_scan_code("C1"), table_match)
+        enqueue_build.assert_called_once()
+        lookup_tables.assert_called_once_with("C1", ["barcode", "batch", "serial"])
+
+    def test_changes_during_build_survive_the_swap(self):
+        def sources():
+            yield ("barcode", "C3", {"item_code": "OLD", "uom": None})
+            yield ("barcode", "C4", {"item_code": "REMOVED", "uom": None})
+            # Hook updates committed after the build read these rows.
+            _apply_changes(
+                [
+                    ("barcode", "C3", {"item_code": "NEW", "uom": None}),
+                    ("barcode", "C4", None),
+                    ("serial", "S9", {"item_code": "ITEM-E"}),
+                ]
+            )
+
+        self.build(sources())
+        self.assertEqual(lookup_scan_code("C3"), ("barcode", {"item_code": "NEW", "uom": None}))
+        self.assertIsNone(lookup_scan_code("C4"))
+        self.assertEqual(lookup_scan_code("S9"), ("serial", {"item_code": "ITEM-E"}))
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+import frappe
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from posawesome.posawesome.api.shift_totals import (
+    CHANGE,
+    GRAND_TOTAL,
+    INVOICES,
+    PAYMENT,
+    QUANTITY,
+    TAX,
+    _invoice_deltas,
+    get_shift_summary,
+    get_shift_totals,
+    mark_shift_opened,
+)
+
+MODULE = "posawesome.posawesome.api.shift_totals"
+TAX_ACCOUNT = "_Test Account Service Tax - _TC"
+
+INVOICE = frappe._dict(
+    currency="USD",
+    grand_total=110,
+    base_grand_total=330,
+    net_total=100,
+    base_net_total=300,
+    total_qty=4,
+    change_amount=5,
+    base_change_amount=15,
+    taxes=[frappe._dict(account_head="VAT - C", rate=10, tax_amount=10, base_tax_amount=30)],
+    payments=[
+        frappe._dict(mode_of_payment="Cash", amount=80, base_amount=240),
+        frappe._dict(mode_of_payment="Cash", amount=35, base_amount=105),
+        frappe._dict(mode_of_payment="Card", amount=0, base_amount=0),
+    ],
+)
+
+
+class TestInvoiceDeltas(FrappeTestCase):
+    def test_submit_deltas(self):
+        deltas = _invoice_deltas(INVOICE, 1)
+        self.assertEqual(deltas[(INVOICES, "", 0.0, "USD")], [0.0, 0.0, 1])
+        self.assertEqual(deltas[(GRAND_TOTAL, "", 0.0, "USD")], [110.0, 330.0, 0])
+        self.assertEqual(deltas[(QUANTITY, "", 0.0, "")], [4.0, 4.0, 0])
+        self.assertEqual(deltas[(CHANGE, "", 0.0, "USD")], [5.0, 15.0, 0])
+        self.assertEqual(deltas[(TAX, "VAT - C", 10.0, "USD")], [10.0, 30.0, 0])
+        # Rows of one mode are merged and empty payment rows are skipped.
+        self.assertEqual(deltas[(PAYMENT, "Cash", 0.0, "USD")], [115.0, 345.0, 0])
+        self.assertNotIn((PAYMENT, "Card", 0.0, "USD"), deltas)
+
+    def test_cancel_reverses_submit(self):
+        submitted = _invoice_deltas(INVOICE, 1)
+        cancelled = _invoice_deltas(INVOICE, -1)
+        self.assertEqual(submitted.keys(), cancelled.keys())
+        for key, values in submitted.items():
+            self.assertEqual([-value for value in values], cancelled[key])
+
+
+class TestRunningTotalsMatchInvoices(FrappeTestCase):
+    """Running totals against the invoice queries closing falls back to."""
+
+    def setUp(self):
+        self.shift = f"POSA-SHIFT-{frappe.generate_hash(length=8)}"
+        mark_shift_opened(self.shift)
+
+    def make_invoice(self, qty, rate, **fields):
+        invoice = create_sales_invoice(qty=qty, rate=rate, do_not_save=True)
+        invoice.posa_pos_opening_shift = self.shift
+        invoice.update(fields)
+        invoice.append(
+            "taxes",
+            {
+                "charge_type": "On Net Total",
+                "account_head": TAX_ACCOUNT,
+                "cost_center": "_Test Cost Center - _TC",
+                "description": "Service Tax",
+                "rate": 10,
+            },
+        )
+        # The shift is not a real POS Opening Shift.
+        invoice.flags.ignore_links = True
+        invoice.insert()
+        invoice.submit()
+        return invoice
+
+    def apply_deltas(self):
+        # What frappe.db.commit() runs first, keeping the test transaction open.
+        frappe.db.before_commit.run()
+
+    def assertTotalsMatchInvoices(self):
+        running = get_shift_totals(self.shift)
+        with patch(f"{MODULE}.get_shift_totals", return_value=None):
+            queried = get_shift_summary(self.shift, "Sales Invoice")
+
+        for field in ("grand_total", "net_total", "total_qty", "change_amount"):
+            self.assertAlmostEqual(running[field], queried[field], places=2, msg=field)
+        self.assertEqual(running.currencies.keys(), queried.currencies.keys())
+        for currency, totals in queried.currencies.items():
+            for field, value in totals.items():
+                self.assertAlmostEqual(running.currencies[currency][field], value, places=2, msg=field)
+        self.assertEqual(
+            sorted((t.account_head, flt(t.rate), flt(t.amount, 2)) for t in running.taxes),
+            sorted((t.account_head, flt(t.rate), flt(t.amount, 2)) for t in queried.taxes),
+        )
+        self.assertEqual(
+            sorted((p.mode_of_payment, p.currency, flt(p.amount, 2)) for p in running.payments),
+            sorted((p.mode_of_payment, p.currency, flt(p.amount, 2)) for p in queried.payments),
+        )
+        return running
+
+    def test_submit_and_cancel(self):
+        self.make_invoice(2, 100)
+        self.make_invoice(1, 50)
+        cancelled = self.make_invoice(3, 10)
+        self.apply_deltas()
+        self.assertEqual(self.assertTotalsMatchInvoices().invoices, 3)
+
+        cancelled.cancel()
+        self.apply_deltas()
+        running = self.assertTotalsMatchInvoices()
+        self.assertEqual(running.invoices, 2)
+        self.assertAlmostEqual(running.net_total, 250, places=2)
+
+    def test_rollback_drops_pending_deltas(self):
+        self.make_invoice(1, 100)
+        frappe.db.rollback()
+
+        # The marker row went with the rollback; the deltas must not survive it.
+        mark_shift_opened(self.shift)
+        self.apply_deltas()
+        running = self.assertTotalsMatchInvoices()
+        self.assertEqual(running.invoices, 0)
+        self.assertEqual(running.grand_total, 0)
+
+    def test_consolidated_invoices_are_skipped(self):
+        self.make_invoice(1, 100)
+        self.make_invoice(2, 100, is_consolidated=1)
+        self.apply_deltas()
+        running = self.assertTotalsMatchInvoices()
+        self.assertEqual(running.invoices, 1)
+        self.assertAlmostEqual(running.net_total, 100, places=2)
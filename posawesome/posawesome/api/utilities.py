@@ -17,6 +17,7 @@ except ImportError:  # pragma: no cover - optional dependency
 _PSUTIL_MISSING_LOGGED = False
 import functools
 
+from .instrumentation import read_request_metrics
 from .utils import get_item_groups, fetch_sales_person_names
 from posawesome.utils import get_build_version
 
@@ -380,6 +381,16 @@ def get_server_usage():
     }
 
 
+@frappe.whitelist()
+def get_request_metrics(limit=100):
+    """Return the latest instrumented POS API calls and per-method aggregates.
+
+    Recording is enabled with ``posa_instrumentation`` in the site config.
+    """
+    frappe.only_for("System Manager")
+    return read_request_metrics(limit)
+
+
 # Cache for language data
 _LANGUAGE_CACHE = {
     "languages": None,
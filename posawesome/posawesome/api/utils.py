@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import json
 import logging
-from functools import cache
+
+from functools import partial
 
 import frappe
 
@@ -12,49 +13,103 @@ HAS_VARIANTS_EXCLUSION = {"has_variants": 0}
 
 logger = logging.getLogger(__name__)
 
+# Redis hashes memoising item group expansion per group and per POS Profile.
+ITEM_GROUP_TREE_KEY = "posa_item_group_tree"
+PROFILE_ITEM_GROUPS_KEY = "posa_profile_item_groups"
+
+# Redis hash mapping a warehouse to the leaf warehouses its stock is read from.
+WAREHOUSE_TREE_KEY = "posa_warehouse_tree"
+
+# Upper bound on the life of a tree hash. Hooks evict the hashes after commit,
+# but a request that read the tree before the commit can still write it back.
+TREE_CACHE_TTL = 10 * 60
+
+
+def _get_tree_scope(key, field, loader):
+    """Return the cached ``field`` of the tree hash ``key``, loading it on a miss."""
+
+    cache = frappe.cache()
+    value = cache.hget(key, field)
+    if value is None:
+        value = loader()
+        cache.hset(key, field, value)
+        redis_key = cache.make_key(key)
+        if cache.ttl(redis_key) < 0:
+            cache.expire(redis_key, TREE_CACHE_TTL)
+    return value
+
+
+def _drop_tree_caches(keys):
+    frappe.cache().delete_value(keys)
+
+
+def _load_item_group_scope(group):
+    """Return ``group`` itself for leaf groups, otherwise its descendants."""
+    if not frappe.db.get_value("Item Group", group, "is_group"):
+        return [group]
+
+    try:
+        from erpnext.utilities.doctype.item_group.item_group import get_child_groups
+    except Exception:
+        get_child_groups = None
+
+    if get_child_groups:
+        try:
+            return get_child_groups(group) or []
+        except Exception:
+            pass
+    return frappe.db.get_descendants("Item Group", group) or []
+
 
 def expand_item_groups(item_groups):
     """Expand any parent item groups to include their children.
 
     This function takes a list of item groups and expands any parent groups
-    to include all their descendants, while keeping leaf groups as-is.
+    to include all their descendants, while keeping leaf groups as-is. The
+    expansion of every group is cached in redis until an Item Group changes,
+    for at most ``TREE_CACHE_TTL`` seconds.
     """
     if not item_groups:
         return item_groups
 
-    try:
-        from erpnext.utilities.doctype.item_group.item_group import get_child_groups
-    except Exception:
-        get_child_groups = None
-
     expanded_groups = set()
     for group in item_groups:
         if not group:
             continue
-
-        # Check if this is a parent group
-        is_group = frappe.db.get_value("Item Group", group, "is_group")
-
-        if is_group:
-            # If it's a parent group, get all its children
-            if get_child_groups:
-                try:
-                    descendants = get_child_groups(group) or []
-                    expanded_groups.update(descendants)
-                except Exception:
-                    # Fallback to database method
-                    descendants = frappe.db.get_descendants("Item Group", group) or []
-                    expanded_groups.update(descendants)
-            else:
-                descendants = frappe.db.get_descendants("Item Group", group) or []
-                expanded_groups.update(descendants)
-        else:
-            # If it's a leaf group, add it directly
-            expanded_groups.add(group)
+        expanded_groups.update(
+            _get_tree_scope(ITEM_GROUP_TREE_KEY, group, lambda group=group: _load_item_group_scope(group))
+            or []
+        )
 
     return list(expanded_groups)
 
 
+def _load_warehouse_scope(warehouse):
+    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
+        return frappe.db.get_descendants("Warehouse", warehouse) or []
+    return [warehouse]
+
+
+def get_warehouse_scope(warehouse):
+    """Return the warehouses whose stock counts for ``warehouse``.
+
+    A plain warehouse maps to itself and a group warehouse to all of its
+    descendants. The expansion is kept in the site's redis cache for at most
+    ``TREE_CACHE_TTL`` seconds and dropped by :func:`invalidate_warehouse_tree`
+    whenever a Warehouse changes.
+    """
+    if not warehouse:
+        return []
+    return list(
+        _get_tree_scope(WAREHOUSE_TREE_KEY, warehouse, lambda: _load_warehouse_scope(warehouse)) or []
+    )
+
+
+def invalidate_warehouse_tree(doc=None, method=None, *args):
+    """Document hook: forget all cached warehouse expansions once the change commits."""
+    frappe.db.after_commit.add(partial(_drop_tree_caches, [WAREHOUSE_TREE_KEY]))
+
+
 @frappe.whitelist()
 def get_active_pos_profile(user=None):
     """Return the active POS profile for the given user."""
@@ -121,23 +176,46 @@ def fetch_sales_person_names():
         return []
 
 
-@cache
+def _load_profile_item_groups(pos_profile):
+    if not frappe.db.exists("DocType", "POS Item Group"):
+        return []
+
+    groups = frappe.get_all(
+        "POS Item Group",
+        filters={"parent": pos_profile},
+        pluck="item_group",
+    )
+
+    return expand_item_groups(groups) or []
+
+
 def get_item_groups(pos_profile: str) -> list[str]:
     """Return all item groups for a POS profile, including descendants.
 
     The linked groups from the ``POS Item Group`` child table are
-    expanded to include all of their descendants. Results are cached
-    to avoid duplicate database calls within a process.
-
-
+    expanded to include all of their descendants. Results are kept in
+    redis and cleared by :func:`invalidate_item_group_cache`.
     """
-    if not pos_profile or not frappe.db.exists("DocType", "POS Item Group"):
+    if not pos_profile:
         return []
 
-    groups = frappe.get_all(
-        "POS Item Group",
-        filters={"parent": pos_profile},
-        pluck="item_group",
+    return list(
+        _get_tree_scope(PROFILE_ITEM_GROUPS_KEY, pos_profile, lambda: _load_profile_item_groups(pos_profile))
+        or []
     )
 
-    return expand_item_groups(groups)
+
+def resolve_item_groups(pos_profile, item_groups=None) -> list[str]:
+    """Return the expanded item groups a search is restricted to.
+
+    Explicitly requested ``item_groups`` are expanded, otherwise the groups
+    configured on ``pos_profile`` are used.
+    """
+    if item_groups:
+        return expand_item_groups(item_groups)
+    return get_item_groups(pos_profile)
+
+
+def invalidate_item_group_cache(doc=None, method=None, *args):
+    """Document hook for Item Group and POS Profile changes, evicting after commit."""
+    frappe.db.after_commit.add(partial(_drop_tree_caches, [ITEM_GROUP_TREE_KEY, PROFILE_ITEM_GROUPS_KEY]))
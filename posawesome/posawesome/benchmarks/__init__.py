@@ -0,0 +1,8 @@
+"""Benchmarks for the POS Awesome item pipeline.
+
+Run them through bench, e.g.::
+
+    bench --site <site> execute posawesome.posawesome.benchmarks.suite.run \\
+        --kwargs "{'pos_profile': 'Main POS'}"
+    bench --site <site> execute posawesome.posawesome.benchmarks.item_merge.run
+"""
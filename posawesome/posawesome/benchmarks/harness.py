@@ -0,0 +1,87 @@
+"""Measurement helpers shared by the benchmarks.
+
+:func:`measure` runs a scenario several times and reports wall time
+percentiles, the number of SQL statements and time spent in the database per
+run, and the peak of Python allocations. Results are plain dicts so they can
+be written as JSON and diffed between releases.
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from posawesome.posawesome.api.instrumentation import count_queries
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    repeat: int = 5,
+    warmup: int = 1,
+    setup: Optional[Callable[[], Any]] = None,
+    **labels,
+) -> Dict[str, Any]:
+    """Run ``fn`` ``repeat`` times after ``warmup`` runs and summarise the runs.
+
+    ``setup`` is called before every measured run, e.g. to drop caches for a
+    cold-cache scenario.
+    """
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    seconds, queries, db_seconds = [], [], []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with count_queries() as counter:
+            started = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - started)
+        queries.append(counter.queries)
+        db_seconds.append(counter.db_seconds)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "benchmark": name,
+        **labels,
+        "runs": repeat,
+        "median_ms": round(statistics.median(seconds) * 1000, 3),
+        "p95_ms": round(_percentile(seconds, 0.95) * 1000, 3),
+        "min_ms": round(min(seconds) * 1000, 3),
+        "queries": max(queries),
+        "db_ms": round(statistics.median(db_seconds) * 1000, 3),
+        "peak_alloc_kib": round(peak / 1024, 1),
+    }
+
+
+def write_results(results: Iterable[Dict[str, Any]], path: Optional[str] = None, **metadata) -> Dict[str, Any]:
+    """Write results (plus run metadata) as JSON to ``path`` or stdout."""
+
+    document = {"metadata": metadata, "results": list(results)}
+    payload = json.dumps(document, indent=2, default=str)
+    if path:
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+    else:
+        print(payload)
+    return document
@@ -0,0 +1,117 @@
+"""Per-row cost of merging lookup data into item rows.
+
+Compares the per-row merge ``build_details`` used before the columnar merge
+(kept here as :func:`_baseline_merge_row`) with :func:`merge_item_rows`. The
+lookup data is synthetic, so no database access is involved.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import frappe
+
+from posawesome.posawesome.api.item_fetchers import (
+    ItemLookupData,
+    _ensure_stock_uom,
+    _select_price,
+    merge_item_rows,
+)
+
+from .harness import measure, write_results
+
+DEFAULT_SIZES = (10_000, 100_000)
+
+
+def make_page(count: int) -> tuple[List[Dict[str, Any]], ItemLookupData]:
+    """Return ``count`` item rows and matching lookup data."""
+
+    items = []
+    price_map, stock_map, meta_map, uom_map, barcode_map = {}, {}, {}, {}, {}
+    for i in range(count):
+        code = f"BENCH-{i:07d}"
+        items.append(
+            {
+                "item_code": code,
+                "item_name": f"Bench Item {i}",
+                "stock_uom": "Nos",
+                "item_group": "Products",
+                "is_stock_item": 1,
+            }
+        )
+        price_map[code] = {
+            "Nos": frappe._dict(item_code=code, uom="Nos", price_list_rate=10.0 + i % 50, currency="USD"),
+            "Box": frappe._dict(item_code=code, uom="Box", price_list_rate=100.0 + i % 50, currency="USD"),
+        }
+        stock_map[code] = float(i % 20)
+        meta_map[code] = frappe._dict(
+            name=code, item_name=f"Bench Item {i}", has_batch_no=0, has_serial_no=0, stock_uom="Nos"
+        )
+        uom_map[code] = [{"uom": "Box", "conversion_factor": 12.0}]
+        barcode_map[code] = [{"barcode": f"{i:013d}", "posa_uom": None}]
+
+    lookup = ItemLookupData(price_map, stock_map, meta_map, uom_map, barcode_map, {}, {})
+    return items, lookup
+
+
+def _baseline_merge_row(
+    item: Dict[str, Any],
+    lookup_data: ItemLookupData,
+    price_list_currency: Optional[str],
+    exchange_rate: float,
+) -> Dict[str, Any]:
+    """``merge_item_row`` as ``build_details`` called it for every row before."""
+
+    item_code = item.get("item_code")
+    if not item_code:
+        return dict(item)
+
+    meta = lookup_data.meta_map.get(item_code, frappe._dict())
+    uoms = _ensure_stock_uom(lookup_data.uom_map.get(item_code, []), meta.get("stock_uom"))
+    price_row = _select_price(
+        lookup_data.price_map.get(item_code, {}), item.get("uom"), meta.get("stock_uom")
+    )
+    price_currency = price_row.get("currency") if price_row else None
+
+    row = dict(item)
+    row.update(
+        {
+            "item_uoms": uoms,
+            "item_barcode": lookup_data.barcode_map.get(item_code, []),
+            "actual_qty": lookup_data.stock_map.get(item_code, 0) or 0,
+            "has_batch_no": meta.get("has_batch_no"),
+            "has_serial_no": meta.get("has_serial_no"),
+            "batch_no_data": lookup_data.batch_map.get(item_code, []),
+            "serial_no_data": lookup_data.serial_map.get(item_code, []),
+            "rate": price_row.get("price_list_rate") if price_row else 0,
+            "price_list_rate": price_row.get("price_list_rate") if price_row else 0,
+            "currency": price_currency or price_list_currency,
+            "price_list_currency": price_list_currency,
+            "plc_conversion_rate": exchange_rate,
+            "conversion_rate": exchange_rate,
+        }
+    )
+    if not row.get("item_name") and meta.get("item_name"):
+        row["item_name"] = meta.get("item_name")
+    return row
+
+
+def run(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    repeat: int = 3,
+    output: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Benchmark both merge paths and emit the results as JSON."""
+
+    results: List[Dict[str, Any]] = []
+    for size in sizes:
+        items, lookup = make_page(int(size))
+        variants = {
+            "baseline": lambda: [_baseline_merge_row(item, lookup, "USD", 1.0) for item in items],
+            "columnar": lambda: merge_item_rows(items, lookup, "USD", 1.0),
+        }
+        for name, fn in variants.items():
+            result = measure("merge_item_rows", fn, repeat=repeat, variant=name, rows=len(items))
+            result["us_per_row"] = round(result["median_ms"] * 1000 / len(items), 3)
+            results.append(result)
+    return write_results(results, output, site=frappe.local.site)
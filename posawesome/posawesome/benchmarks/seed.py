@@ -0,0 +1,294 @@
+"""Synthetic catalogue used by the benchmark suite.
+
+Rows are written with ``frappe.db.bulk_insert`` so that large catalogues can
+be seeded in seconds; document validations are skipped on purpose. Every
+seeded record is named with :data:`PREFIX` and removed by
+:func:`clear_catalogue`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import now, nowdate
+
+from posawesome.posawesome.api.item_fetchers import evict_item_caches
+from posawesome.posawesome.api.item_search_index import bump_index_version
+from posawesome.posawesome.api.scan_codes import clear_scan_code_map
+from posawesome.posawesome.api.utils import invalidate_item_group_cache
+
+PREFIX = "POSBENCH"
+BENCH_ITEM_GROUP = "POS Benchmark Items"
+BENCH_ATTRIBUTE = "POS Benchmark Size"
+CHUNK_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class CatalogueSpec:
+    """How many records of each kind to seed."""
+
+    items: int = 1000
+    templates: int = 50
+    variants_per_template: int = 4
+    barcodes_per_item: int = 1
+    uoms_per_item: int = 1
+    price_rows_per_item: int = 1
+    batch_items: int = 50
+    batches_per_item: int = 3
+    serial_items: int = 20
+    serials_per_item: int = 10
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def _ensure_masters():
+    if not frappe.db.exists("Item Group", BENCH_ITEM_GROUP):
+        frappe.get_doc(
+            {
+                "doctype": "Item Group",
+                "item_group_name": BENCH_ITEM_GROUP,
+                "parent_item_group": "All Item Groups",
+            }
+        ).insert(ignore_permissions=True)
+
+    if not frappe.db.exists("Item Attribute", BENCH_ATTRIBUTE):
+        frappe.get_doc(
+            {
+                "doctype": "Item Attribute",
+                "attribute_name": BENCH_ATTRIBUTE,
+                "item_attribute_values": [
+                    {"attribute_value": size, "abbr": size} for size in ("S", "M", "L", "XL")
+                ],
+            }
+        ).insert(ignore_permissions=True)
+
+
+def _insert(doctype: str, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    fields = list(rows[0])
+    values = [tuple(row[field] for field in fields) for row in rows]
+    frappe.db.bulk_insert(doctype, fields, values, ignore_duplicates=True, chunk_size=CHUNK_SIZE)
+
+
+def _child(parent: str, parentfield: str, idx: int, **values) -> Dict[str, Any]:
+    return {
+        "name": frappe.generate_hash(length=12),
+        "parent": parent,
+        "parenttype": "Item",
+        "parentfield": parentfield,
+        "idx": idx,
+        **values,
+    }
+
+
+def _ensure_profile_group(profile):
+    """List the benchmark group on a profile that is limited to some item groups."""
+
+    groups = [row.item_group for row in profile.get("item_groups") or []]
+    if not groups or BENCH_ITEM_GROUP in groups:
+        return
+    frappe.get_doc(
+        {
+            "doctype": "POS Item Group",
+            "parent": profile.name,
+            "parenttype": "POS Profile",
+            "parentfield": "item_groups",
+            "idx": len(groups) + 1,
+            "item_group": BENCH_ITEM_GROUP,
+        }
+    ).db_insert()
+    invalidate_item_group_cache()
+
+
+def _reset_caches(item_codes: List[str]):
+    # bulk_insert and the raw deletes bypass the document hooks that normally
+    # keep these current.
+    bump_index_version()
+    clear_scan_code_map()
+    evict_item_caches(item_codes)
+
+
+def seed_catalogue(pos_profile: str, spec: Optional[CatalogueSpec] = None) -> Dict[str, int]:
+    """Seed ``spec`` into the warehouse and selling price list of ``pos_profile``.
+
+    Returns the number of rows written per doctype.
+    """
+
+    spec = spec or CatalogueSpec()
+    profile = frappe.get_doc("POS Profile", pos_profile)
+    warehouse = profile.warehouse
+    price_list = profile.selling_price_list
+    currency = profile.currency
+    company = profile.company
+    _ensure_masters()
+    _ensure_profile_group(profile)
+
+    timestamp = now()
+    base = {
+        "creation": timestamp,
+        "modified": timestamp,
+        "owner": "Administrator",
+        "modified_by": "Administrator",
+    }
+    rows: Dict[str, List[Dict[str, Any]]] = {
+        doctype: []
+        for doctype in (
+            "Item",
+            "Item Variant Attribute",
+            "Item Barcode",
+            "UOM Conversion Detail",
+            "Item Price",
+            "Bin",
+            "Batch",
+            "Stock Ledger Entry",
+            "Serial No",
+        )
+    }
+
+    def add_item(code, name, has_variants=0, variant_of=None, has_batch_no=0, has_serial_no=0):
+        rows["Item"].append(
+            {
+                **base,
+                "name": code,
+                "item_code": code,
+                "item_name": name,
+                "description": name,
+                "item_group": BENCH_ITEM_GROUP,
+                "stock_uom": "Nos",
+                "is_stock_item": 1,
+                "is_sales_item": 1,
+                "is_fixed_asset": 0,
+                "disabled": 0,
+                "has_variants": has_variants,
+                "variant_of": variant_of,
+                "has_batch_no": has_batch_no,
+                "has_serial_no": has_serial_no,
+            }
+        )
+
+    sellable: List[str] = []
+    for t in range(spec.templates):
+        template = f"{PREFIX}-T{t:05d}"
+        add_item(template, f"Bench Template {t}", has_variants=1)
+        rows["Item Variant Attribute"].append(
+            _child(template, "attributes", 1, attribute=BENCH_ATTRIBUTE, attribute_value=None)
+        )
+        for v in range(spec.variants_per_template):
+            variant = f"{template}-V{v:02d}"
+            add_item(variant, f"Bench Template {t} Variant {v}", variant_of=template)
+            size = ("S", "M", "L", "XL")[v % 4]
+            rows["Item Variant Attribute"].append(
+                _child(variant, "attributes", 1, attribute=BENCH_ATTRIBUTE, attribute_value=size)
+            )
+            sellable.append(variant)
+
+    for i in range(spec.items):
+        code = f"{PREFIX}-{i:07d}"
+        has_batch_no = int(i < spec.batch_items)
+        has_serial_no = int(spec.batch_items <= i < spec.batch_items + spec.serial_items)
+        add_item(code, f"Bench Item {i}", has_batch_no=has_batch_no, has_serial_no=has_serial_no)
+        sellable.append(code)
+
+        for b in range(spec.batches_per_item if has_batch_no else 0):
+            batch = f"{code}-B{b:03d}"
+            qty = 5 + b
+            rows["Batch"].append(
+                {**base, "name": batch, "batch_id": batch, "item": code, "disabled": 0, "batch_qty": qty}
+            )
+            # A ledger row without a bundle, which batch quantities still count.
+            rows["Stock Ledger Entry"].append(
+                {
+                    **base,
+                    "name": f"{batch}-SLE",
+                    "item_code": code,
+                    "warehouse": warehouse,
+                    "batch_no": batch,
+                    "actual_qty": qty,
+                    "qty_after_transaction": qty,
+                    "stock_uom": "Nos",
+                    "posting_date": nowdate(),
+                    "posting_time": "00:00:00",
+                    "voucher_type": "Stock Entry",
+                    "voucher_no": f"{PREFIX}-SE",
+                    "company": company,
+                    "is_cancelled": 0,
+                    "docstatus": 1,
+                }
+            )
+        for s in range(spec.serials_per_item if has_serial_no else 0):
+            serial = f"{code}-S{s:04d}"
+            rows["Serial No"].append(
+                {
+                    **base,
+                    "name": serial,
+                    "serial_no": serial,
+                    "item_code": code,
+                    "warehouse": warehouse,
+                    "company": company,
+                    "status": "Active",
+                }
+            )
+
+    for position, code in enumerate(sellable):
+        for b in range(spec.barcodes_per_item):
+            barcode = f"9{position:08d}{b:03d}"
+            rows["Item Barcode"].append(_child(code, "barcodes", b + 1, barcode=barcode, posa_uom=None))
+        for u in range(spec.uoms_per_item):
+            uom, factor = ("Nos", 1.0) if u == 0 else ("Box", 12.0 * u)
+            rows["UOM Conversion Detail"].append(
+                _child(code, "uoms", u + 1, uom=uom, conversion_factor=factor)
+            )
+        for p in range(spec.price_rows_per_item):
+            rows["Item Price"].append(
+                {
+                    **base,
+                    "name": f"{code}-P{p:02d}",
+                    "item_code": code,
+                    "price_list": price_list,
+                    "currency": currency,
+                    "selling": 1,
+                    "uom": "Nos" if p == 0 else "Box",
+                    "price_list_rate": 10 + position % 100 + p,
+                    "valid_from": nowdate(),
+                }
+            )
+        rows["Bin"].append(
+            {
+                **base,
+                "name": f"{code}-BIN",
+                "item_code": code,
+                "warehouse": warehouse,
+                "stock_uom": "Nos",
+                "actual_qty": position % 25,
+                "projected_qty": position % 25,
+            }
+        )
+
+    if frappe.db.has_column("Stock Ledger Entry", "posting_datetime"):
+        for row in rows["Stock Ledger Entry"]:
+            row["posting_datetime"] = f"{row['posting_date']} {row['posting_time']}"
+
+    for doctype, doctype_rows in rows.items():
+        _insert(doctype, doctype_rows)
+    frappe.db.commit()
+    _reset_caches([row["name"] for row in rows["Item"]])
+    return {doctype: len(doctype_rows) for doctype, doctype_rows in rows.items()}
+
+
+def clear_catalogue():
+    """Remove every record written by :func:`seed_catalogue`."""
+
+    pattern = f"{PREFIX}-%"
+    item_codes = frappe.get_all("Item", filters={"name": ["like", pattern]}, pluck="name")
+    for doctype in ("Item Variant Attribute", "Item Barcode", "UOM Conversion Detail"):
+        frappe.db.delete(doctype, {"parent": ["like", pattern]})
+    for doctype in ("Item Price", "Bin", "Stock Ledger Entry", "Batch", "Serial No", "Item"):
+        frappe.db.delete(doctype, {"name": ["like", pattern]})
+    frappe.db.delete("POS Item Group", {"item_group": BENCH_ITEM_GROUP})
+    invalidate_item_group_cache()
+    frappe.db.commit()
+    _reset_caches(item_codes)
@@ -0,0 +1,146 @@
+"""Benchmark suite for the item search and detail pipeline.
+
+Seeds a synthetic catalogue (see :mod:`.seed`) and measures typical searches,
+barcode scans, detail merges and a full catalogue sync. Run it with::
+
+    bench --site <site> execute posawesome.posawesome.benchmarks.suite.run \\
+        --kwargs "{'pos_profile': 'Main POS', 'output': '/tmp/posa-bench.json'}"
+
+and diff the JSON output between releases.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import now
+
+from posawesome import __version__ as posawesome_version
+from posawesome.posawesome.api.item_fetchers import (
+    ItemDetailAggregator,
+    evict_item_caches,
+    merge_item_rows,
+)
+from posawesome.posawesome.api.items import (
+    _build_search_plan,
+    _run_item_query,
+    get_items,
+    get_items_from_barcode,
+)
+
+from .harness import measure, write_results
+from .item_merge import make_page
+from .seed import PREFIX, CatalogueSpec, clear_catalogue, seed_catalogue
+
+PAGE_SIZE = 500
+
+
+def _profile(pos_profile: str) -> Dict[str, Any]:
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    # Measure the real work rather than the whole-response redis cache.
+    profile["posa_use_server_cache"] = 0
+    return profile
+
+
+def _page_rows(count: int) -> List[Dict[str, Any]]:
+    return frappe.get_all(
+        "Item",
+        filters={"name": ["like", f"{PREFIX}-0%"]},
+        fields=["name", "name as item_code", "item_name", "stock_uom", "has_variants"],
+        order_by="name asc",
+        limit_page_length=count,
+    )
+
+
+def _full_sync(profile_json: str, price_list: str) -> int:
+    loaded, cursor = 0, None
+    while True:
+        rows = get_items(profile_json, price_list=price_list, limit=PAGE_SIZE, cursor=cursor)
+        loaded += len(rows)
+        cursor = frappe.response.pop("next_cursor", None)
+        if not cursor:
+            return loaded
+
+
+def scenarios(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    profile_json = json.dumps(profile, default=str)
+    price_list = profile.get("selling_price_list")
+    currency = profile.get("currency")
+    page = _page_rows(PAGE_SIZE)
+    page_codes = [row.item_code for row in page]
+    barcode = frappe.db.get_value("Item Barcode", {"parent": ["like", f"{PREFIX}-%"]}, "barcode")
+    search_plan = _build_search_plan(profile, "", "bench item 12", None, None, None, None, False, False, [])
+    aggregator = ItemDetailAggregator(profile, price_list=price_list)
+    merge_items, merge_lookup = make_page(10_000)
+
+    return [
+        measure(
+            "build_search_plan",
+            lambda: _build_search_plan(profile, "", "bench item 12", None, None, None, None, False, False, []),
+        ),
+        measure("run_item_query", lambda: _run_item_query(profile, price_list, None, search_plan)),
+        measure(
+            "get_items",
+            lambda: get_items(profile_json, price_list=price_list, search_value="bench item 12"),
+            scenario="text_search",
+        ),
+        measure(
+            "get_items",
+            lambda: get_items(profile_json, price_list=price_list, search_value=barcode),
+            scenario="barcode_search",
+        ),
+        measure(
+            "get_items_from_barcode",
+            lambda: get_items_from_barcode(price_list, currency, barcode),
+            scenario="scan",
+        ),
+        measure(
+            "build_details",
+            lambda: aggregator.build_details(page),
+            setup=lambda: evict_item_caches(page_codes),
+            rows=len(page),
+            cache="cold",
+        ),
+        measure("build_details", lambda: aggregator.build_details(page), rows=len(page), cache="warm"),
+        measure(
+            "merge_item_rows",
+            lambda: merge_item_rows(merge_items, merge_lookup, currency, 1.0),
+            rows=len(merge_items),
+        ),
+        measure("full_sync", lambda: _full_sync(profile_json, price_list), repeat=1, warmup=0),
+    ]
+
+
+def run(
+    pos_profile: str,
+    output: Optional[str] = None,
+    seed: bool = True,
+    clear: bool = True,
+    **spec,
+) -> Dict[str, Any]:
+    """Seed the synthetic catalogue, run every scenario and emit JSON results.
+
+    Extra keyword arguments override :class:`.seed.CatalogueSpec` counts.
+    """
+
+    started = now()
+    catalogue = CatalogueSpec(**{key: int(value) for key, value in spec.items()})
+    seeded = seed_catalogue(pos_profile, catalogue) if seed else {}
+    try:
+        results = scenarios(_profile(pos_profile))
+    finally:
+        if seed and clear:
+            clear_catalogue()
+
+    return write_results(
+        results,
+        output,
+        site=frappe.local.site,
+        started=started,
+        posawesome=posawesome_version,
+        frappe=frappe.__version__,
+        catalogue=catalogue.as_dict(),
+        seeded=seeded,
+    )
@@ -137,41 +137,35 @@ function add_to_pos_payments(d, frm) {
 	});
 }
 
+// The server builds the same totals in make_closing_shift_from_opening: each
+// invoice's change is taken off the cash mode of payment once.
 async function add_to_payments(d, frm, conversion_rate) {
 	const payments = Array.isArray(d.payments) ? d.payments : [];
-	const cash_mode_of_payment = await get_cash_mode_of_payment(frm);
 
 	payments.forEach((p) => {
-		const payment = frm.doc.payment_reconciliation.find(
-			(pay) => pay.mode_of_payment === p.mode_of_payment,
-		);
-		if (payment) {
-			let amount = get_base_value(p, "amount", "base_amount", conversion_rate);
-
-			if (payment.mode_of_payment === cash_mode_of_payment) {
-				amount -= get_base_value(d, "change_amount", "base_change_amount", conversion_rate);
-			}
-			payment.expected_amount += flt(amount);
-		} else {
-			frm.add_child("payment_reconciliation", {
-				mode_of_payment: p.mode_of_payment,
-				opening_amount: 0,
-				expected_amount: get_base_value(p, "amount", "base_amount", conversion_rate),
-			});
-		}
+		const amount = get_base_value(p, "amount", "base_amount", conversion_rate);
+		add_expected_amount(frm, p.mode_of_payment, amount);
 	});
+
+	const change_amount = get_base_value(d, "change_amount", "base_change_amount", conversion_rate);
+	if (change_amount) {
+		add_expected_amount(frm, await get_cash_mode_of_payment(frm), -change_amount);
+	}
 }
 
 function add_pos_payment_to_payments(p, frm) {
-	const payment = frm.doc.payment_reconciliation.find((pay) => pay.mode_of_payment === p.mode_of_payment);
+	add_expected_amount(frm, p.mode_of_payment, get_base_value(p, "paid_amount", "base_paid_amount"));
+}
+
+function add_expected_amount(frm, mode_of_payment, amount) {
+	const payment = frm.doc.payment_reconciliation.find((pay) => pay.mode_of_payment === mode_of_payment);
 	if (payment) {
-		let amount = get_base_value(p, "paid_amount", "base_paid_amount");
 		payment.expected_amount += flt(amount);
 	} else {
 		frm.add_child("payment_reconciliation", {
-			mode_of_payment: p.mode_of_payment,
+			mode_of_payment: mode_of_payment,
 			opening_amount: 0,
-			expected_amount: get_base_value(p, "paid_amount", "base_paid_amount"),
+			expected_amount: flt(amount),
 		});
 	}
 }
@@ -12,6 +12,23 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import flt
 
+from posawesome.posawesome.api.shift_submission import (
+    ensure_no_running_submission,
+    printed_drafts,
+    shift_invoice_doctype,
+)
+from posawesome.posawesome.api.shift_totals import (
+    PAYMENT_TABLE,
+    TAX_TABLE,
+    get_child_rows,
+    get_currency_totals,
+    get_invoice_rows,
+    get_payment_totals,
+    get_shift_summary,
+    shift_invoice_condition,
+)
+from posawesome.posawesome.api.submission_queue import submit_draft
+
 
 def get_base_value(doc, fieldname, base_fieldname=None, conversion_rate=None):
     """Return the value for a field in company currency."""
@@ -38,6 +55,10 @@ def get_base_value(doc, fieldname, base_fieldname=None, conversion_rate=None):
     return flt(value) * flt(conversion_rate or 1)
 
 
+def _cash_mode_of_payment(pos_profile):
+    return frappe.db.get_value("POS Profile", pos_profile, "posa_cash_mode_of_payment") or "Cash"
+
+
 class POSClosingShift(Document):
     def validate(self):
         user = frappe.get_all(
@@ -240,73 +261,71 @@ class POSClosingShift(Document):
             if currency:
                 row["currencies"][currency] += flt(amount)
 
-        cash_mode_of_payment = (
-            frappe.db.get_value("POS Profile", self.pos_profile, "posa_cash_mode_of_payment") or "Cash"
-        )
+        cash_mode_of_payment = _cash_mode_of_payment(self.pos_profile)
 
+        invoices = defaultdict(list)
         for row in self.get("pos_transactions", []):
-            invoice = row.get("sales_invoice") or row.get("pos_invoice")
-            if not invoice:
-                continue
-
-            doctype = "Sales Invoice" if row.get("sales_invoice") else "POS Invoice"
-            if not frappe.db.exists(doctype, invoice):
-                continue
-
-            invoice_doc = frappe.get_cached_doc(doctype, invoice)
-            currency = invoice_doc.get("currency") or company_currency
-            conversion_rate = (
-                invoice_doc.get("conversion_rate")
-                or invoice_doc.get("exchange_rate")
-                or invoice_doc.get("target_exchange_rate")
-                or invoice_doc.get("plc_conversion_rate")
-                or 1
-            )
-
-            sales_breakdown[currency] += flt(invoice_doc.get("grand_total") or 0)
-            net_breakdown[currency] += flt(invoice_doc.get("net_total") or 0)
+            if row.get("sales_invoice"):
+                invoices["Sales Invoice"].append(row.sales_invoice)
+            elif row.get("pos_invoice"):
+                invoices["POS Invoice"].append(row.pos_invoice)
+
+        for doctype, names in invoices.items():
+            condition = "inv.name in %(names)s"
+            values = {"names": names}
+
+            for totals in get_currency_totals(doctype, condition, values):
+                currency = totals.currency or company_currency
+                sales_breakdown[currency] += flt(totals.grand_total)
+                net_breakdown[currency] += flt(totals.net_total)
+                if flt(totals.change_amount):
+                    update_payment_breakdown(
+                        cash_mode_of_payment,
+                        -flt(totals.base_change_amount),
+                        currency,
+                        -flt(totals.change_amount),
+                    )
 
-            for payment in invoice_doc.get("payments", []):
+            for payment in get_payment_totals(doctype, condition, values):
                 update_payment_breakdown(
                     payment.mode_of_payment,
-                    get_base_value(payment, "amount", "base_amount", conversion_rate),
-                    currency,
+                    payment.base_amount,
+                    payment.currency or company_currency,
                     payment.amount,
                 )
 
-            change_amount = invoice_doc.get("change_amount") or 0
-            if change_amount:
+        entry_modes = {
+            row.payment_entry: row.get("mode_of_payment")
+            for row in self.get("pos_payments", [])
+            if row.get("payment_entry")
+        }
+        if entry_modes:
+            for payment_doc in frappe.get_all(
+                "Payment Entry",
+                filters={"name": ["in", list(entry_modes)]},
+                fields=[
+                    "name",
+                    "mode_of_payment",
+                    "paid_amount",
+                    "base_paid_amount",
+                    "paid_from_account_currency",
+                    "paid_to_account_currency",
+                    "party_account_currency",
+                ],
+            ):
+                currency = (
+                    payment_doc.paid_from_account_currency
+                    or payment_doc.paid_to_account_currency
+                    or payment_doc.party_account_currency
+                    or company_currency
+                )
                 update_payment_breakdown(
-                    cash_mode_of_payment,
-                    -get_base_value(
-                        invoice_doc,
-                        "change_amount",
-                        "base_change_amount",
-                        conversion_rate,
-                    ),
+                    entry_modes[payment_doc.name] or payment_doc.mode_of_payment,
+                    flt(payment_doc.base_paid_amount),
                     currency,
-                    -change_amount,
+                    flt(payment_doc.paid_amount),
                 )
 
-        for row in self.get("pos_payments", []):
-            payment_entry = row.get("payment_entry")
-            if not payment_entry or not frappe.db.exists("Payment Entry", payment_entry):
-                continue
-
-            payment_doc = frappe.get_cached_doc("Payment Entry", payment_entry)
-            currency = (
-                payment_doc.get("paid_from_account_currency")
-                or payment_doc.get("paid_to_account_currency")
-                or payment_doc.get("party_account_currency")
-                or payment_doc.get("currency")
-                or company_currency
-            )
-            base_amount = flt(payment_doc.get("base_paid_amount") or 0)
-            paid_amount = flt(payment_doc.get("paid_amount") or 0)
-            mode_of_payment = row.get("mode_of_payment") or payment_doc.get("mode_of_payment")
-
-            update_payment_breakdown(mode_of_payment, base_amount, currency, paid_amount)
-
         mode_summaries = []
         payment_breakdown_copy = payment_breakdown.copy()
         for detail in self.get("payment_reconciliation", []):
@@ -392,29 +411,25 @@ def get_cashiers(doctype, txt, searchfield, start, page_len, filters):
 @frappe.whitelist()
 def get_pos_invoices(pos_opening_shift, doctype=None):
     if not doctype:
-        pos_profile = frappe.db.get_value("POS Opening Shift", pos_opening_shift, "pos_profile")
-        use_pos_invoice = frappe.db.get_value(
-            "POS Profile",
-            pos_profile,
-            "create_pos_invoice_instead_of_sales_invoice",
-        )
-        doctype = "POS Invoice" if use_pos_invoice else "Sales Invoice"
+        doctype = shift_invoice_doctype(pos_opening_shift)
     submit_printed_invoices(pos_opening_shift, doctype)
-    cond = " and ifnull(consolidated_invoice,'') = ''" if doctype == "POS Invoice" else ""
-    data = frappe.db.sql(
-        f"""
-	select
-		name
-	from
-		`tab{doctype}`
-	where
-		docstatus = 1 and posa_pos_opening_shift = %s{cond}
-	""",
-        (pos_opening_shift),
-        as_dict=1,
+
+    # One query per table instead of loading every invoice document.
+    condition = shift_invoice_condition(doctype)
+    values = {"pos_opening_shift": pos_opening_shift}
+    taxes = get_child_rows(
+        doctype, TAX_TABLE, ["account_head", "rate", "tax_amount", "base_tax_amount"], condition, values
+    )
+    payments = get_child_rows(
+        doctype, PAYMENT_TABLE, ["mode_of_payment", "amount", "base_amount"], condition, values
     )
 
-    data = [frappe.get_doc(doctype, d.name).as_dict() for d in data]
+    data = []
+    for invoice in get_invoice_rows(doctype, condition, values):
+        invoice.doctype = doctype
+        invoice.taxes = taxes.get(invoice.name, [])
+        invoice.payments = payments.get(invoice.name, [])
+        data.append(invoice)
 
     return data
 
@@ -444,15 +459,11 @@ def get_payments_entries(pos_opening_shift):
 @frappe.whitelist()
 def make_closing_shift_from_opening(opening_shift):
     opening_shift = json.loads(opening_shift)
-    use_pos_invoice = frappe.db.get_value(
-        "POS Profile",
-        opening_shift.get("pos_profile"),
-        "create_pos_invoice_instead_of_sales_invoice",
-    )
-    doctype = "POS Invoice" if use_pos_invoice else "Sales Invoice"
-    submit_printed_invoices(opening_shift.get("name"), doctype)
+    pos_opening_shift = opening_shift.get("name")
+    doctype = shift_invoice_doctype(pos_opening_shift)
+    submit_printed_invoices(pos_opening_shift, doctype)
     closing_shift = frappe.new_doc("POS Closing Shift")
-    closing_shift.pos_opening_shift = opening_shift.get("name")
+    closing_shift.pos_opening_shift = pos_opening_shift
     closing_shift.period_start_date = opening_shift.get("period_start_date")
     closing_shift.period_end_date = frappe.utils.get_datetime()
     closing_shift.pos_profile = opening_shift.get("pos_profile")
@@ -463,99 +474,63 @@ def make_closing_shift_from_opening(opening_shift):
     closing_shift.total_quantity = 0
 
     company_currency = frappe.get_cached_value("Company", closing_shift.company, "default_currency")
+    cash_mode_of_payment = _cash_mode_of_payment(closing_shift.pos_profile)
 
-    invoices = get_pos_invoices(opening_shift.get("name"), doctype)
+    condition = shift_invoice_condition(doctype)
+    values = {"pos_opening_shift": pos_opening_shift}
 
-    pos_transactions = []
-    taxes = []
     payments = []
-    pos_payments_table = []
-    for detail in opening_shift.get("balance_details"):
-        payments.append(
-            frappe._dict(
-                {
-                    "mode_of_payment": detail.get("mode_of_payment"),
-                    "opening_amount": detail.get("amount") or 0,
-                    "expected_amount": detail.get("amount") or 0,
-                }
+
+    def add_expected_amount(mode_of_payment, amount, opening_amount=0):
+        existing_pay = [pay for pay in payments if pay.mode_of_payment == mode_of_payment]
+        if existing_pay:
+            existing_pay[0].expected_amount += flt(amount)
+        else:
+            payments.append(
+                frappe._dict(
+                    {
+                        "mode_of_payment": mode_of_payment,
+                        "opening_amount": opening_amount,
+                        "expected_amount": flt(opening_amount) + flt(amount),
+                    }
+                )
             )
-        )
 
-    invoice_field = "pos_invoice" if doctype == "POS Invoice" else "sales_invoice"
+    for detail in opening_shift.get("balance_details"):
+        add_expected_amount(detail.get("mode_of_payment"), 0, detail.get("amount") or 0)
 
-    for d in invoices:
-        conversion_rate = d.get("conversion_rate")
-        pos_transactions.append(
-            frappe._dict(
-                {
-                    invoice_field: d.name,
-                    "posting_date": d.posting_date,
-                    "grand_total": get_base_value(d, "grand_total", "base_grand_total", conversion_rate),
-                    "transaction_currency": d.get("currency") or company_currency,
-                    "transaction_amount": flt(d.get("grand_total")),
-                    "customer": d.customer,
-                }
-            )
+    invoice_field = "pos_invoice" if doctype == "POS Invoice" else "sales_invoice"
+    pos_transactions = [
+        frappe._dict(
+            {
+                invoice_field: d.name,
+                "posting_date": d.posting_date,
+                "grand_total": get_base_value(d, "grand_total", "base_grand_total", d.conversion_rate),
+                "transaction_currency": d.currency or company_currency,
+                "transaction_amount": flt(d.grand_total),
+                "customer": d.customer,
+            }
         )
-        base_grand_total = get_base_value(d, "grand_total", "base_grand_total", conversion_rate)
-        base_net_total = get_base_value(d, "net_total", "base_net_total", conversion_rate)
-        closing_shift.grand_total += base_grand_total
-        closing_shift.net_total += base_net_total
-        closing_shift.total_quantity += flt(d.total_qty)
-
-        for t in d.taxes:
-            existing_tax = [tx for tx in taxes if tx.account_head == t.account_head and tx.rate == t.rate]
-            if existing_tax:
-                existing_tax[0].amount += get_base_value(
-                    t, "tax_amount", "base_tax_amount", d.get("conversion_rate")
-                )
-            else:
-                taxes.append(
-                    frappe._dict(
-                        {
-                            "account_head": t.account_head,
-                            "rate": t.rate,
-                            "amount": get_base_value(
-                                t, "tax_amount", "base_tax_amount", d.get("conversion_rate")
-                            ),
-                        }
-                    )
-                )
+        for d in get_invoice_rows(doctype, condition, values)
+    ]
 
-        for p in d.payments:
-            existing_pay = [pay for pay in payments if pay.mode_of_payment == p.mode_of_payment]
-            if existing_pay:
-                cash_mode_of_payment = frappe.get_value(
-                    "POS Profile",
-                    opening_shift.get("pos_profile"),
-                    "posa_cash_mode_of_payment",
-                )
-                if not cash_mode_of_payment:
-                    cash_mode_of_payment = "Cash"
-                conversion_rate = d.get("conversion_rate")
-                if existing_pay[0].mode_of_payment == cash_mode_of_payment:
-                    amount = get_base_value(p, "amount", "base_amount", conversion_rate) - get_base_value(
-                        d, "change_amount", "base_change_amount", conversion_rate
-                    )
-                else:
-                    amount = get_base_value(p, "amount", "base_amount", conversion_rate)
-                existing_pay[0].expected_amount += flt(amount)
-            else:
-                payments.append(
-                    frappe._dict(
-                        {
-                            "mode_of_payment": p.mode_of_payment,
-                            "opening_amount": 0,
-                            "expected_amount": get_base_value(
-                                p, "amount", "base_amount", d.get("conversion_rate")
-                            ),
-                        }
-                    )
-                )
+    summary = get_shift_summary(pos_opening_shift, doctype)
+    closing_shift.grand_total = summary.grand_total
+    closing_shift.net_total = summary.net_total
+    closing_shift.total_quantity = summary.total_qty
+
+    for payment in summary.payments:
+        add_expected_amount(payment.mode_of_payment, payment.base_amount)
+    if summary.change_amount:
+        add_expected_amount(cash_mode_of_payment, -summary.change_amount)
 
-    pos_payments = get_payments_entries(opening_shift.get("name"))
+    taxes = [
+        frappe._dict({"account_head": t.account_head, "rate": t.rate, "amount": t.amount})
+        for t in summary.taxes
+    ]
 
-    for py in pos_payments:
+    pos_payments_table = []
+    for py in get_payments_entries(pos_opening_shift):
         pos_payments_table.append(
             frappe._dict(
                 {
@@ -567,19 +542,7 @@ def make_closing_shift_from_opening(opening_shift):
                 }
             )
         )
-        existing_pay = [pay for pay in payments if pay.mode_of_payment == py.mode_of_payment]
-        if existing_pay:
-            existing_pay[0].expected_amount += get_base_value(py, "paid_amount", "base_paid_amount")
-        else:
-            payments.append(
-                frappe._dict(
-                    {
-                        "mode_of_payment": py.mode_of_payment,
-                        "opening_amount": 0,
-                        "expected_amount": get_base_value(py, "paid_amount", "base_paid_amount"),
-                    }
-                )
-            )
+        add_expected_amount(py.mode_of_payment, get_base_value(py, "paid_amount", "base_paid_amount"))
 
     closing_shift.set("pos_transactions", pos_transactions)
     closing_shift.set("payment_reconciliation", payments)
@@ -600,14 +563,8 @@ def submit_closing_shift(closing_shift):
 
 
 def submit_printed_invoices(pos_opening_shift, doctype):
-    invoices_list = frappe.get_all(
-        doctype,
-        filters={
-            "posa_pos_opening_shift": pos_opening_shift,
-            "docstatus": 0,
-            "posa_is_printed": 1,
-        },
-    )
-    for invoice in invoices_list:
-        invoice_doc = frappe.get_doc(doctype, invoice.name)
-        invoice_doc.submit()
+    # The POS submits these through the worker pool in
+    # ``api.shift_submission`` first; this only picks up what is left.
+    ensure_no_running_submission(pos_opening_shift)
+    for name in printed_drafts(pos_opening_shift, doctype):
+        submit_draft(doctype, name)
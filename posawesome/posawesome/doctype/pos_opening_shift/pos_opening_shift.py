@@ -8,6 +8,7 @@ from frappe import _
 from frappe.utils import cint
 from frappe.model.document import Document
 from posawesome.posawesome.api.status_updater import StatusUpdater
+from posawesome.posawesome.api.shift_totals import mark_shift_opened
 
 
 class POSOpeningShift(StatusUpdater):
@@ -26,3 +27,4 @@ class POSOpeningShift(StatusUpdater):
 
     def on_submit(self):
         self.set_status(update=True)
+        mark_shift_opened(self.name)